@@ -0,0 +1,8 @@
+"""
+Benchmarks for the pose estimation pipeline. Each module in this package,
+other than the shared helpers in harness, is a script that is run from the
+repository root, for example:
+
+    python -m benchmarks.stages
+    python -m benchmarks.suite
+"""
@@ -0,0 +1,139 @@
+"""
+Shared helpers for the benchmarks: timing a function, summarizing its
+latencies, saving and comparing JSON baselines so a change that slows a
+benchmark down is flagged, and loading the saved reference joints. Nothing
+here imports torch, so benchmarks that do not run the model never load it.
+"""
+import csv
+import json
+import time
+import numpy as np
+
+# Path to the body pose model weights.
+MODEL_PATH = "deep_pose/body_pose_model.pth"
+
+# Fractional slowdown against the baseline that counts as a regression.
+TOLERANCE = 0.10
+
+# Summary metrics compared against the baseline, and whether a larger value
+# is better for each.
+REGRESSION_METRICS = {"p50_ms": False, "throughput_per_s": True}
+
+
+def load_reference_joints(pose_name):
+    """
+    Load the saved joint positions for a pose.
+
+    Args:
+        pose_name (str): The name of the pose, such as "first_mask".
+    Returns:
+        (numpy.ndarray): An 18x2 array of joint positions, where joints that
+            were not found are [-1, -1].
+    """
+    joints = -np.ones((18, 2))
+    with open(f"mask_joint_positions/{pose_name}.csv", "r") as csv_file:
+        for row in csv.reader(csv_file):
+            joints[int(row[0])] = [float(row[1]), float(row[2])]
+    return joints
+
+
+def measure(function, repeats, warmup=1):
+    """
+    Time repeated calls of a function.
+
+    Args:
+        function (callable): The function to call with no arguments.
+        repeats (int): The number of timed calls.
+        warmup (int): The number of untimed calls made first, so one-off
+            allocation and caching are not measured.
+    Returns:
+        (list): The duration of each timed call in seconds.
+    """
+    for _ in range(warmup):
+        function()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies, items_per_call=1):
+    """
+    Summarize the latencies of a benchmark.
+
+    Args:
+        latencies (list): The duration of each call in seconds.
+        items_per_call (int): The number of items, such as frames, that each
+            call processes.
+    Returns:
+        (dict): The number of calls, the throughput in items per second and
+            the mean, p50, p90 and p99 latency in milliseconds.
+    """
+    latencies = np.array(latencies)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    return {
+        "calls": len(latencies),
+        "throughput_per_s": float(items_per_call * len(latencies)
+                                  / latencies.sum()),
+        "mean_ms": float(latencies.mean() * 1000),
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+    }
+
+
+def save_baseline(results, path):
+    """
+    Save benchmark results as a JSON baseline.
+
+    Args:
+        results (dict): Mapping of benchmark names to their summaries.
+        path (str): The path of the JSON file to write.
+    """
+    with open(path, "w") as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    """
+    Load a JSON baseline saved by save_baseline.
+
+    Args:
+        path (str): The path of the JSON file to read.
+    Returns:
+        (dict): Mapping of benchmark names to their summaries.
+    """
+    with open(path, "r") as baseline_file:
+        return json.load(baseline_file)
+
+
+def find_regressions(results, baseline, tolerance=TOLERANCE):
+    """
+    Compare benchmark results against a baseline.
+
+    Args:
+        results (dict): Mapping of benchmark names to their summaries.
+        baseline (dict): Mapping of benchmark names to baseline summaries.
+            Benchmarks missing from the baseline are not compared.
+        tolerance (float): The fractional slowdown allowed before a metric
+            counts as a regression.
+    Returns:
+        (list): One (benchmark name, metric, baseline value, current value)
+            tuple for every metric that regressed.
+    """
+    regressions = []
+    for name, summary in results.items():
+        if name not in baseline:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            before = baseline[name][metric]
+            after = summary[metric]
+            if higher_is_better:
+                regressed = after < before * (1 - tolerance)
+            else:
+                regressed = after > before * (1 + tolerance)
+            if regressed:
+                regressions.append((name, metric, before, after))
+    return regressions
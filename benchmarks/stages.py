@@ -0,0 +1,118 @@
+"""
+Benchmark the latency and accuracy of running Deep Pose with fewer refinement
+stages. Each reference pose image in images/poses is analyzed with the network
+truncated after 1 to 6 stages, and the joints found are compared against the
+saved joint positions in mask_joint_positions, which were created with all six
+stages.
+"""
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from benchmarks.harness import MODEL_PATH, load_reference_joints
+from deep_pose.body import Body
+
+# Number of times each image is analyzed when measuring latency.
+REPEATS = 5
+
+# Stage counts to compare.
+STAGES = [1, 2, 3, 4, 5, 6]
+
+
+def find_joints(candidate, subset):
+    """
+    Convert a Deep Pose result into joint positions for the first person.
+
+    Args:
+        candidate (numpy.ndarray): Candidate joints returned by Body.
+        subset (numpy.ndarray): Joint subsets returned by Body.
+    Returns:
+        (numpy.ndarray): An 18x2 array of joint positions, where joints that
+            were not found are [-1, -1].
+    """
+    joints = -np.ones((18, 2))
+    if len(subset) > 0:
+        for index, value in enumerate(subset[0][:18]):
+            if value >= 0:
+                joints[index] = candidate[int(value)][0:2]
+    return joints
+
+
+def compare_joints(found, reference):
+    """
+    Compare found joint positions against reference joint positions.
+
+    Args:
+        found (numpy.ndarray): An 18x2 array of found joint positions.
+        reference (numpy.ndarray): An 18x2 array of reference positions.
+    Returns:
+        (int): The number of joints present in both.
+        (float): The mean distance in pixels between joints present in both,
+            or nan if there are none.
+        (int): The number of joints whose presence differs.
+    """
+    found_present = found[:, 0] >= 0
+    reference_present = reference[:, 0] >= 0
+    both = found_present & reference_present
+    distances = np.linalg.norm(found[both] - reference[both], axis=1)
+    mean_distance = distances.mean() if len(distances) > 0 else float("nan")
+    return int(both.sum()), mean_distance, int((found_present
+                                                != reference_present).sum())
+
+
+def benchmark_stages(stages, images):
+    """
+    Measure the latency and joint error of Deep Pose truncated after a given
+    number of stages.
+
+    Args:
+        stages (int): The number of network stages to run.
+        images (dict): Mapping of pose names to BGR images.
+    Returns:
+        (dict): The median latency in milliseconds, the mean joint error in
+            pixels and the total number of joints whose presence differs
+            from the reference.
+    """
+    body_estimation = Body(MODEL_PATH, stages=stages)
+    latencies = []
+    errors = []
+    mismatches = 0
+    for pose_name, image in images.items():
+        # The first call is not timed as it includes one-off allocation.
+        candidate, subset = body_estimation(image)
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            body_estimation(image)
+            latencies.append(time.perf_counter() - start)
+        _, error, mismatched = compare_joints(
+            find_joints(candidate, subset), load_reference_joints(pose_name))
+        errors.append(error)
+        mismatches += mismatched
+    return {
+        "latency_ms": float(np.median(latencies) * 1000),
+        "joint_error_px": float(np.nanmean(errors)),
+        "missing_or_extra_joints": mismatches,
+    }
+
+
+def main():
+    """
+    Run the stage benchmark and print a table of the results.
+    """
+    images = {}
+    for path in sorted(glob.glob("images/poses/*.png")):
+        pose_name = os.path.splitext(os.path.basename(path))[0]
+        if os.path.exists(f"mask_joint_positions/{pose_name}.csv"):
+            images[pose_name] = cv2.imread(path)
+    print(f"{'stages':>6} {'latency (ms)':>13} {'joint error (px)':>17} "
+          f"{'missing/extra joints':>21}")
+    for stages in STAGES:
+        result = benchmark_stages(stages, images)
+        print(f"{stages:>6} {result['latency_ms']:>13.1f} "
+              f"{result['joint_error_px']:>17.2f} "
+              f"{result['missing_or_extra_joints']:>21}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Benchmark the pose pipeline and the game code that runs on every frame:
+
+- Body on each reference pose image and on synthetic frames with several
+  people in them,
+- HoleInTheCameraGame.compute_accuracy against every mask's joints, and
+  MaskLibrary.score_all on a burst of poses against every mask at once,
+- PygameViewer.display_frame, drawn with SDL's dummy video driver,
+- one trial end to end: analyze_frame, parse_for_joint_positions and
+  compute_accuracy.
+
+Results are printed as throughput and latency percentiles. They can be saved
+as a JSON baseline and later runs compared against it, which flags any
+benchmark that got slower than the tolerance allows. Baselines are only
+meaningful on the machine they were recorded on. Run from the repository
+root:
+
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite
+"""
+import argparse
+import glob
+import os
+import sys
+import cv2
+import numpy as np
+
+# The view is drawn off screen, so the benchmarks also run without a display
+# or sound card. These must be set before pygame is initialized.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+# pylint: disable=wrong-import-position
+from benchmarks.harness import (MODEL_PATH, TOLERANCE, find_regressions,
+                                load_baseline, load_reference_joints,
+                                measure, save_baseline, summarize)
+
+# Default path of the JSON baseline.
+BASELINE_PATH = "benchmarks/baseline.json"
+
+# Number of timed calls for the pose estimation benchmarks, which take
+# hundreds of milliseconds each.
+POSE_REPEATS = 3
+
+# Number of timed calls for the game benchmarks, which take milliseconds.
+GAME_REPEATS = 200
+
+# Number of poses scored together by the score_all benchmark.
+SCORE_BURST = 70
+
+# Number of people placed in each synthetic frame.
+CROWD_SIZES = [2, 3, 4]
+
+
+def load_pose_images():
+    """
+    Load the reference pose images.
+
+    Returns:
+        (dict): Mapping of pose names, such as "first_mask", to BGR images.
+    """
+    images = {}
+    for path in sorted(glob.glob("images/poses/*.png")):
+        images[os.path.splitext(os.path.basename(path))[0]] = cv2.imread(path)
+    return images
+
+
+def make_crowd_frame(images, people):
+    """
+    Build a frame with several people in it by shrinking reference pose images
+    and placing them side by side along the bottom of a grey frame.
+
+    Args:
+        images (list): BGR pose images of the frame size, at least as many as
+            people.
+        people (int): The number of people to place in the frame.
+    Returns:
+        (numpy.ndarray): The BGR frame, the same size as the pose images.
+    """
+    height, width = images[0].shape[:2]
+    frame = np.full_like(images[0], 128)
+    tile_width = width // people
+    tile_height = height * tile_width // width
+    for index in range(people):
+        tile = cv2.resize(images[index], (tile_width, tile_height),
+                          interpolation=cv2.INTER_AREA)
+        frame[height - tile_height:,
+              index * tile_width:(index + 1) * tile_width] = tile
+    return frame
+
+
+def joint_positions(pose_name):
+    """
+    Build the PoseResult HoleInTheCameraGame would hold after seeing a pose,
+    from that pose's saved joints.
+
+    Args:
+        pose_name (str): The name of the pose, such as "first_mask".
+    Returns:
+        (PoseResult): The saved joints of the pose.
+    """
+    # pylint: disable=import-outside-toplevel
+    from hole_in_the_camera_pose import PoseResult
+
+    return PoseResult(load_reference_joints(pose_name))
+
+
+def benchmark_body(images):
+    """
+    Benchmark Body on the reference pose images and on synthetic frames with
+    several people.
+
+    Args:
+        images (dict): Mapping of pose names to BGR images.
+    Returns:
+        (dict): Mapping of benchmark names to their summaries.
+    """
+    # Imported here so the game benchmarks do not need to load torch.
+    # pylint: disable=import-outside-toplevel
+    from deep_pose.body import Body
+
+    body_estimation = Body(MODEL_PATH)
+    frames = list(images.values())
+    latencies = []
+    for frame in frames:
+        latencies += measure(lambda frame=frame: body_estimation(frame),
+                             POSE_REPEATS)
+    results = {"body_poses": summarize(latencies)}
+    for people in CROWD_SIZES:
+        frame = make_crowd_frame(frames, people)
+        results[f"body_crowd_{people}"] = summarize(
+            measure(lambda frame=frame: body_estimation(frame), POSE_REPEATS))
+    return results
+
+
+def benchmark_compute_accuracy():
+    """
+    Benchmark scoring a pose against every mask's joints one mask at a time,
+    and scoring a burst of poses against every mask in a single call.
+
+    Returns:
+        (dict): Mapping of the benchmark name to its summary.
+    """
+    # pylint: disable=import-outside-toplevel
+    from hole_in_the_camera_model import HoleInTheCameraGame
+
+    game = HoleInTheCameraGame()
+    # pylint: disable=protected-access
+    game._joint_positions = joint_positions("first_mask")
+    mask_indices = list(range(len(game.masks)))
+
+    def score_all_masks():
+        for mask_index in mask_indices:
+            game.compute_accuracy(mask_index)
+
+    # a burst of jittered copies of reference poses picked at random, so the
+    # burst keeps its size however many masks there are
+    references = game.masks.joints
+    generator = np.random.default_rng(0)
+    picked = generator.integers(0, len(references), SCORE_BURST)
+    poses = references[picked] + generator.normal(
+        0, 20, (SCORE_BURST,) + references.shape[1:])
+
+    return {
+        "compute_accuracy": summarize(
+            measure(score_all_masks, GAME_REPEATS), len(mask_indices)),
+        "score_all": summarize(
+            measure(lambda: game.masks.score_all(poses), GAME_REPEATS),
+            len(poses) * len(references)),
+    }
+
+
+def benchmark_display_frame(images):
+    """
+    Benchmark drawing a masked camera frame with the timer.
+
+    Args:
+        images (dict): Mapping of pose names to BGR images.
+    Returns:
+        (dict): Mapping of the benchmark name to its summary.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pygame
+    from hole_in_the_camera_model import HoleInTheCameraGame
+    from hole_in_the_camera_view import PygameViewer
+
+    viewer = PygameViewer((640, 480))
+    mask = HoleInTheCameraGame().masks.mask(0)
+    frame = next(iter(images.values()))
+    try:
+        latencies = measure(
+            lambda: viewer.display_frame(frame, "10", mask), GAME_REPEATS)
+    finally:
+        pygame.quit()
+    return {"display_frame": summarize(latencies)}
+
+
+def benchmark_end_to_end(images):
+    """
+    Benchmark one game trial per reference pose: analyzing the frame, parsing
+    the joints and scoring them against the pose's mask.
+
+    Args:
+        images (dict): Mapping of pose names to BGR images.
+    Returns:
+        (dict): Mapping of the benchmark name to its summary.
+    """
+    # pylint: disable=import-outside-toplevel
+    from hole_in_the_camera_model import HoleInTheCameraGame
+
+    game = HoleInTheCameraGame()
+    game.BODY_ESTIMATION.get()
+    latencies = []
+    for pose_name, frame in images.items():
+        mask_index = game.masks.index(pose_name)
+
+        def trial(frame=frame, mask_index=mask_index):
+            game.analyze_frame(frame)
+            game.parse_for_joint_positions()
+            game.compute_accuracy(mask_index)
+
+        latencies += measure(trial, POSE_REPEATS)
+    return {"end_to_end": summarize(latencies)}
+
+
+# Benchmark groups by name, and whether each takes the pose images.
+BENCHMARKS = {
+    "body": (benchmark_body, True),
+    "compute_accuracy": (benchmark_compute_accuracy, False),
+    "display_frame": (benchmark_display_frame, True),
+    "end_to_end": (benchmark_end_to_end, True),
+}
+
+
+def print_results(results):
+    """
+    Print a table of benchmark summaries.
+
+    Args:
+        results (dict): Mapping of benchmark names to their summaries.
+    """
+    print(f"{'benchmark':<18} {'items/s':>9} {'mean (ms)':>10} "
+          f"{'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9}")
+    for name, summary in results.items():
+        print(f"{name:<18} {summary['throughput_per_s']:>9.1f} "
+              f"{summary['mean_ms']:>10.2f} {summary['p50_ms']:>9.2f} "
+              f"{summary['p90_ms']:>9.2f} {summary['p99_ms']:>9.2f}")
+
+
+def main():
+    """
+    Run the selected benchmarks, print their results and compare them against
+    the baseline, or save them as the new baseline.
+
+    Returns:
+        (int): 1 if any benchmark regressed against the baseline, else 0.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help="benchmark groups to run, from "
+                        f"{list(BENCHMARKS)}; all by default")
+    parser.add_argument("--baseline", default=BASELINE_PATH,
+                        help="JSON baseline to compare against or save to")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="save the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="fractional slowdown flagged as a regression")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    images = load_pose_images()
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        benchmark, takes_images = BENCHMARKS[name]
+        results.update(benchmark(images) if takes_images else benchmark())
+    print_results(results)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline")
+        return 0
+    regressions = find_regressions(results, load_baseline(args.baseline),
+                                   args.tolerance)
+    for name, metric, before, after in regressions:
+        print(f"REGRESSION {name} {metric}: {before:.2f} -> {after:.2f}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
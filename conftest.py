@@ -0,0 +1,27 @@
+"""
+Fixtures shared by the deep_pose tests.
+"""
+import pytest
+import torch
+from deep_pose.model import bodypose_model
+
+
+@pytest.fixture(scope="session")
+def weights_path(tmp_path_factory):
+    """
+    Write randomly initialized bodypose_model weights in the caffe-style
+    layout of body_pose_model.pth, so tests can build a Body without the
+    downloaded weights.
+
+    Returns:
+        (str): Path to the weights.
+    """
+    torch.manual_seed(0)
+    model = bodypose_model()
+    # the downloaded weights are keyed without the name of the block each
+    # layer is in
+    weights = {".".join(name.split(".")[1:]): value
+               for name, value in model.state_dict().items()}
+    path = tmp_path_factory.mktemp("weights") / "body_pose_model.pth"
+    torch.save(weights, path)
+    return str(path)
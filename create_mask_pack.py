@@ -0,0 +1,23 @@
+"""
+Pack every mask and its joint positions into the single file the game opens,
+so starting a game does not read a joint positions csv for each mask and
+masks are decoded from the pack instead of their images. Run this after
+create_csv.py whenever holes are added or changed.
+"""
+from hole_in_the_camera_masks import MaskLibrary
+from hole_in_the_camera_model import HoleInTheCameraGame
+
+# Whether to store one bit per pixel. This makes the pack an eighth of the
+# size but turns every pixel black or white, so it only suits masks that are
+# already black and white.
+BIT_PACK = False
+
+def main():
+    """
+    This is the main runner function to create the mask pack.
+    """
+    masks = MaskLibrary(HoleInTheCameraGame.MASK_NAMES)
+    masks.save_pack(HoleInTheCameraGame.MASK_PACK_PATH, bits=BIT_PACK)
+
+if __name__ == "__main__":
+    main()
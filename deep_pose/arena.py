@@ -0,0 +1,54 @@
+"""
+Reusable scratch arrays for Body. Every frame of a video has the same size,
+so the large intermediate arrays of one call can be written into again by the
+next instead of being allocated and freed for every frame.
+"""
+
+import numpy as np
+
+
+class BufferArena(object):
+    """
+    Named scratch arrays that are kept between calls. Each name holds a single
+    array, which is replaced when it is asked for with a different shape or
+    dtype, so the arena never holds more than one array per name even when
+    frame sizes change.
+
+    Arrays handed out by the arena are overwritten by the next call that asks
+    for the same name, so callers must not keep them.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.float32):
+        """
+        Return the array kept under a name, allocating it if needed. Its
+        contents are whatever was last written to it.
+
+        Args:
+            name (str): Name of the array.
+            shape (tuple): Shape of the array.
+            dtype (numpy.dtype): Data type of the array.
+        Returns:
+            (numpy.ndarray): The array.
+        """
+        shape = tuple(shape)
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    @property
+    def nbytes(self):
+        """
+        Return the total size in bytes of the arrays in the arena.
+        """
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def clear(self):
+        """
+        Release every array in the arena.
+        """
+        self._buffers.clear()
@@ -0,0 +1,186 @@
+"""
+Inference backends for bodypose_model. A backend takes the preprocessed,
+normalized NCHW input batch as a float32 numpy array and returns the PAF (L1)
+and heatmap (L2) outputs of the network as float32 numpy arrays, so Body's
+pre- and post-processing do not depend on how the network is run.
+"""
+
+import os
+import zipfile
+from abc import ABC, abstractmethod
+
+import torch
+
+import deep_pose.util as util
+from deep_pose.compiled import CompiledModel, weights_fingerprint
+from deep_pose.model import bodypose_model
+from deep_pose.precision import PRECISIONS, convert_precision, int8_structure
+
+
+class PoseBackend(ABC):
+    """
+    Abstract class for a bodypose_model inference backend.
+    """
+
+    @abstractmethod
+    def __call__(self, data):
+        """
+        Run the network on a batch.
+
+        Args:
+            data (numpy.ndarray): N x 3 x H x W float32 input batch.
+        Returns:
+            (numpy.ndarray): N x 38 x H/8 x W/8 part affinity fields.
+            (numpy.ndarray): N x 19 x H/8 x W/8 heatmaps.
+        """
+
+
+class TorchBackend(PoseBackend):
+    """
+    Run bodypose_model with PyTorch, optionally at reduced precision and as a
+    compiled graph.
+
+    Attributes:
+        model (torch.nn.Module): The model that is run, after any precision
+            conversion and compilation.
+        device (str): The device the model runs on.
+        calibration_error (float): Largest difference between the float32 and
+            reduced precision heatmaps over the calibration inputs.
+    """
+
+    def __init__(self, model_path, stages=6, precision='float32', calibration_inputs=None,
+                 compile_mode=None):
+        """
+        Load the weights and prepare the model.
+
+        Args:
+            model_path (str): Path to the caffe-style body pose weights, or
+                to a checkpoint written by deep_pose.convert.
+            stages (int): Number of network stages to run.
+            precision (str): One of PRECISIONS.
+            calibration_inputs (callable): Returns the preprocessed float32
+                input batches used to calibrate reduced precisions. It is only
+                called when the weights still need calibrating.
+            compile_mode (str): None, or one of the CompiledModel modes.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}, not {precision!r}")
+        self.device = 'cuda' if torch.cuda.is_available() and precision == 'float32' else 'cpu'
+        self.model, weights_precision = load_model(model_path, stages)
+        self.model = self.model.to(self.device)
+        self.calibration_error = 0.0
+        if weights_precision != 'float32':
+            # converted checkpoints are already calibrated
+            if weights_precision != precision:
+                raise ValueError(f"{model_path} holds {weights_precision} weights, not {precision}")
+        elif precision != 'float32':
+            inputs = [torch.from_numpy(data) for data in calibration_inputs()]
+            self.model, self.calibration_error = convert_precision(self.model, precision, inputs)
+        if compile_mode is not None:
+            name = os.path.splitext(os.path.basename(model_path))[0]
+            tag = f"{name}.{weights_fingerprint(model_path)}.{precision}.stages{stages}"
+            self.model = CompiledModel(self.model, compile_mode, os.path.dirname(os.path.abspath(model_path)), tag)
+
+    def __call__(self, data):
+        with torch.no_grad():
+            paf, heatmap = self.model(torch.from_numpy(data).to(self.device))
+        return paf.float().cpu().numpy(), heatmap.float().cpu().numpy()
+
+
+class OnnxBackend(PoseBackend):
+    """
+    Run an exported bodypose_model graph with ONNX Runtime on the CPU.
+
+    Attributes:
+        onnx_path (str): Path to the ONNX graph.
+        session (onnxruntime.InferenceSession): The inference session.
+    """
+
+    def __init__(self, model_path, stages=6):
+        """
+        Open an inference session, exporting the graph first if needed.
+
+        Args:
+            model_path (str): Path to an .onnx graph, or to the caffe-style
+                body pose weights. For weights, the graph is exported next to
+                them on first use and reused afterwards, until the weights
+                file changes.
+            stages (int): Number of network stages to export.
+        """
+        # Imported here so the PyTorch backend does not need onnxruntime.
+        import onnxruntime
+
+        if model_path.endswith('.onnx'):
+            self.onnx_path = model_path
+        else:
+            fingerprint = weights_fingerprint(model_path)
+            self.onnx_path = f"{os.path.splitext(model_path)[0]}.{fingerprint}.stages{stages}.onnx"
+            if not os.path.exists(self.onnx_path):
+                export_onnx(model_path, self.onnx_path, stages)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(self.onnx_path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, data):
+        paf, heatmap = self.session.run(['paf', 'heatmap'], {'image': data})
+        return paf, heatmap
+
+
+# backends that Body can be configured with, by name
+BACKENDS = {
+    'torch': TorchBackend,
+    'onnx': OnnxBackend,
+}
+
+
+# format of checkpoints written by deep_pose.convert
+CHECKPOINT_FORMAT = 'bodypose_model'
+
+
+def load_model(model_path, stages=6):
+    """
+    Build bodypose_model and load weights into it. The weights are either
+    the original caffe-style checkpoint, whose keys are renamed with
+    util.transfer, or a checkpoint written by deep_pose.convert, which is
+    memory mapped and used in place.
+
+    Args:
+        model_path (str): Path to the body pose weights.
+        stages (int): Number of network stages to run.
+    Returns:
+        (torch.nn.Module): The model in eval mode on the CPU.
+        (str): The precision of the loaded weights, 'float32' unless the
+            checkpoint was converted to 'int8'.
+    """
+    model = bodypose_model(stages).eval()
+    # only checkpoints in the zip format can be memory mapped
+    checkpoint = torch.load(model_path, map_location='cpu', mmap=zipfile.is_zipfile(model_path))
+    if checkpoint.get('format') != CHECKPOINT_FORMAT:
+        model.load_state_dict(util.transfer(model, checkpoint))
+        return model, 'float32'
+
+    if checkpoint['precision'] == 'int8':
+        if checkpoint['stages'] != stages:
+            raise ValueError(f"{model_path} was quantized with {checkpoint['stages']} stages, not {stages}")
+        model = int8_structure(model, torch.zeros(1, 3, 184, 248))
+    # assign keeps the memory mapped tensors instead of copying them
+    model.load_state_dict(checkpoint['state_dict'], assign=True)
+    return model.eval(), checkpoint['precision']
+
+
+def export_onnx(model_path, onnx_path, stages=6):
+    """
+    Export bodypose_model to an ONNX graph with a dynamic batch size and
+    input resolution.
+
+    Args:
+        model_path (str): Path to the caffe-style body pose weights.
+        onnx_path (str): Path to write the graph to.
+        stages (int): Number of network stages to export.
+    """
+    model, _ = load_model(model_path, stages)
+    example = torch.zeros(1, 3, 184, 248)
+    torch.onnx.export(model, (example,), onnx_path, input_names=['image'], output_names=['paf', 'heatmap'],
+                      dynamic_axes={name: {0: 'batch', 2: 'height', 3: 'width'}
+                                    for name in ('image', 'paf', 'heatmap')},
+                      dynamo=False)
@@ -6,97 +6,586 @@ detect a user's fit into a mask.
 """
 
 import cv2
+import itertools
 import numpy as np
-import math
-import time
 from scipy.ndimage.filters import gaussian_filter
+from scipy.spatial import cKDTree
 # import matplotlib.pyplot as plt
-import torch
-from torchvision import transforms
 
 import deep_pose.util as util
-from deep_pose.model import bodypose_model
+from deep_pose.arena import BufferArena
+from deep_pose.backend import BACKENDS, TorchBackend
+from deep_pose.precision import load_calibration_images
+from deep_pose.roi import RoiSelector
+from deep_pose.timing import PipelineStats
 # import util
 # from model import bodypose_model
 
+# a peak found on one part's heatmap: its pixel location, the unblurred
+# heatmap value there, its index in candidate and the part it belongs to
+PEAK_DTYPE = np.dtype([('x', np.float64), ('y', np.float64), ('score', np.float64),
+                       ('id', np.int64), ('part', np.int64)])
+
+
+def find_peaks(heatmaps, thre1, sigma=3, subpixel=False, arena=None):
+    """
+    Find the local maxima of every part heatmap at once. The H x W x C stack
+    is blurred spatially as one array, and a pixel is a peak when it is at
+    least as large as its four neighbours and above thre1.
+
+    Args:
+        heatmaps (numpy.ndarray): H x W x C array with one heatmap per part.
+        thre1 (float): Minimum blurred value for a peak.
+        sigma (float): Standard deviation of the spatial gaussian blur.
+        subpixel (bool): Whether to move each peak to the vertex of a
+            parabola fitted through it and its neighbours along each axis.
+        arena (BufferArena): Where to keep the blurred maps and peak masks
+            between calls, or None to allocate them.
+    Returns:
+        (numpy.ndarray): Structured array of PEAK_DTYPE ordered by part, then
+            row, then column, with ids numbered from 0 in that order.
+    """
+    if arena is None:
+        arena = BufferArena()
+    # blurred in float64 even for float32 heatmaps: rounding the blur to
+    # float32 makes neighbouring pixels tie, and both would pass as peaks
+    blurred = arena.get('blurred', heatmaps.shape, np.float64)
+    gaussian_filter(heatmaps, sigma=(sigma, sigma, 0), output=blurred)
+    peaks_binary = arena.get('peaks_binary', heatmaps.shape, bool)
+    compare = arena.get('peaks_compare', heatmaps.shape, bool)
+    np.greater(blurred, thre1, out=peaks_binary)
+    # compare each pixel with its neighbour above, below, left and right;
+    # pixels outside the map count as 0, as the per-part version did
+    for inner, outer in (((slice(1, None),), (slice(None, -1),)), ((slice(None, -1),), (slice(1, None),)),
+                         ((slice(None), slice(1, None)), (slice(None), slice(None, -1))),
+                         ((slice(None), slice(None, -1)), (slice(None), slice(1, None)))):
+        np.greater_equal(blurred[inner], blurred[outer], out=compare[inner])
+        peaks_binary[inner] &= compare[inner]
+    for edge in ((0,), (-1,), (slice(None), 0), (slice(None), -1)):
+        peaks_binary[edge] &= blurred[edge] >= 0
+
+    part, y, x = np.nonzero(peaks_binary.transpose(2, 0, 1))
+    peaks = np.empty(len(part), dtype=PEAK_DTYPE)
+    peaks['x'] = x
+    peaks['y'] = y
+    peaks['score'] = heatmaps[y, x, part]
+    peaks['id'] = np.arange(len(part))
+    peaks['part'] = part
+    if subpixel:
+        centre = blurred[y, x, part]
+        peaks['x'] += _parabola_offset(_neighbour(blurred, y, x - 1, part), centre,
+                                       _neighbour(blurred, y, x + 1, part))
+        peaks['y'] += _parabola_offset(_neighbour(blurred, y - 1, x, part), centre,
+                                       _neighbour(blurred, y + 1, x, part))
+    return peaks
+
+
+def _neighbour(blurred, y, x, part):
+    # values at the given pixels, with pixels outside the map counting as 0
+    inside = (y >= 0) & (y < blurred.shape[0]) & (x >= 0) & (x < blurred.shape[1])
+    values = blurred[np.clip(y, 0, blurred.shape[0] - 1), np.clip(x, 0, blurred.shape[1] - 1), part]
+    return np.where(inside, values, 0)
+
+
+def _parabola_offset(before, centre, after):
+    # vertex of the parabola through (-1, before), (0, centre), (1, after)
+    curvature = before - 2 * centre + after
+    offset = np.divide(before - after, 2 * curvature, out=np.zeros_like(centre), where=curvature < 0)
+    return np.clip(offset, -0.5, 0.5)
+
+
+def score_pairs(candA, candB, paf, pafIdx, imageHeight, thre2, mid_num=10):
+    """
+    Score pairings of two parts' peaks against the limb's part affinity
+    field at once. candA and candB are broadcast against each other, so
+    candA[:, np.newaxis] and candB[np.newaxis] score every pairing and two
+    equally long arrays score just the pairs they line up.
+
+    Args:
+        candA (numpy.ndarray): ... x 4 candidate rows for the limb's first part.
+        candB (numpy.ndarray): ... x 4 candidate rows for the limb's second part.
+        paf (numpy.ndarray): H x W x 38 part affinity fields.
+        pafIdx (list): The x and y channels of paf for this limb.
+        imageHeight (float): Height used for the limb length prior.
+        thre2 (float): Minimum affinity for a midpoint to count as aligned.
+        mid_num (int): Number of points sampled along each pair.
+    Returns:
+        (numpy.ndarray): Mean affinity with the limb length prior, in the
+            broadcast shape of the pairs.
+        (numpy.ndarray): Booleans, true for pairs that pass both acceptance
+            criteria.
+    """
+    vec = candB[..., :2] - candA[..., :2]
+    norm = np.maximum(0.001, np.sqrt(vec[..., 0] * vec[..., 0] + vec[..., 1] * vec[..., 1]))
+    vec = vec / norm[..., np.newaxis]
+
+    # mid_num sample points per pair, rounded half to even like round()
+    xs = np.linspace(candA[..., 0], candB[..., 0], num=mid_num, axis=-1)
+    ys = np.linspace(candA[..., 1], candB[..., 1], num=mid_num, axis=-1)
+    xs = np.clip(np.rint(xs).astype(np.intp), 0, paf.shape[1] - 1)
+    ys = np.clip(np.rint(ys).astype(np.intp), 0, paf.shape[0] - 1)
+    vec_x = paf[ys, xs, pafIdx[0]]
+    vec_y = paf[ys, xs, pafIdx[1]]
+
+    score_midpts = vec_x * vec[..., 0:1] + vec_y * vec[..., 1:2]
+    score_with_dist_prior = score_midpts.sum(axis=-1) / mid_num + np.minimum(
+        0.5 * imageHeight / norm - 1, 0)
+    criterion1 = np.count_nonzero(score_midpts > thre2, axis=-1) > 0.8 * mid_num
+    criterion2 = score_with_dist_prior > 0
+    return score_with_dist_prior, criterion1 & criterion2
+
+
+# above this many possible pairings, close pairs are looked up in a KD-tree
+# instead of measuring every pairing
+KDTREE_PAIRS = 256
+
+
+def nearby_pairs(candA, candB, max_length):
+    """
+    Propose the pairings of two parts' peaks that are at most max_length
+    apart.
+
+    Args:
+        candA (numpy.ndarray): nA x 4 candidate rows for the limb's first part.
+        candB (numpy.ndarray): nB x 4 candidate rows for the limb's second part.
+        max_length (float): Longest limb to propose, or None for no limit.
+    Returns:
+        (numpy.ndarray): Indices in candA of the proposed pairs.
+        (numpy.ndarray): Indices in candB of the proposed pairs, ordered by
+            index in candA and then in candB.
+    """
+    nA = len(candA)
+    nB = len(candB)
+    if max_length is None:
+        return np.divmod(np.arange(nA * nB), nB)
+    if nA * nB <= KDTREE_PAIRS:
+        vec = candB[np.newaxis, :, :2] - candA[:, np.newaxis, :2]
+        return np.nonzero(vec[:, :, 0] * vec[:, :, 0] + vec[:, :, 1] * vec[:, :, 1] <= max_length * max_length)
+    near = cKDTree(candB[:, :2]).query_ball_point(candA[:, :2], max_length, return_sorted=True)
+    i = np.repeat(np.arange(nA), [len(j) for j in near])
+    j = np.fromiter(itertools.chain.from_iterable(near), dtype=np.intp, count=len(i))
+    return i, j
+
+
+def connect_limb(candA, candB, paf, pafIdx, imageHeight, thre2, mid_num=10, max_length=None):
+    """
+    Score the pairings of two parts' peaks proposed by nearby_pairs with
+    score_pairs and greedily keep the best non-conflicting pairs.
+
+    Args:
+        candA (numpy.ndarray): nA x 4 candidate rows for the limb's first part.
+        candB (numpy.ndarray): nB x 4 candidate rows for the limb's second part.
+        paf (numpy.ndarray): H x W x 38 part affinity fields.
+        pafIdx (list): The x and y channels of paf for this limb.
+        imageHeight (float): Height used for the limb length prior.
+        thre2 (float): Minimum affinity for a midpoint to count as aligned.
+        mid_num (int): Number of points sampled along each pair.
+        max_length (float): Longest limb to consider, or None for no limit.
+    Returns:
+        (numpy.ndarray): n x 5 rows of id A, id B, score, index in candA and
+            index in candB, best score first.
+    """
+    nA = len(candA)
+    nB = len(candB)
+    i, j = nearby_pairs(candA, candB, max_length)
+    s, accepted = score_pairs(candA[i], candB[j], paf, pafIdx, imageHeight, thre2, mid_num)
+    i, j, s = i[accepted], j[accepted], s[accepted]
+
+    order = np.argsort(-s, kind='stable')
+    usedA = np.zeros(nA, dtype=bool)
+    usedB = np.zeros(nB, dtype=bool)
+    connection = []
+    for c in order:
+        if not usedA[i[c]] and not usedB[j[c]]:
+            usedA[i[c]] = usedB[j[c]] = True
+            connection.append([candA[i[c], 3], candB[j[c], 3], s[c], i[c], j[c]])
+            if len(connection) >= min(nA, nB):
+                break
+    return np.array(connection).reshape(-1, 5)
+
+
+def single_person_subset(all_peaks, paf, limbSeq, mapIdx, imageHeight, thre2, thre_tie=0.1, mid_num=10):
+    """
+    Assemble one person from the best peak of each part, skipping
+    multi-person matching. Parts are visited along the limb tree from the
+    neck; when several peaks of a part score within thre_tie of its best
+    peak, the one best connected to the already chosen parent is kept.
+
+    Args:
+        all_peaks (list): Per-part candidate rows, as built by Body._decode.
+        paf (numpy.ndarray): H x W x 38 part affinity fields.
+        limbSeq (list): 1-based (parent, child) part pairs of the limb tree,
+            parents listed before their children.
+        mapIdx (list): The PAF channels of each limb in limbSeq, offset by 19.
+        imageHeight (float): Height used for the limb length prior.
+        thre2 (float): Minimum affinity for a midpoint to count as aligned.
+        thre_tie (float): Heatmap score margin within which peaks tie.
+        mid_num (int): Number of points sampled along each limb.
+    Returns:
+        (numpy.ndarray): 1 x 20 subset in the multi-person format, or 0 x 20
+            when the person has too few or too weak parts.
+    """
+    row = -1 * np.ones(20)
+    row[-2:] = 0
+    chosen = [None] * 18
+    neck = limbSeq[0][0] - 1
+    for k in [-1] + list(range(len(limbSeq))):
+        part = neck if k < 0 else limbSeq[k][1] - 1
+        cand = all_peaks[part]
+        if len(cand) == 0:
+            continue
+        tied = cand[cand[:, 2] >= cand[:, 2].max() - thre_tie]
+        best = np.argmax(tied[:, 2])
+        parent = None if k < 0 else chosen[limbSeq[k][0] - 1]
+        if parent is not None:
+            score, accepted = score_pairs(parent, tied, paf, [x - 19 for x in mapIdx[k]],
+                                          imageHeight, thre2, mid_num)
+            if accepted.any():
+                best = np.argmax(np.where(accepted, score, -np.inf))
+                row[-2] += score[best]
+        chosen[part] = tied[best]
+        row[part] = tied[best, 3]
+        row[-2] += tied[best, 2]
+        row[-1] += 1
+    if row[-1] < 4 or row[-2] / row[-1] < 0.4:
+        return np.zeros((0, 20))
+    return row[np.newaxis]
+
+
+def assemble_subsets(candidate, connection_all, special_k, limbSeq):
+    """
+    Group limb connections into people. Every row of the subset table is a
+    person; rows that are merged are joined in a disjoint-set forest and the
+    merged person keeps the row created first, so rows come out in the same
+    order as when they were grown and deleted one at a time. Each peak
+    remembers the rows it was placed in, so a connection only looks at the
+    rows holding its own two peaks instead of scanning every person.
+
+    Args:
+        candidate (numpy.ndarray): n x 4 rows of x, y, score and id.
+        connection_all (list): Per-limb connections from connect_limb.
+        special_k (list): Limbs for which one of the parts had no peaks.
+        limbSeq (list): 1-based part pairs of each limb.
+    Returns:
+        (numpy.ndarray): m x 20 subset; 0-17 are indices in candidate, 18 is
+            the total score and 19 is the number of parts.
+    """
+    # at most one row is created per connection of the first 17 limbs
+    capacity = sum(len(connection_all[k]) for k in range(min(17, len(limbSeq))) if k not in special_k)
+    # last number in each row is the total parts number of that person
+    # the second last number in each row is the score of the overall configuration
+    subset = -1 * np.ones((capacity, 20))
+    parent = np.arange(capacity)
+    alive = np.zeros(capacity, dtype=bool)
+    count = 0
+    owners = [[] for _ in range(len(candidate))]
+
+    def find(j):
+        root = j
+        while parent[root] != root:
+            root = parent[root]
+        while parent[j] != root:
+            parent[j], j = root, parent[j]
+        return root
+
+    def holding(peak, part):
+        # a peak can be overwritten in a row after it was placed there
+        return {j for j in map(find, owners[peak]) if subset[j][part] == peak}
+
+    for k in range(len(limbSeq)):
+        if k in special_k:
+            continue
+        indexA, indexB = np.array(limbSeq[k]) - 1
+        for partA, partB, score, _, _ in connection_all[k]:
+            a, b = int(partA), int(partB)
+            # the first two rows in table order, as found by a scan
+            subset_idx = sorted(holding(a, indexA) | holding(b, indexB))[:2]
+
+            if len(subset_idx) == 1:
+                j = subset_idx[0]
+                if subset[j][indexB] != partB:
+                    subset[j][indexB] = partB
+                    owners[b].append(j)
+                    subset[j][-1] += 1
+                    subset[j][-2] += candidate[b, 2] + score
+            elif len(subset_idx) == 2:  # if found 2 and disjoint, merge them
+                j1, j2 = subset_idx
+                if not np.any((subset[j1][:-2] >= 0) & (subset[j2][:-2] >= 0)):  # merge
+                    subset[j1][:-2] += (subset[j2][:-2] + 1)
+                    subset[j1][-2:] += subset[j2][-2:]
+                    subset[j1][-2] += score
+                    parent[j2] = j1
+                    alive[j2] = False
+                else:  # as like found == 1
+                    subset[j1][indexB] = partB
+                    owners[b].append(j1)
+                    subset[j1][-1] += 1
+                    subset[j1][-2] += candidate[b, 2] + score
+
+            # if find no partA in the subset, create a new subset
+            elif k < 17:
+                row = subset[count]
+                row[indexA] = partA
+                row[indexB] = partB
+                row[-1] = 2
+                row[-2] = sum(candidate[[a, b], 2]) + score
+                owners[a].append(count)
+                owners[b].append(count)
+                alive[count] = True
+                count += 1
+
+    # delete some rows of subset which has few parts occur
+    subset = subset[alive]
+    return subset[~((subset[:, -1] < 4) | (subset[:, -2] / subset[:, -1] < 0.4))]
+
+
 class Body(object):
-    def __init__(self, model_path):
-        self.model = bodypose_model()
-        if torch.cuda.is_available():
-            self.model = self.model.cuda()
-        model_dict = util.transfer(self.model, torch.load(model_path))
-        self.model.load_state_dict(model_dict)
-        self.model.eval()
+    # scale_search = [0.5, 1.0, 1.5, 2.0]
+    scale_search = [0.5]
+    boxsize = 368
+    stride = 8
+    padValue = 128
+    # with a region of interest and a compiled model, the input width is
+    # padded up to a multiple of this, so crops of every width share a few
+    # compiled graphs instead of compiling one per width
+    roiWidthMultiple = 64
+
+    # decode == 'image' upsamples the network outputs to the frame size
+    # before decoding. decode == 'network' decodes on the stride 8 output
+    # grid and only maps the final keypoints back to the frame, optionally
+    # refining them to sub-pixel positions. stages truncates the network
+    # after that many of its six stages. backend names the entry of BACKENDS
+    # that runs the network. For the 'torch' backend, precision selects
+    # 'float32', 'bfloat16' or 'int8' inference; the reduced precisions run on
+    # the CPU and are calibrated on calibration_images, the shipped reference
+    # poses by default. compile_mode 'trace', 'script' or 'compile' runs the
+    # model as a compiled graph cached next to model_path, traced for each
+    # input shape; other backends reject these options. single_person skips
+    # multi-person grouping and returns at most one person, built from the
+    # best peak of each part. max_limb_length, as a fraction of the frame
+    # height, skips scoring pairs of peaks that are further apart; None scores
+    # every pair. timing records how long each phase of the pipeline takes in
+    # stats. roi 'keypoints' or 'foreground' treats the frames passed to
+    # __call__ as a video and only analyzes the region around the previous
+    # frame's keypoints or the moving foreground.
+    def __init__(self, model_path, decode='image', subpixel=False, stages=6, backend='torch',
+                 precision='float32', calibration_images=None, compile_mode=None, single_person=False,
+                 max_limb_length=1.0, timing=False, roi=None):
+        if decode not in ('image', 'network'):
+            raise ValueError(f"decode must be 'image' or 'network', not {decode!r}")
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {tuple(BACKENDS)}, not {backend!r}")
+        if backend != 'torch' and (precision != 'float32' or compile_mode is not None
+                                   or calibration_images is not None):
+            raise ValueError(f"precision, compile_mode and calibration_images only apply to the 'torch' "
+                             f"backend, not {backend!r}")
+        self.decode = decode
+        self.subpixel = subpixel
+        self.single_person = single_person
+        self.max_limb_length = max_limb_length
+        self.stats = PipelineStats(enabled=timing)
+        self.roi = None if roi is None else RoiSelector(roi)
+        self.widthMultiple = self.stride
+        if roi is not None and compile_mode is not None:
+            self.widthMultiple = self.roiWidthMultiple
+        # float32 scratch arrays reused from call to call
+        self.arena = BufferArena()
+        if backend == 'torch':
+            def calibration_inputs():
+                images = calibration_images
+                if images is None:
+                    images = load_calibration_images()
+                # copied, as each call reuses the same input buffer
+                return [self._preprocess([image], self.scale_search[0])[0].copy() for image in images]
+            self.backend = TorchBackend(model_path, stages, precision, calibration_inputs, compile_mode)
+        else:
+            self.backend = BACKENDS[backend](model_path, stages)
 
     def __call__(self, oriImg):
-        # scale_search = [0.5, 1.0, 1.5, 2.0]
-        scale_search = [0.5]
-        boxsize = 368
-        stride = 8
-        padValue = 128
+        if self.roi is None:
+            return self.batch([oriImg])[0]
+        x0, y0, x1, y1 = self.roi.select(oriImg)
+        # the limb length prior is measured against the whole frame, so a
+        # person is scored the same in a crop as in the full frame
+        candidate, subset = self.batch([oriImg[y0:y1, x0:x1]], [oriImg.shape[0]])[0]
+        candidate = self.roi.to_frame(candidate)
+        self.roi.observe(candidate, subset)
+        return candidate, subset
+
+    def batch(self, frames, frameHeights=None):
+        """
+        Estimate poses for several frames with a single forward pass per
+        scale for each frame size. Frames of the same size are resized,
+        stacked into one NCHW tensor and pushed through the network together,
+        so each frame gets the same poses as __call__ would find in it.
+
+        Args:
+            frames (list): BGR images as numpy arrays.
+            frameHeights (list): Height in pixels of the frame each image was
+                cropped from, used by the limb length prior, or None if the
+                images are whole frames.
+        Returns:
+            (list): One (candidate, subset) tuple per frame, in the same
+                format as __call__.
+        """
+        if len(frames) == 0:
+            return []
+        shapes = list(dict.fromkeys(frame.shape for frame in frames))
+        if len(shapes) > 1:
+            # padding a frame up to a larger one changes the network output
+            # near its edges, so each size runs in its own pass
+            results = [None] * len(frames)
+            for shape in shapes:
+                indices = [n for n, frame in enumerate(frames) if frame.shape == shape]
+                heights = None if frameHeights is None else [frameHeights[n] for n in indices]
+                for n, result in zip(indices, self.batch([frames[n] for n in indices], heights)):
+                    results[n] = result
+            return results
+        scale_search = self.scale_search
+        stride = self.stride
+        # the network runs on every scale first, so the frames can then be
+        # decoded one at a time through a single set of scratch arrays
+        outputs = []
+        for m in range(len(scale_search)):
+            with self.stats.time('resize'):
+                data, testShapes = self._preprocess(frames, scale_search[m])
+            with self.stats.time('forward'):
+                outputs.append(self.backend(data) + (testShapes,))
+        # size of each frame resized for the first scale, whose output grid
+        # is decoded in network mode
+        gridShapes = outputs[0][2]
+
+        results = []
+        for n, oriImg in enumerate(frames):
+            with self.stats.time('upsample'):
+                if self.decode == 'network':
+                    shape = (-(-gridShapes[n][0] // stride), -(-gridShapes[n][1] // stride))
+                else:
+                    shape = oriImg.shape[:2]
+                for m, (Mconv7_L1, Mconv7_L2, testShapes) in enumerate(outputs):
+                    if m == 0:
+                        # the first scale is written straight into the averages
+                        heatmap_avg = heatmap = self.arena.get('heatmap_avg', shape + (19,))
+                        paf_avg = paf = self.arena.get('paf_avg', shape + (38,))
+                    else:
+                        heatmap = self.arena.get('heatmap', shape + (19,))
+                        paf = self.arena.get('paf', shape + (38,))
+
+                    # extract outputs, resize, and remove padding
+                    if self.decode == 'network':
+                        self._crop(Mconv7_L2[n], testShapes[n], stride, heatmap)  # output 1 is heatmaps
+                        self._crop(Mconv7_L1[n], testShapes[n], stride, paf)  # output 0 is PAFs
+                    else:
+                        self._upsample(Mconv7_L2[n], testShapes[n], stride, heatmap, self.arena)  # output 1 is heatmaps
+                        self._upsample(Mconv7_L1[n], testShapes[n], stride, paf, self.arena)  # output 0 is PAFs
+
+                    if len(scale_search) > 1:
+                        heatmap /= len(scale_search)
+                        paf /= len(scale_search)
+                    if m > 0:
+                        heatmap_avg *= 2
+                        heatmap_avg += heatmap
+                        paf_avg += paf
+
+            frameHeight = oriImg.shape[0] if frameHeights is None else frameHeights[n]
+            if self.decode == 'network':
+                # grid units per frame pixel
+                gridScale = gridShapes[n][0] / (stride * oriImg.shape[0])
+                candidate, subset = self._decode(heatmap_avg, paf_avg, frameHeight * gridScale,
+                                                 sigma=3 * gridScale)
+                # a grid cell centre maps to the frame the same way the cubic
+                # upsampling in image mode maps it
+                candidate[:, 0] = (candidate[:, 0] + 0.5) * stride * oriImg.shape[1] / gridShapes[n][1] - 0.5
+                candidate[:, 1] = (candidate[:, 1] + 0.5) * stride * oriImg.shape[0] / gridShapes[n][0] - 0.5
+            else:
+                candidate, subset = self._decode(heatmap_avg, paf_avg, frameHeight)
+            results.append((candidate, subset))
+        return results
+
+    def _preprocess(self, frames, scale_factor):
+        # resize each frame for one scale and write the results into a single
+        # normalized NCHW float32 array, returning it and the resized sizes
+        sizes = []
+        for oriImg in frames:
+            scale = scale_factor * self.boxsize / oriImg.shape[0]
+            sizes.append((round(oriImg.shape[0] * scale), round(oriImg.shape[1] * scale)))
+
+        def resized():
+            for oriImg, size in zip(frames, sizes):
+                scale = scale_factor * self.boxsize / oriImg.shape[0]
+                # cv2 writes into the buffer when it already has the size it
+                # picks for fx and fy, which keep the exact scale. Every frame
+                # shares the buffer, as _stack copies each one before the
+                # next is resized.
+                out = self.arena.get('resized', size + oriImg.shape[2:], oriImg.dtype)
+                yield cv2.resize(oriImg, (0, 0), dst=out, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        return self._stack(resized(), self.stride, self.padValue, self.arena, self.widthMultiple, sizes), sizes
+
+    @staticmethod
+    def _stack(images, stride, padValue, arena, widthMultiple=None, sizes=None):
+        # pad every image down/right to a shared size that is a multiple of
+        # stride, so a single image is padded exactly as padRightDownCorner
+        # would pad it, and whose width is a multiple of widthMultiple if
+        # given. Each colour plane is copied once, straight into its place in
+        # the input array, and the whole batch is then normalized in place;
+        # the backends wrap the array without copying it. Given the (height,
+        # width) of each image in sizes, images can be an iterator that
+        # produces each image only once the previous one has been copied.
+        widthMultiple = widthMultiple or stride
+        if sizes is None:
+            images = list(images)
+            sizes = [image.shape[:2] for image in images]
+        height = max(h for h, _ in sizes)
+        width = max(w for _, w in sizes)
+        shape = (-(-height // stride) * stride, -(-width // widthMultiple) * widthMultiple)
+        im = arena.get('input', (len(sizes), 3) + shape)
+        for image, out in zip(images, im):
+            h, w = image.shape[:2]
+            for plane, channel in zip(cv2.split(image), out):
+                np.copyto(channel[:h, :w], plane)
+            out[:, h:] = padValue
+            out[:, :h, w:] = padValue
+        im /= 256
+        im -= 0.5
+        return im
+
+    @staticmethod
+    def _upsample(output, testShape, stride, out, arena):
+        # resize the stride 8 output up to the padded input, drop the padding
+        # and resize to the frame, writing the result into out
+        name = f'upsample{output.shape[0]}'
+        grid = arena.get(name + '_grid', output.shape[1:] + output.shape[:1])
+        np.copyto(grid, output.transpose(1, 2, 0))
+        upsampled = arena.get(name, (grid.shape[0] * stride, grid.shape[1] * stride, grid.shape[2]))
+        cv2.resize(grid, upsampled.shape[1::-1], dst=upsampled, interpolation=cv2.INTER_CUBIC)
+        cv2.resize(upsampled[:testShape[0], :testShape[1]], out.shape[1::-1], dst=out,
+                   interpolation=cv2.INTER_CUBIC)
+        return out
+
+    @staticmethod
+    def _crop(output, testShape, stride, out):
+        # keep the output cells that cover the resized frame, resampling
+        # other scales onto the first scale's grid in out
+        output = np.transpose(output, (1, 2, 0))
+        output = output[:-(-testShape[0] // stride), :-(-testShape[1] // stride), :]
+        if output.shape[:2] != out.shape[:2]:
+            cv2.resize(output, out.shape[1::-1], dst=out, interpolation=cv2.INTER_CUBIC)
+        else:
+            np.copyto(out, output)
+        return out
+
+    # imageHeight is the frame height in units of heatmap_avg pixels, used
+    # by the limb length prior
+    def _decode(self, heatmap_avg, paf_avg, imageHeight, sigma=3):
         thre1 = 0.1
         thre2 = 0.05
-        multiplier = [x * boxsize / oriImg.shape[0] for x in scale_search]
-        heatmap_avg = np.zeros((oriImg.shape[0], oriImg.shape[1], 19))
-        paf_avg = np.zeros((oriImg.shape[0], oriImg.shape[1], 38))
-
-        for m in range(len(multiplier)):
-            scale = multiplier[m]
-            imageToTest = cv2.resize(oriImg, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
-            imageToTest_padded, pad = util.padRightDownCorner(imageToTest, stride, padValue)
-            im = np.transpose(np.float32(imageToTest_padded[:, :, :, np.newaxis]), (3, 2, 0, 1)) / 256 - 0.5
-            im = np.ascontiguousarray(im)
-
-            data = torch.from_numpy(im).float()
-            if torch.cuda.is_available():
-                data = data.cuda()
-            # data = data.permute([2, 0, 1]).unsqueeze(0).float()
-            with torch.no_grad():
-                Mconv7_stage6_L1, Mconv7_stage6_L2 = self.model(data)
-            Mconv7_stage6_L1 = Mconv7_stage6_L1.cpu().numpy()
-            Mconv7_stage6_L2 = Mconv7_stage6_L2.cpu().numpy()
-
-            # extract outputs, resize, and remove padding
-            # heatmap = np.transpose(np.squeeze(net.blobs[output_blobs.keys()[1]].data), (1, 2, 0))  # output 1 is heatmaps
-            heatmap = np.transpose(np.squeeze(Mconv7_stage6_L2), (1, 2, 0))  # output 1 is heatmaps
-            heatmap = cv2.resize(heatmap, (0, 0), fx=stride, fy=stride, interpolation=cv2.INTER_CUBIC)
-            heatmap = heatmap[:imageToTest_padded.shape[0] - pad[2], :imageToTest_padded.shape[1] - pad[3], :]
-            heatmap = cv2.resize(heatmap, (oriImg.shape[1], oriImg.shape[0]), interpolation=cv2.INTER_CUBIC)
-
-            # paf = np.transpose(np.squeeze(net.blobs[output_blobs.keys()[0]].data), (1, 2, 0))  # output 0 is PAFs
-            paf = np.transpose(np.squeeze(Mconv7_stage6_L1), (1, 2, 0))  # output 0 is PAFs
-            paf = cv2.resize(paf, (0, 0), fx=stride, fy=stride, interpolation=cv2.INTER_CUBIC)
-            paf = paf[:imageToTest_padded.shape[0] - pad[2], :imageToTest_padded.shape[1] - pad[3], :]
-            paf = cv2.resize(paf, (oriImg.shape[1], oriImg.shape[0]), interpolation=cv2.INTER_CUBIC)
-
-            heatmap_avg += heatmap_avg + heatmap / len(multiplier)
-            paf_avg += + paf / len(multiplier)
-
-        all_peaks = []
-        peak_counter = 0
-
-        for part in range(18):
-            map_ori = heatmap_avg[:, :, part]
-            one_heatmap = gaussian_filter(map_ori, sigma=3)
-
-            map_left = np.zeros(one_heatmap.shape)
-            map_left[1:, :] = one_heatmap[:-1, :]
-            map_right = np.zeros(one_heatmap.shape)
-            map_right[:-1, :] = one_heatmap[1:, :]
-            map_up = np.zeros(one_heatmap.shape)
-            map_up[:, 1:] = one_heatmap[:, :-1]
-            map_down = np.zeros(one_heatmap.shape)
-            map_down[:, :-1] = one_heatmap[:, 1:]
-
-            peaks_binary = np.logical_and.reduce(
-                (one_heatmap >= map_left, one_heatmap >= map_right, one_heatmap >= map_up, one_heatmap >= map_down, one_heatmap > thre1))
-            peaks = list(zip(np.nonzero(peaks_binary)[1], np.nonzero(peaks_binary)[0]))  # note reverse
-            peaks_with_score = [x + (map_ori[x[1], x[0]],) for x in peaks]
-            peak_id = range(peak_counter, peak_counter + len(peaks))
-            peaks_with_score_and_id = [peaks_with_score[i] + (peak_id[i],) for i in range(len(peak_id))]
-
-            all_peaks.append(peaks_with_score_and_id)
-            peak_counter += len(peaks)
+
+        with self.stats.time('peaks'):
+            peaks = find_peaks(heatmap_avg[:, :, :18], thre1, sigma, self.subpixel, self.arena)
+        # candidate rows are x, y, score, id; all_peaks holds one view of
+        # candidate per part
+        candidate = np.column_stack((peaks['x'], peaks['y'], peaks['score'], peaks['id']))
+        all_peaks = np.split(candidate, np.searchsorted(peaks['part'], np.arange(1, 18)))
 
         # find connection in the specified sequence, center 29 is in the position 15
         limbSeq = [[2, 3], [2, 6], [3, 4], [4, 5], [6, 7], [7, 8], [2, 9], [9, 10], \
@@ -122,105 +611,31 @@ class Body(object):
         special_k = []
         mid_num = 10
 
-        for k in range(len(mapIdx)):
-            score_mid = paf_avg[:, :, [x - 19 for x in mapIdx[k]]]
-            candA = all_peaks[limbSeq[k][0] - 1]
-            candB = all_peaks[limbSeq[k][1] - 1]
-            nA = len(candA)
-            nB = len(candB)
-            indexA, indexB = limbSeq[k]
-            if (nA != 0 and nB != 0):
-                connection_candidate = []
-                for i in range(nA):
-                    for j in range(nB):
-                        vec = np.subtract(candB[j][:2], candA[i][:2])
-                        norm = math.sqrt(vec[0] * vec[0] + vec[1] * vec[1])
-                        norm = max(0.001, norm)
-                        vec = np.divide(vec, norm)
-
-                        startend = list(zip(np.linspace(candA[i][0], candB[j][0], num=mid_num), \
-                                            np.linspace(candA[i][1], candB[j][1], num=mid_num)))
-
-                        vec_x = np.array([score_mid[int(round(startend[I][1])), int(round(startend[I][0])), 0] \
-                                          for I in range(len(startend))])
-                        vec_y = np.array([score_mid[int(round(startend[I][1])), int(round(startend[I][0])), 1] \
-                                          for I in range(len(startend))])
-
-                        score_midpts = np.multiply(vec_x, vec[0]) + np.multiply(vec_y, vec[1])
-                        score_with_dist_prior = sum(score_midpts) / len(score_midpts) + min(
-                            0.5 * oriImg.shape[0] / norm - 1, 0)
-                        criterion1 = len(np.nonzero(score_midpts > thre2)[0]) > 0.8 * len(score_midpts)
-                        criterion2 = score_with_dist_prior > 0
-                        if criterion1 and criterion2:
-                            connection_candidate.append(
-                                [i, j, score_with_dist_prior, score_with_dist_prior + candA[i][2] + candB[j][2]])
-
-                connection_candidate = sorted(connection_candidate, key=lambda x: x[2], reverse=True)
-                connection = np.zeros((0, 5))
-                for c in range(len(connection_candidate)):
-                    i, j, s = connection_candidate[c][0:3]
-                    if (i not in connection[:, 3] and j not in connection[:, 4]):
-                        connection = np.vstack([connection, [candA[i][3], candB[j][3], s, i, j]])
-                        if (len(connection) >= min(nA, nB)):
-                            break
-
-                connection_all.append(connection)
-            else:
-                special_k.append(k)
-                connection_all.append([])
-
-        # last number in each row is the total parts number of that person
-        # the second last number in each row is the score of the overall configuration
-        subset = -1 * np.ones((0, 20))
-        candidate = np.array([item for sublist in all_peaks for item in sublist])
-
-        for k in range(len(mapIdx)):
-            if k not in special_k:
-                partAs = connection_all[k][:, 0]
-                partBs = connection_all[k][:, 1]
-                indexA, indexB = np.array(limbSeq[k]) - 1
-
-                for i in range(len(connection_all[k])):  # = 1:size(temp,1)
-                    found = 0
-                    subset_idx = [-1, -1]
-                    for j in range(len(subset)):  # 1:size(subset,1):
-                        if subset[j][indexA] == partAs[i] or subset[j][indexB] == partBs[i]:
-                            subset_idx[found] = j
-                            found += 1
-
-                    if found == 1:
-                        j = subset_idx[0]
-                        if subset[j][indexB] != partBs[i]:
-                            subset[j][indexB] = partBs[i]
-                            subset[j][-1] += 1
-                            subset[j][-2] += candidate[partBs[i].astype(int), 2] + connection_all[k][i][2]
-                    elif found == 2:  # if found 2 and disjoint, merge them
-                        j1, j2 = subset_idx
-                        membership = ((subset[j1] >= 0).astype(int) + (subset[j2] >= 0).astype(int))[:-2]
-                        if len(np.nonzero(membership == 2)[0]) == 0:  # merge
-                            subset[j1][:-2] += (subset[j2][:-2] + 1)
-                            subset[j1][-2:] += subset[j2][-2:]
-                            subset[j1][-2] += connection_all[k][i][2]
-                            subset = np.delete(subset, j2, 0)
-                        else:  # as like found == 1
-                            subset[j1][indexB] = partBs[i]
-                            subset[j1][-1] += 1
-                            subset[j1][-2] += candidate[partBs[i].astype(int), 2] + connection_all[k][i][2]
-
-                    # if find no partA in the subset, create a new subset
-                    elif not found and k < 17:
-                        row = -1 * np.ones(20)
-                        row[indexA] = partAs[i]
-                        row[indexB] = partBs[i]
-                        row[-1] = 2
-                        row[-2] = sum(candidate[connection_all[k][i, :2].astype(int), 2]) + connection_all[k][i][2]
-                        subset = np.vstack([subset, row])
-        # delete some rows of subset which has few parts occur
-        deleteIdx = []
-        for i in range(len(subset)):
-            if subset[i][-1] < 4 or subset[i][-2] / subset[i][-1] < 0.4:
-                deleteIdx.append(i)
-        subset = np.delete(subset, deleteIdx, axis=0)
+        if self.single_person:
+            # the first 17 limbs form a tree rooted at the neck; the last two
+            # only link the ears to the shoulders
+            with self.stats.time('assembly'):
+                subset = single_person_subset(all_peaks, paf_avg, limbSeq[:17], mapIdx[:17], imageHeight, thre2,
+                                              mid_num=mid_num)
+            return candidate, subset
+
+        max_length = None if self.max_limb_length is None else self.max_limb_length * imageHeight
+        with self.stats.time('paf'):
+            for k in range(len(mapIdx)):
+                candA = all_peaks[limbSeq[k][0] - 1]
+                candB = all_peaks[limbSeq[k][1] - 1]
+                nA = len(candA)
+                nB = len(candB)
+                if (nA != 0 and nB != 0):
+                    connection = connect_limb(candA, candB, paf_avg, [x - 19 for x in mapIdx[k]],
+                                              imageHeight, thre2, mid_num, max_length)
+                    connection_all.append(connection)
+                else:
+                    special_k.append(k)
+                    connection_all.append([])
+
+        with self.stats.time('assembly'):
+            subset = assemble_subsets(candidate, connection_all, special_k, limbSeq)
 
         # subset: n*20 array, 0-17 is the index in candidate, 18 is the total score, 19 is the total parts
         # candidate: x, y, score, id
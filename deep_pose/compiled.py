@@ -0,0 +1,95 @@
+"""
+Compiled execution of bodypose_model. The model can be traced or scripted with
+TorchScript, or wrapped with torch.compile, so inference runs a fused graph
+instead of going through the Python dispatcher layer by layer. Compiled
+artifacts are cached on disk, keyed by the weights they were compiled from
+and, for traced graphs, by input shape, so later launches reuse them instead
+of compiling again.
+"""
+
+import os
+
+import torch
+
+COMPILE_MODES = ('trace', 'script', 'compile')
+
+
+class CompiledModel(object):
+    """
+    Dispatch each input to a graph compiled for its shape.
+
+    For 'trace', each shape's frozen TorchScript module is saved as
+    <cache_dir>/<tag>.trace.<N>x<C>x<H>x<W>.pt and loaded from there when it
+    already exists. A scripted module works for every shape, so 'script'
+    keeps a single <cache_dir>/<tag>.script.pt. For 'compile', torch.compile
+    specializes on each shape and Inductor's kernel cache lives in
+    <cache_dir>/inductor_cache.
+
+    Attributes:
+        model (torch.nn.Module): The eager model being compiled.
+        mode (str): One of COMPILE_MODES.
+        cache_dir (str): Directory the compiled artifacts are kept in.
+        tag (str): Prefix that identifies the weights and model options in
+            cached file names, which should include weights_fingerprint so
+            replaced weights are not run with a stale graph.
+    """
+
+    def __init__(self, model, mode, cache_dir, tag):
+        if mode not in COMPILE_MODES:
+            raise ValueError(f"mode must be one of {COMPILE_MODES}, not {mode!r}")
+        self.model = model
+        self.mode = mode
+        self.cache_dir = cache_dir
+        self.tag = tag
+        self._graphs = {}
+        if mode == 'compile':
+            # Inductor reads its cache location from the environment each
+            # time it looks up or stores a compiled kernel.
+            os.environ['TORCHINDUCTOR_CACHE_DIR'] = os.path.join(cache_dir, 'inductor_cache')
+            self._compiled = torch.compile(model, dynamic=False)
+
+    def __call__(self, data):
+        # a scripted graph is shared by every shape
+        key = None if self.mode == 'script' else tuple(data.shape)
+        if key not in self._graphs:
+            self._graphs[key] = self._load_or_compile(data)
+        return self._graphs[key](data)
+
+    def cache_path(self, shape):
+        """
+        Return the file a TorchScript graph for the given input shape is
+        cached in. Scripted graphs do not depend on the shape.
+        """
+        if self.mode == 'script':
+            return os.path.join(self.cache_dir, f"{self.tag}.script.pt")
+        dims = 'x'.join(str(dim) for dim in shape)
+        return os.path.join(self.cache_dir, f"{self.tag}.{self.mode}.{dims}.pt")
+
+    def _load_or_compile(self, data):
+        if self.mode == 'compile':
+            return self._compiled
+        path = self.cache_path(data.shape)
+        if os.path.exists(path):
+            return torch.jit.load(path, map_location=data.device)
+        with torch.no_grad():
+            if self.mode == 'trace':
+                graph = torch.jit.trace(self.model, data)
+            else:
+                graph = torch.jit.script(self.model)
+            graph = torch.jit.freeze(graph.eval())
+        torch.jit.save(graph, path)
+        return graph
+
+
+def weights_fingerprint(model_path):
+    """
+    Identify the contents of a weights file cheaply, from its size and
+    modification time, so graphs compiled from other weights are not reused.
+
+    Args:
+        model_path (str): Path to the weights.
+    Returns:
+        (str): A short hexadecimal fingerprint.
+    """
+    stat = os.stat(model_path)
+    return f"{stat.st_size:x}{stat.st_mtime_ns:x}"
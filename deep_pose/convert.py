@@ -0,0 +1,62 @@
+"""
+Convert the body pose weights into a checkpoint that loads without any key
+renaming and can be memory mapped, so several game processes on one machine
+share the weight pages and startup does not deserialize the whole file.
+
+The float32 checkpoint holds the state dict in bodypose_model key order. The
+int8 checkpoint holds the calibrated, conv-ReLU fused quantized model, so
+loading it also skips calibration. Run it once from the repository root:
+
+    python -m deep_pose.convert deep_pose/body_pose_model.pth \
+        deep_pose/body_pose_model.int8.pth --precision int8
+"""
+
+import argparse
+
+import torch
+
+from deep_pose.backend import CHECKPOINT_FORMAT, load_model
+from deep_pose.body import Body
+
+
+def convert(model_path, output_path, precision='float32', stages=6):
+    """
+    Write a converted checkpoint.
+
+    Args:
+        model_path (str): Path to the caffe-style body pose weights.
+        output_path (str): Path to write the converted checkpoint to.
+        precision (str): 'float32', or 'int8' to store the model quantized
+            and calibrated on the shipped reference poses.
+        stages (int): Number of network stages an int8 checkpoint runs. The
+            float32 checkpoint works for any number of stages.
+    """
+    if precision == 'float32':
+        model, _ = load_model(model_path)
+    elif precision == 'int8':
+        model = Body(model_path, stages=stages, precision='int8').backend.model
+    else:
+        raise ValueError(f"precision must be 'float32' or 'int8', not {precision!r}")
+    torch.save({
+        'format': CHECKPOINT_FORMAT,
+        'precision': precision,
+        'stages': stages,
+        'state_dict': model.state_dict(),
+    }, output_path)
+
+
+def main():
+    """
+    Parse the command line and convert the given checkpoint.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('model_path', help='caffe-style body pose weights')
+    parser.add_argument('output_path', help='where to write the converted checkpoint')
+    parser.add_argument('--precision', choices=('float32', 'int8'), default='float32')
+    parser.add_argument('--stages', type=int, default=6, help='stages an int8 checkpoint runs')
+    args = parser.parse_args()
+    convert(args.model_path, args.output_path, args.precision, args.stages)
+
+
+if __name__ == '__main__':
+    main()
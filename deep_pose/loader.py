@@ -0,0 +1,85 @@
+"""
+Background loading for Body. Importing deep_pose.body pulls in PyTorch and
+building a Body loads the network weights, both of which take several seconds.
+BackgroundBody defers that work to a thread so a game can show its first
+screen while the model loads, and only blocks when a frame is analyzed before
+loading has finished.
+"""
+
+import threading
+
+import numpy as np
+
+
+class BackgroundBody(object):
+    """
+    Stand-in for Body that builds it on a background thread and runs a warm-up
+    inference once it is loaded.
+
+    Attributes:
+        model_path (str): Path to the body pose weights.
+        options (dict): Keyword arguments passed on to Body.
+        warmup_shape (tuple): Shape of the blank frame used to warm up the
+            model, or None to skip the warm-up.
+    """
+
+    def __init__(self, model_path, warmup_shape=(480, 640, 3), **options):
+        self.model_path = model_path
+        self.options = options
+        self.warmup_shape = warmup_shape
+        self._body = None
+        self._error = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        """
+        Return whether the model has finished loading and warming up. A load
+        that failed is not ready.
+        """
+        return self._thread is not None and not self._thread.is_alive() and self._error is None
+
+    def start(self):
+        """
+        Start loading the model in the background, if it has not started yet.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="body-loader", daemon=True)
+                self._thread.start()
+
+    def get(self):
+        """
+        Return the loaded Body, starting and waiting for the load as needed.
+
+        Returns:
+            (Body): The loaded and warmed up body pose estimator.
+        """
+        self.start()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._body
+
+    def __call__(self, oriImg):
+        return self.get()(oriImg)
+
+    def batch(self, frames, frameHeights=None):
+        """
+        Estimate poses for several frames, see Body.batch.
+        """
+        return self.get().batch(frames, frameHeights)
+
+    def _load(self):
+        try:
+            # Imported here so that importing this module does not load torch.
+            from deep_pose.body import Body
+
+            body = Body(self.model_path, **self.options)
+            if self.warmup_shape is not None:
+                body(np.zeros(self.warmup_shape, dtype=np.uint8))
+            self._body = body
+        except Exception as error:  # pylint: disable=broad-except
+            # Raised again in the thread that asks for the model.
+            self._error = error
@@ -29,8 +29,14 @@ def make_layers(block, no_relu_layers):
     return nn.Sequential(OrderedDict(layers))
 
 class bodypose_model(nn.Module):
-    def __init__(self):
+    # stages is the number of stages to run, from 1 to 6. Every stage is
+    # still built so the same weights load for any value, but forward stops
+    # after the given stage and returns its L1 (PAF) and L2 (heatmap) outputs.
+    def __init__(self, stages=6):
         super(bodypose_model, self).__init__()
+        if not 1 <= stages <= 6:
+            raise ValueError(f"stages must be between 1 and 6, not {stages}")
+        self.stages = stages
 
         # these layers have no relu layer
         no_relu_layers = ['conv5_5_CPM_L1', 'conv5_5_CPM_L2', 'Mconv7_stage2_L1',\
@@ -124,22 +130,32 @@ class bodypose_model(nn.Module):
 
         out1_1 = self.model1_1(out1)
         out1_2 = self.model1_2(out1)
+        if self.stages == 1:
+            return out1_1, out1_2
         out2 = torch.cat([out1_1, out1_2, out1], 1)
 
         out2_1 = self.model2_1(out2)
         out2_2 = self.model2_2(out2)
+        if self.stages == 2:
+            return out2_1, out2_2
         out3 = torch.cat([out2_1, out2_2, out1], 1)
 
         out3_1 = self.model3_1(out3)
         out3_2 = self.model3_2(out3)
+        if self.stages == 3:
+            return out3_1, out3_2
         out4 = torch.cat([out3_1, out3_2, out1], 1)
 
         out4_1 = self.model4_1(out4)
         out4_2 = self.model4_2(out4)
+        if self.stages == 4:
+            return out4_1, out4_2
         out5 = torch.cat([out4_1, out4_2, out1], 1)
 
         out5_1 = self.model5_1(out5)
         out5_2 = self.model5_2(out5)
+        if self.stages == 5:
+            return out5_1, out5_2
         out6 = torch.cat([out5_1, out5_2, out1], 1)
 
         out6_1 = self.model6_1(out6)
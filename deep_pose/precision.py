@@ -0,0 +1,119 @@
+"""
+Reduced precision CPU inference for bodypose_model. The model can either be
+quantized to int8 with PyTorch's post-training static quantization, or run
+under bfloat16 autocast. Both conversions are checked against the float32
+model on a set of calibration images, which default to the reference poses
+shipped in images/poses.
+"""
+
+import glob
+
+import cv2
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+PRECISIONS = ('float32', 'bfloat16', 'int8')
+
+# images used to calibrate and check the reduced precision models
+CALIBRATION_IMAGES = 'images/poses/*.png'
+
+
+def load_calibration_images(pattern=CALIBRATION_IMAGES):
+    """
+    Read the calibration images as BGR arrays, as Body expects them.
+
+    Args:
+        pattern (str): Glob pattern matching the images to read.
+    Returns:
+        (list): The images, sorted by path.
+    """
+    images = [cv2.imread(path) for path in sorted(glob.glob(pattern))]
+    if len(images) == 0:
+        raise FileNotFoundError(f"no calibration images match {pattern}")
+    return images
+
+
+class Bfloat16Model(nn.Module):
+    """
+    Run a float32 model under CPU bfloat16 autocast and hand back float32
+    outputs, so the convolutions run in bfloat16 without changing callers.
+    """
+
+    def __init__(self, model):
+        super(Bfloat16Model, self).__init__()
+        self.model = model
+
+    def forward(self, x):
+        with torch.autocast('cpu', dtype=torch.bfloat16):
+            outputs = self.model(x)
+        return tuple(output.float() for output in outputs)
+
+
+def quantize_int8(model, inputs):
+    """
+    Quantize a float32 model to int8 with FX graph mode static quantization,
+    observing activation ranges on the calibration inputs.
+
+    Args:
+        model (torch.nn.Module): The float32 model, in eval mode on the CPU.
+        inputs (list): Preprocessed NCHW input tensors used for calibration.
+    Returns:
+        (torch.fx.GraphModule): The quantized model.
+    """
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs=(inputs[0],))
+    with torch.no_grad():
+        for data in inputs:
+            prepared(data)
+    return convert_fx(prepared)
+
+
+def int8_structure(model, example_input):
+    """
+    Build the quantized form of a model without calibrating it, so the
+    parameters of a previously quantized model can be loaded into it.
+
+    Args:
+        model (torch.nn.Module): The float32 model, in eval mode on the CPU.
+        example_input (torch.Tensor): An input used to trace the model.
+    Returns:
+        (torch.fx.GraphModule): The quantized model with placeholder
+            quantization parameters.
+    """
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    return convert_fx(prepare_fx(model, qconfig_mapping, example_inputs=(example_input,)))
+
+
+def convert_precision(model, precision, inputs):
+    """
+    Convert a float32 model to the given precision and measure how far its
+    heatmaps move on the calibration inputs.
+
+    Args:
+        model (torch.nn.Module): The float32 model, in eval mode on the CPU.
+        precision (str): One of PRECISIONS.
+        inputs (list): Preprocessed NCHW input tensors used for calibration.
+    Returns:
+        (torch.nn.Module): The converted model.
+        (float): The largest absolute heatmap difference from the float32
+            model over the calibration inputs.
+    """
+    if precision == 'float32':
+        return model, 0.0
+    if precision == 'int8':
+        converted = quantize_int8(model, inputs)
+    elif precision == 'bfloat16':
+        converted = Bfloat16Model(model)
+    else:
+        raise ValueError(f"precision must be one of {PRECISIONS}, not {precision!r}")
+    converted.eval()
+
+    error = 0.0
+    with torch.no_grad():
+        for data in inputs:
+            _, reference = model(data)
+            _, heatmap = converted(data)
+            error = max(error, (heatmap.float() - reference).abs().max().item())
+    return converted, error
@@ -0,0 +1,124 @@
+"""
+Region of interest selection for Body. Body resizes whatever it is given to
+a fixed height, so running it on a crop around the player instead of the whole
+frame gives the player more network pixels while the network does less work
+on empty background. The region comes either from the keypoints found in the
+previous frame or from a background subtraction foreground mask.
+"""
+
+import cv2
+import numpy as np
+
+ROI_MODES = ('keypoints', 'foreground')
+
+
+class RoiSelector(object):
+    """
+    Choose the part of each frame of a video to estimate poses in.
+
+    Attributes:
+        mode (str): One of ROI_MODES.
+        margin (float): Padding added on every side of the detected region,
+            as a fraction of its larger side.
+        min_size (float): Smallest crop side, as a fraction of the frame
+            height, so a partly detected person still has room to be found.
+        refresh (int): In 'keypoints' mode, the whole frame is analyzed every
+            refresh frames so people outside the region are found again.
+        box (tuple): The x0, y0, x1, y1 region chosen for the latest frame.
+    """
+
+    def __init__(self, mode='keypoints', margin=0.3, min_size=0.5, refresh=30):
+        if mode not in ROI_MODES:
+            raise ValueError(f"mode must be one of {ROI_MODES}, not {mode!r}")
+        self.mode = mode
+        self.margin = margin
+        self.min_size = min_size
+        self.refresh = refresh
+        self.box = None
+        self._keypoint_box = None
+        self._frames_since_full = 0
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) \
+            if mode == 'foreground' else None
+
+    def select(self, frame):
+        """
+        Choose the region of a frame to estimate poses in.
+
+        Args:
+            frame (numpy.ndarray): H x W x 3 frame.
+        Returns:
+            (tuple): x0, y0, x1, y1 pixel bounds of the region, which is the
+                whole frame when there is nothing to go on.
+        """
+        height, width = frame.shape[:2]
+        if self.mode == 'foreground':
+            box = self._foreground_box(frame)
+        elif self._frames_since_full >= self.refresh:
+            box = None
+        else:
+            box = self._keypoint_box
+        if box is None:
+            self._frames_since_full = 0
+            self.box = (0, 0, width, height)
+        else:
+            self._frames_since_full += 1
+            self.box = self._pad(box, width, height)
+        return self.box
+
+    def to_frame(self, candidate):
+        """
+        Move candidates found in the latest region to where they are in the
+        whole frame.
+
+        Args:
+            candidate (numpy.ndarray): Candidate rows of x, y, score and id
+                in region coordinates, which are shifted in place.
+        Returns:
+            (numpy.ndarray): The candidate rows in frame coordinates.
+        """
+        candidate[:, 0] += self.box[0]
+        candidate[:, 1] += self.box[1]
+        return candidate
+
+    def observe(self, candidate, subset):
+        """
+        Remember where people were found in the latest frame, to choose the
+        region of the next frame from in 'keypoints' mode.
+
+        Args:
+            candidate (numpy.ndarray): Candidate rows in frame coordinates.
+            subset (numpy.ndarray): Subset rows, as returned by Body.
+        """
+        parts = subset[:, :18].ravel() if len(subset) else np.zeros(0)
+        points = candidate[parts[parts >= 0].astype(int), :2]
+        if len(points) == 0:
+            self._keypoint_box = None
+            return
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        self._keypoint_box = (x0, y0, x1, y1)
+
+    def _foreground_box(self, frame):
+        mask = self._subtractor.apply(frame)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
+        points = cv2.findNonZero(mask)
+        # a handful of pixels is noise, not a person
+        if points is None or len(points) < 0.005 * mask.size:
+            return None
+        x, y, w, h = cv2.boundingRect(points)
+        return (x, y, x + w, y + h)
+
+    def _pad(self, box, width, height):
+        # pad the region, grow it to the minimum size around its centre and
+        # keep it inside the frame
+        x0, y0, x1, y1 = box
+        pad = self.margin * max(x1 - x0, y1 - y0)
+        x0, y0, x1, y1 = x0 - pad, y0 - pad, x1 + pad, y1 + pad
+        side = self.min_size * height
+        if x1 - x0 < side:
+            x0, x1 = (x0 + x1 - side) / 2, (x0 + x1 + side) / 2
+        if y1 - y0 < side:
+            y0, y1 = (y0 + y1 - side) / 2, (y0 + y1 + side) / 2
+        x0, y0 = max(0, int(np.floor(x0))), max(0, int(np.floor(y0)))
+        x1, y1 = min(width, int(np.ceil(x1))), min(height, int(np.ceil(y1)))
+        return (x0, y0, x1, y1)
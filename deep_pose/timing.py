@@ -0,0 +1,94 @@
+"""
+Timing for the phases of Body's pipeline. Each phase keeps its most recent
+durations, so the mean, median and tail latency reflect the current workload
+rather than everything since startup.
+"""
+
+import contextlib
+import time
+from collections import deque
+
+import numpy as np
+
+# phases of Body's pipeline, in the order they run
+PHASES = ('resize', 'forward', 'upsample', 'peaks', 'paf', 'assembly')
+
+
+class PipelineStats(object):
+    """
+    Rolling per-phase durations measured with time.perf_counter.
+
+    Attributes:
+        enabled (bool): Whether timers record anything. When false, timing a
+            phase costs a single attribute lookup.
+        window (int): Number of recent durations kept per phase.
+    """
+
+    def __init__(self, enabled=True, window=200):
+        self.enabled = enabled
+        self.window = window
+        self._durations = {}
+
+    def time(self, phase):
+        """
+        Return a context manager that records how long its body takes as one
+        duration of phase.
+
+        Args:
+            phase (str): Name of the phase, usually one of PHASES.
+        Returns:
+            A context manager.
+        """
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timer(phase)
+
+    @contextlib.contextmanager
+    def _timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def record(self, phase, seconds):
+        """
+        Add one duration of a phase.
+
+        Args:
+            phase (str): Name of the phase.
+            seconds (float): How long the phase took.
+        """
+        if phase not in self._durations:
+            self._durations[phase] = deque(maxlen=self.window)
+        self._durations[phase].append(seconds)
+
+    def summary(self):
+        """
+        Summarize the recent durations of every phase that has run.
+
+        Returns:
+            (dict): Maps each phase, in pipeline order, to a dict with the
+                number of durations kept ('count') and their 'mean', 'p50'
+                and 'p99' in seconds.
+        """
+        order = sorted(self._durations, key=lambda phase: PHASES.index(phase) if phase in PHASES else len(PHASES))
+        stats = {}
+        for phase in order:
+            durations = np.array(self._durations[phase])
+            p50, p99 = np.percentile(durations, [50, 99])
+            stats[phase] = {'count': len(durations), 'mean': durations.mean(), 'p50': p50, 'p99': p99}
+        return stats
+
+    def reset(self):
+        """
+        Forget all recorded durations.
+        """
+        self._durations.clear()
+
+    def __str__(self):
+        lines = [f"{'phase':<10}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}"]
+        for phase, stats in self.summary().items():
+            lines.append(f"{phase:<10}{stats['count']:>7}{stats['mean'] * 1000:>10.2f}"
+                         f"{stats['p50'] * 1000:>10.2f}{stats['p99'] * 1000:>10.2f}")
+        return '\n'.join(lines)
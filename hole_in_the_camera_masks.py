@@ -0,0 +1,425 @@
+"""
+Masks and reference joint positions for the hole in the camera game. The
+joint positions saved for every mask in mask_joint_positions are loaded once,
+when the game starts, so scoring a trial right after the countdown ends does
+not read or parse any files. The reference joints of all masks are kept
+together in a single array, and masks are referred to by their index into it.
+Poses are scored against masks as arrays, so a batch of poses can be scored
+against every mask at once.
+
+Mask images are only decoded when they are needed, and the most recently used
+ones are kept in a small cache, so a library can hold hundreds of masks while
+only their joints stay in memory. A mask can be decoded on a background
+thread ahead of time with prefetch.
+
+The masks and joints can also be packed into a single file by
+create_mask_pack.py. The pack holds each mask already resized as a single
+channel, optionally with one bit per pixel, and is memory mapped when it is
+opened, so opening it costs the same however many masks it holds and a mask
+is only read from disk when it is shown. pack_is_current tells whether a pack
+is still up to date with the masks' images and joint positions.
+"""
+from collections import OrderedDict
+import csv
+import json
+import os
+import threading
+import cv2 as cv
+import numpy as np
+from hole_in_the_camera_pose import NUM_JOINTS
+
+# Size masks are shown at, as width and height.
+MASK_SIZE = (640, 480)
+
+# Number of decoded masks kept in memory, which covers the mask being played
+# and the one prefetched for the next round.
+MASK_CACHE_SIZE = 4
+
+# First bytes of a mask pack, followed by the length of its JSON index as a
+# little endian 32-bit integer, the index itself and the packed arrays.
+PACK_MAGIC = b"HITCMASK"
+
+# Arrays in a mask pack start at multiples of this many bytes.
+PACK_ALIGNMENT = 64
+
+
+class MaskLibrary:
+    """
+    The masks of the game and the joint positions users need to match to fit
+    into each of them.
+
+    Attributes:
+        names (list): List of names of each mask, represented as strings.
+        joints (numpy.ndarray): n x 18 x 2 integer array of the saved pixel
+            position of each joint for each mask, which is [-1, -1] for joints
+            open pose did not find in the mask's pose.
+        valid (numpy.ndarray): n x 18 boolean array, true for the joints that
+            are listed in each mask's joint positions csv. Only listed joints
+            are scored.
+        _mask_folder (str): Folder holding a png image for each mask, or
+            None if the library was opened from a pack.
+        _masks (numpy.ndarray): n x 480 x 640 uint8 array of the single
+            channel masks, or n x 480 x 80 array of their bits if _bits is
+            true, memory mapped from a pack. It is None if the masks are
+            decoded from their images.
+        _bits (bool): Whether _masks holds one bit per pixel.
+        _indices (dict): Index of each mask by name.
+        _cache (OrderedDict): The most recently used decoded masks by index,
+            least recently used first.
+        _cache_size (int): Number of decoded masks kept in _cache.
+        _prefetching (dict): The thread decoding each mask that is being
+            prefetched, by index.
+        _lock (threading.Lock): Guards _cache and _prefetching.
+    """
+
+    def __init__(self, mask_names=None, mask_folder="images/masks",
+                 joints_folder="mask_joint_positions",
+                 cache_size=MASK_CACHE_SIZE):
+        """
+        Load the joint positions of every mask. Mask images are decoded when
+        they are first used.
+
+        Args:
+            mask_names (list): Names of the masks to load, or None for every
+                mask found by find_mask_names.
+            mask_folder (str): Folder holding a png image for each mask.
+            joints_folder (str): Folder holding a joint positions csv for
+                each mask, as written by create_csv.
+            cache_size (int): Number of decoded masks to keep in memory.
+        """
+        if mask_names is None:
+            mask_names = find_mask_names(mask_folder, joints_folder)
+        self.names = list(mask_names)
+        self._mask_folder = mask_folder
+        self._masks = None
+        self._bits = False
+        self.joints = np.full((len(self.names), NUM_JOINTS, 2), -1,
+                              dtype=np.int32)
+        self.valid = np.zeros((len(self.names), NUM_JOINTS), dtype=bool)
+        for index, mask in enumerate(self.names):
+            self.joints[index], self.valid[index] = self.load_joints(
+                f"{joints_folder}/{mask}.csv")
+        self._init_cache(cache_size)
+
+    def _init_cache(self, cache_size):
+        # Set up the name index and the decoded mask cache.
+        self._indices = {name: index for index, name in enumerate(self.names)}
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._prefetching = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open_pack(cls, pack_path, cache_size=MASK_CACHE_SIZE):
+        """
+        Open a mask pack written by save_pack. The masks are memory mapped
+        rather than read.
+
+        Args:
+            pack_path (str): Path to the pack.
+            cache_size (int): Number of decoded masks to keep in memory.
+        Returns:
+            (MaskLibrary): The masks in the pack.
+        """
+        index = _read_pack_index(pack_path)
+
+        def section(name, dtype, shape):
+            return np.memmap(pack_path, dtype=dtype, mode="r",
+                             offset=index["offsets"][name], shape=shape)
+
+        count = len(index["names"])
+        library = cls.__new__(cls)
+        library.names = index["names"]
+        library._mask_folder = None
+        library._bits = index["bits"]
+        library._masks = section("masks", np.uint8,
+                                 (count, *index["mask_shape"]))
+        library.joints = section("joints", np.int32, (count, NUM_JOINTS, 2))
+        library.valid = section("valid", bool, (count, NUM_JOINTS))
+        library._init_cache(cache_size)
+        return library
+
+    def save_pack(self, pack_path, bits=False):
+        """
+        Write the library to a mask pack that open_pack can open.
+
+        Args:
+            pack_path (str): Path to write the pack to.
+            bits (bool): Whether to store one bit per pixel, which is an
+                eighth of the size but turns every pixel of the masks black or
+                white.
+        """
+        mask_shape = (MASK_SIZE[1], MASK_SIZE[0] // 8 if bits else MASK_SIZE[0])
+        sections = {"joints": np.ascontiguousarray(self.joints, dtype=np.int32),
+                    "valid": np.ascontiguousarray(self.valid, dtype=bool)}
+        sizes = {"masks": len(self) * mask_shape[0] * mask_shape[1],
+                 "joints": sections["joints"].nbytes,
+                 "valid": sections["valid"].nbytes}
+        # The index holds the offsets of the arrays, which depend on the
+        # length of the index, so it is sized with room for the offsets
+        # first.
+        index = {"names": self.names, "bits": bits,
+                 "mask_shape": list(mask_shape),
+                 "offsets": {name: 2 ** 63 for name in sizes}}
+        offset = _align(len(PACK_MAGIC) + 4 + len(json.dumps(index)))
+        for name, size in sizes.items():
+            index["offsets"][name] = offset
+            offset = _align(offset + size)
+        encoded = json.dumps(index).encode()
+        with open(pack_path, "wb") as pack_file:
+            pack_file.write(PACK_MAGIC)
+            pack_file.write(len(encoded).to_bytes(4, "little"))
+            pack_file.write(encoded)
+            for name in sizes:
+                pack_file.write(b"\0" * (index["offsets"][name]
+                                         - pack_file.tell()))
+                if name in sections:
+                    pack_file.write(sections[name].tobytes())
+                    continue
+                # Masks are decoded and written one at a time, so they are
+                # never all in memory at once.
+                for mask_index in range(len(self)):
+                    mask = self._grayscale(mask_index)
+                    if bits:
+                        mask = np.packbits(mask >= 128, axis=-1)
+                    pack_file.write(mask.tobytes())
+
+    def __len__(self):
+        """
+        Return the number of masks in the library.
+        """
+        return len(self.names)
+
+    def mask(self, index):
+        """
+        Return the image of a mask, in the format the view overlays on
+        camera frames. The mask is decoded unless it is in the cache, and
+        waits for it to finish if it is being prefetched.
+
+        Args:
+            index (int): The index of the mask.
+        Returns:
+            (numpy.ndarray): A read only 480x640x3 image of the mask, which is
+                shared with later calls for the same mask.
+        """
+        with self._lock:
+            prefetch = self._prefetching.get(index)
+        if prefetch not in (None, threading.current_thread()):
+            prefetch.join()
+        with self._lock:
+            if index in self._cache:
+                self._cache.move_to_end(index)
+                return self._cache[index]
+        mask = cv.cvtColor(self._grayscale(index), cv.COLOR_GRAY2RGB)
+        mask.setflags(write=False)
+        with self._lock:
+            self._cache[index] = mask
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return mask
+
+    def prefetch(self, index):
+        """
+        Start decoding a mask on a background thread, so that it is in the
+        cache when it is next shown. Nothing is done if the mask is already
+        cached or being prefetched.
+
+        Args:
+            index (int): The index of the mask.
+        """
+        with self._lock:
+            if index in self._cache or index in self._prefetching:
+                return
+            thread = threading.Thread(target=self._prefetch, args=(index,),
+                                      name="mask-prefetch", daemon=True)
+            self._prefetching[index] = thread
+        thread.start()
+
+    def _prefetch(self, index):
+        try:
+            self.mask(index)
+        except cv.error:
+            # Raised again when the mask is shown.
+            pass
+        finally:
+            with self._lock:
+                del self._prefetching[index]
+
+    def _grayscale(self, index):
+        # Decode a single channel mask from the pack or its image.
+        if self._masks is None:
+            # Masks are black and white, so a single channel holds them.
+            frame = cv.imread(f"{self._mask_folder}/{self.names[index]}.png",
+                              cv.IMREAD_GRAYSCALE)
+            # Images need to be resized to ensure images fit the screen.
+            return cv.resize(frame, MASK_SIZE)
+        mask = self._masks[index]
+        if self._bits:
+            mask = np.unpackbits(mask, axis=-1, count=MASK_SIZE[0]) * 255
+        return np.ascontiguousarray(mask)
+
+    def index(self, mask_name):
+        """
+        Return the index of a mask given its name.
+
+        Args:
+            mask_name (str): The name of the mask.
+        Returns:
+            (int): The index of the mask in the library.
+        """
+        return self._indices[mask_name]
+
+    @staticmethod
+    def load_joints(saved_csv_for_mask):
+        """
+        Read the joint positions saved for a mask.
+
+        Args:
+            saved_csv_for_mask (str): A path to the csv file that contains the
+                joint positions that the user should match.
+        Returns:
+            (numpy.ndarray): 18x2 integer array of the joint positions, with
+                the saved values truncated to whole pixels.
+            (numpy.ndarray): 18 booleans, true for the joints listed in the
+                csv.
+        """
+        joints = np.full((NUM_JOINTS, 2), -1, dtype=np.int32)
+        valid = np.zeros(NUM_JOINTS, dtype=bool)
+        with open(saved_csv_for_mask, "r") as csv_file:
+            for row in csv.reader(csv_file):
+                joint = int(row[0])
+                joints[joint] = [int(float(row[1])), int(float(row[2]))]
+                valid[joint] = True
+        return joints, valid
+
+    def score(self, pose, index):
+        """
+        Compute how accurately a pose fits a mask.
+
+        If a person was detected, every joint that is listed for the mask is
+        compared, including joints that were not found, at [-1, -1]. Each
+        scores 1 if it is within 30 pixels of the saved position, 0.5 within
+        40 pixels and 0.25 within 50 pixels.
+
+        Args:
+            pose (PoseResult): The user's joints.
+            index (int): The index of the mask to compare against.
+        Returns:
+            (double): The score of the fit out of 100, which is 0 if no joints
+                could be compared.
+        """
+        compared = np.full((1, NUM_JOINTS), pose.detected)
+        return float(score_poses(pose.positions[None], self.joints[index][None],
+                                 compared, self.valid[index][None])[0, 0])
+
+    def score_all(self, poses, present=None):
+        """
+        Compute how accurately each of a batch of poses fits every mask.
+
+        Args:
+            poses (numpy.ndarray): F x 18 x 2 array of joint positions.
+            present (numpy.ndarray): F x 18 booleans, true for the joints
+                of each pose that are compared, or None to compare every
+                joint.
+        Returns:
+            (numpy.ndarray): F x n array of the score of each pose against
+                each mask, in the same format as score.
+        """
+        return score_poses(poses, self.joints, present, self.valid)
+
+
+def score_poses(poses, references, present=None, valid=None):
+    """
+    Compute how accurately each of a batch of poses fits each of a set of
+    reference poses, with the rules of MaskLibrary.score.
+
+    Args:
+        poses (numpy.ndarray): F x 18 x 2 array of joint positions.
+        references (numpy.ndarray): M x 18 x 2 array of reference joint
+            positions.
+        present (numpy.ndarray): F x 18 booleans, true for the joints of
+            each pose that are compared, or None to compare every joint.
+        valid (numpy.ndarray): M x 18 booleans, true for the joints each
+            reference lists, or None if every reference lists every joint.
+    Returns:
+        (numpy.ndarray): F x M array of scores out of 100, which are 0 where
+            no joints could be compared.
+    """
+    poses = np.asarray(poses, dtype=float)
+    references = np.asarray(references)
+    if present is None:
+        present = np.ones(poses.shape[:2], dtype=bool)
+    if valid is None:
+        valid = np.ones(np.shape(references)[:2], dtype=bool)
+    # F x M x 18 joints that are compared, and their distances in pixels
+    compared = present[:, None, :] & valid[None, :, :]
+    distance = np.linalg.norm(references[None] - poses[:, None], axis=-1)
+    points = np.select([distance < 30, distance < 40, distance < 50],
+                       [1, 0.5, 0.25])
+    accuracy = np.where(compared, points, 0).sum(axis=-1)
+    joint_counts = np.count_nonzero(compared, axis=-1)
+    scores = np.zeros(accuracy.shape)
+    np.divide(accuracy, joint_counts, out=scores, where=joint_counts > 0)
+    return scores * 100
+
+
+def find_mask_names(mask_folder="images/masks",
+                    joints_folder="mask_joint_positions"):
+    """
+    Find every mask that can be played, which is every png image in the mask
+    folder that has a joint positions csv.
+
+    Args:
+        mask_folder (str): Folder holding a png image for each mask.
+        joints_folder (str): Folder holding a joint positions csv for each
+            mask, as written by create_csv.
+    Returns:
+        (list): The names of the masks, in alphabetical order.
+    """
+    names = []
+    for file_name in sorted(os.listdir(mask_folder)):
+        name, extension = os.path.splitext(file_name)
+        if extension == ".png" and \
+                os.path.exists(f"{joints_folder}/{name}.csv"):
+            names.append(name)
+    return names
+
+
+def pack_is_current(pack_path, mask_names, mask_folder="images/masks",
+                    joints_folder="mask_joint_positions"):
+    """
+    Check whether a mask pack can be used for a set of masks, which is when
+    it holds every one of them and was written after each of their images
+    and joint positions csvs last changed.
+
+    Args:
+        pack_path (str): Path to the pack.
+        mask_names (list): Names of the masks that will be played.
+        mask_folder (str): Folder holding a png image for each mask.
+        joints_folder (str): Folder holding a joint positions csv for each
+            mask, as written by create_csv.
+    Returns:
+        (bool): True if the pack exists and is up to date for the masks.
+    """
+    if not os.path.exists(pack_path):
+        return False
+    if not set(mask_names) <= set(_read_pack_index(pack_path)["names"]):
+        return False
+    packed = os.path.getmtime(pack_path)
+    return all(os.path.getmtime(path) <= packed for name in mask_names
+               for path in (f"{mask_folder}/{name}.png",
+                            f"{joints_folder}/{name}.csv"))
+
+
+def _read_pack_index(pack_path):
+    # Read the JSON index at the start of a mask pack.
+    with open(pack_path, "rb") as pack_file:
+        if pack_file.read(len(PACK_MAGIC)) != PACK_MAGIC:
+            raise ValueError(f"{pack_path} is not a mask pack")
+        index_length = int.from_bytes(pack_file.read(4), "little")
+        return json.loads(pack_file.read(index_length))
+
+
+def _align(offset):
+    # Round an offset in a mask pack up to the next array boundary.
+    return -(-offset // PACK_ALIGNMENT) * PACK_ALIGNMENT
@@ -6,11 +6,11 @@ that can analyze an image for joint positions in terms of pixel locations for
 each joint. This repository can be found at this link:
 https://github.com/Hzzone/pytorch-openpose
 """
-import csv
 import random
-from cv2 import cv2 as cv
-import numpy as np
-from deep_pose.body import Body
+from deep_pose.loader import BackgroundBody
+from hole_in_the_camera_masks import (MaskLibrary, find_mask_names,
+                                      pack_is_current)
+from hole_in_the_camera_pose import PoseResult
 
 
 class HoleInTheCameraGame:
@@ -18,17 +18,30 @@ class HoleInTheCameraGame:
     Hole in the wall game model with helper functions that dictate gameflow.
 
     Attributes:
-        BODY_ESTIMATION (Body): Body estimation object from open pose.
-        MASK_NAMES (list): List of names of each mask, represented as strings.
-        _mask_and_joints (list): List of tuples, where each tuple contains the
-            string file path to the mask that a user should fit into and a
-            string file path to the csv that stores the joint positions users
-            need to match.
-        _joint_positions (dict): Dictionary of joint positions, where each key
-            is an integer representing a joint (joint to integer conversions
-            can be found in the openpose github) and each value is a list of
-            doubles representing the pixel location of a joint on a given
-            image.
+        POSE_BACKEND (str): Inference backend used to run open pose, either
+            "torch" or "onnx".
+        BODY_ESTIMATION (BackgroundBody): Body estimation object from open
+            pose, which loads the model on a background thread the first time
+            it is started or used.
+        MASK_NAMES (list): List of names of each mask, represented as
+            strings, or None to play every mask in images/masks that has
+            saved joint positions.
+        MASK_PACK_PATH (str): Path to the mask pack written by
+            create_mask_pack.py, which is used instead of loading each mask
+            in MASK_NAMES if it is up to date with them.
+        ROUNDS_PER_GAME (int): The number of masks played in a game, picked
+            at random from MASK_NAMES.
+        _masks (MaskLibrary): The joint positions of every mask, loaded once
+            when the game is created, and their images, decoded when needed.
+        _mask_and_joints (list): List of the indices in _masks of the masks
+            picked for this game that have not been played yet.
+        _next_mask (int): The index in _masks of the mask that will be played
+            next, which is decoded in the background ahead of time, or None
+            if every mask has been played.
+        _joint_positions (PoseResult): The pixel location, confidence and
+            presence of each joint of the user in the most recent frame in
+            which they were found (joint to integer conversions can be found
+            in the openpose github).
         _joint_candidates (list): 2-D list of all joints, their positions, and
             the confidence of the open pose neural network, for every joint
             detected within the image inputted to open pose.
@@ -40,45 +53,63 @@ class HoleInTheCameraGame:
             most recently played trial in the game.
         _total_score (double): The computer score of the user's fit for all
             trials played up to the current condition of the game.
+        _trials_played (int): The number of trials scored so far.
     """
 
+    # Inference backend used to run open pose.
+    POSE_BACKEND = "torch"
+
     # Instance of Body class from open pose that will be used to analyze frames.
-    BODY_ESTIMATION = Body("deep_pose/body_pose_model.pth")
+    # It is built lazily so importing this module does not load the model.
+    BODY_ESTIMATION = BackgroundBody("deep_pose/body_pose_model.pth",
+                                     backend=POSE_BACKEND)
+
+    # List of each mask that will be available for users to play with, or
+    # None to play every mask that has saved joint positions.
+    MASK_NAMES = None
+
+    # Mask pack that is memory mapped instead of loading every mask image.
+    MASK_PACK_PATH = "images/masks.pack"
 
-    # List of each mask that will be available for users to play with.
-    MASK_NAMES = ["first_mask", "second_mask", "third_mask", "fourth_mask",
-                  "fifth_mask", "sixth_mask", "seventh_mask",]
+    # Number of masks played in a game, which is also the number of round
+    # screens the view has.
+    ROUNDS_PER_GAME = 7
 
     def __init__(self):
         """
         This is the constructor for the HoleInTheCamera class. The constructor
-        creates _mask_and_joints based on the class attribute of all the mask
-        names, initializes the variables that map joint positions to empty
-        lists/dictionaries and initializes the score variables to 0.
-        """
-        # Assembles tuples that store paths to the image mask and the joint
-        # positions csv and stores them to a list.
-        self._mask_and_joints = []
-        for mask in self.MASK_NAMES:
-            # Each image can be found in the images/masks folder.
-            frame = cv.imread(f"images/masks/{mask}.png")
-            # By default. OpenCV stores images as BGR and need to be converted
-            # to properly display them in pygame.
-            cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-            # Images need to be resized to ensure images fit the screen.
-            frame = cv.resize(frame, (640, 480))
-            joints = f"mask_joint_positions/{mask}.csv"
-            self._mask_and_joints.append((frame, joints))
-        self._joint_positions = {}
+        opens the mask pack, or loads every mask in the class attribute of all
+        the mask names if the pack is missing or out of date, picks the masks
+        for this game at random into _mask_and_joints and starts decoding the
+        first mask to be played, initializes the variables that map joint
+        positions to empty lists/dictionaries and initializes the score
+        variables to 0.
+        """
+        mask_names = self.MASK_NAMES
+        if mask_names is None:
+            mask_names = find_mask_names()
+        if pack_is_current(self.MASK_PACK_PATH, mask_names):
+            self._masks = MaskLibrary.open_pack(self.MASK_PACK_PATH)
+        else:
+            self._masks = MaskLibrary(mask_names)
+        # Masks are only decoded once they are handed out, so only their
+        # indices are stored. The pack can hold masks that are not played.
+        playable = [self._masks.index(name) for name in mask_names]
+        self._mask_and_joints = random.sample(
+            playable, min(self.ROUNDS_PER_GAME, len(playable)))
+        self._next_mask = None
+        self._choose_next_mask()
+        self._joint_positions = PoseResult()
         self._joint_candidates = []
         self._joint_subsets = []
         self._total_score = 0
         self._trial_score = 0
+        self._trials_played = 0
 
     @property
     def joint_positions(self):
         """
-        Return the joint_positions dictionary stored by this HoleInTheCamera
+        Return the joint_positions PoseResult stored by this HoleInTheCamera
         instance.
         """
         return self._joint_positions
@@ -98,13 +129,21 @@ class HoleInTheCameraGame:
         """
         return self._joint_subsets
 
+    @property
+    def masks(self):
+        """
+        Return the MaskLibrary stored by this HoleInTheCamera instance.
+        """
+        return self._masks
+
     @property
     def mask_and_joints(self):
         """
-        Return the mask_and_joints list stored by this HoleInTheCamera
-        instance.
+        Return a list of tuples, where each tuple contains the image of a mask
+        that has not been played yet and its index in the mask library.
         """
-        return self._mask_and_joints
+        return [(self._masks.mask(index), index)
+                for index in self._mask_and_joints]
 
     @property
     def total_score(self):
@@ -113,6 +152,16 @@ class HoleInTheCameraGame:
         """
         return self._total_score
 
+    @property
+    def average_score(self):
+        """
+        Return the average score of the trials played so far, which is 0 if
+        none have been played.
+        """
+        if self._trials_played == 0:
+            return 0
+        return self._total_score / self._trials_played
+
     @property
     def trial_score(self):
         """
@@ -134,26 +183,41 @@ class HoleInTheCameraGame:
 
     def get_mask_and_joints(self):
         """
-        This function randomly selects and returns a mask to the game runner
-        to be displayed in the next trial for the user.
+        This function returns the mask that was randomly selected for the
+        next trial to the game runner to be displayed to the user, and
+        selects the mask for the trial after it.
 
         Returns:
-            (str): A string that represents the path to the mask that the user
-                will have to fit into next.
-            (str): A string that represents the path to the joint positions csv
-                that will be used to test the accuracy of a user's fit.
+            (numpy.ndarray): The image of the mask that the user will have to
+                fit into next.
+            (int): The index of the mask in the mask library, which is used to
+                test the accuracy of a user's fit.
+        """
+        mask_index = self._next_mask
+        # Remove the mask index from the list to ensure that it isn't
+        # replayed during the same game iteration.
+        self._mask_and_joints.remove(mask_index)
+        mask = self._masks.mask(mask_index)
+        self._choose_next_mask()
+        return mask, mask_index
+
+    def _choose_next_mask(self):
+        """
+        This function randomly selects the mask for the next trial from the
+        masks that have not been played yet, and starts decoding it in the
+        background while the current trial is played.
         """
+        if not self._mask_and_joints:
+            self._next_mask = None
+            return
         # If there is only one mask left, automatically assign the index to be
-        # returned to 0.
+        # played to 0.
         if len(self._mask_and_joints) == 1:
             index = 0
         else:
             index = random.randint(0, len(self._mask_and_joints) - 1)
-        random_mask_and_joint = self._mask_and_joints[index]
-        # Remove the mask and joint tuple from the list to ensure that it isn't
-        # replayed during the same game iteration.
-        self._mask_and_joints.pop(index)
-        return random_mask_and_joint[0], random_mask_and_joint[1]
+        self._next_mask = self._mask_and_joints[index]
+        self._masks.prefetch(self._next_mask)
 
     def analyze_frame(self, frame):
         """
@@ -161,13 +225,29 @@ class HoleInTheCameraGame:
         stores them to _joint_candidates and _joint_subsets by calling the
         open pose object within this class.
 
+        If the open pose model is still loading in the background, this
+        function waits for it to finish.
+
         Args:
             frame (numpy.ndarray): A 3-D numpy array that represents the RGB
                 values of the frame to be analyzed by open pose. This frame
                 array should be of size 480x640x3.
         """
-        self._joint_candidates, self._joint_subsets =\
-            self.BODY_ESTIMATION(frame)
+        self.set_pose(*self.BODY_ESTIMATION(frame))
+
+    def set_pose(self, joint_candidates, joint_subsets):
+        """
+        This function stores joints that open pose already found in a frame,
+        such as by a background worker, as if analyze_frame had found them.
+
+        Args:
+            joint_candidates (list): 2-D list of every joint open pose
+                detected, in the format of _joint_candidates.
+            joint_subsets (list): 2-D list of the joints of each person open
+                pose detected, in the format of _joint_subsets.
+        """
+        self._joint_candidates = joint_candidates
+        self._joint_subsets = joint_subsets
 
     def parse_for_joint_positions(self):
         """
@@ -175,77 +255,47 @@ class HoleInTheCameraGame:
         are populated to _joint_candidates and _joint_subsets. This function
         assumes only one person is in the camera frame during analysis and
         parses through _joint_candidates and _joint_subsets and assembles them
-        into one dictionary. If a joint was not found in the image, it is
-        mapped to [-1, -1].
-        """
-        if len(self.joint_subsets) > 0:
-            for index, value in enumerate(self._joint_subsets[0]):
-                # Value will be -1 if the joint is not present in the image.
-                if value >= 0:
-                    self._joint_positions[f'{index}'] = [
-                        self._joint_candidates[int(value)][0],
-                        self._joint_candidates[int(value)][1]]
-                else:
-                    self._joint_positions[f"{index}"] = [-1, -1]
-                # After 16, the _joint_subsets variable contains information
-                # about the data and accuracy, but is not useful for mapping
-                # joint positions so it is ignored.
-                if index > 16:
-                    break
-
-    def compute_accuracy(self, saved_csv_for_mask):
+        into one PoseResult. If no person was found in the image, the joint
+        positions of the previous frame are kept.
+        """
+        pose = PoseResult.from_open_pose(self._joint_candidates,
+                                         self._joint_subsets)
+        if pose.detected:
+            self._joint_positions = pose
+
+    def score_joints(self, joint_positions, mask_index):
+        """
+        This function computes how accurately a set of joint positions fits
+        the mask they were presented with based on the mask's saved joint
+        positions, without changing the game state.
+
+        Args:
+            joint_positions (PoseResult): The joints to score, in the format
+                of _joint_positions.
+            mask_index (int): The index of the mask in the mask library, as
+                returned by get_mask_and_joints.
+        Returns:
+            (double): The score of the fit out of 100, which is 0 if no joints
+                could be compared.
+        """
+        return self._masks.score(joint_positions, mask_index)
+
+    def compute_accuracy(self, mask_index):
         """
         This function computes how accurately a user was able to fit into the
-        mask they were presented with based on the joint positions csv.
+        mask they were presented with based on the mask's saved joint
+        positions.
 
         Args:
-            saved_csv_for_mask (str): A path to the csv file that contains the
-                joint positions that the user should have matched in order to
-                have had a successful trial.
-        """
-        accuracy = 0
-        joint_fits = []
-        joint_counts = 0
-
-        # Reads and stores the saved joint positions to compare against the
-        # user's joint positions.
-        with open(saved_csv_for_mask, "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                joint_fits.append(row)
-        for joint in joint_fits:
-            # Ensures that comparisons are only made with joints that are
-            # present.
-            if joint[0] in self._joint_positions.keys() and\
-                    self._joint_positions[joint[0]][1] != '-1':
-                joint_counts += 1
-                reference_joint_position = np.array(
-                    [int(float(joint[1])), int(float(joint[2]))]
-                )
-                user_joint_position = np.array(self._joint_positions[joint[0]])
-                # Calculates the Euclidian distance (in pixels) between the
-                # saved joint positions and the user's joint positions.
-                distance = np.linalg.norm(
-                    reference_joint_position - user_joint_position
-                )
-
-                # Gives users a score based on how well they fit, where a
-                # perfect match (distance is less than 20 pixels) corresponds
-                # to a perfect score.
-                if distance < 30:
-                    accuracy += 1
-                elif distance < 40:
-                    accuracy += 0.5
-                elif distance < 50:
-                    accuracy += 0.25
+            mask_index (int): The index of the mask in the mask library, as
+                returned by get_mask_and_joints.
+        """
         # Updates the _total_score and _trial_score variables with the results
         # of this trial.
-        if joint_counts == 0:
-            self._total_score += 0
-            self._trial_score = 0
-        else:
-            self._total_score += accuracy / joint_counts * 100
-            self._trial_score = accuracy / joint_counts * 100
+        self._trial_score = self.score_joints(self._joint_positions,
+                                              mask_index)
+        self._total_score += self._trial_score
+        self._trials_played += 1
 
     def check_win(self):
         """
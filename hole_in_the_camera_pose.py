@@ -0,0 +1,84 @@
+"""
+The joints of the person playing the hole in the camera game. Every frame
+that is analyzed or tracked produces one PoseResult, which keeps the joints in
+small fixed size arrays instead of a dictionary of string keys and lists, so
+nothing but three arrays is built per frame.
+"""
+import numpy as np
+
+# Number of joints open pose finds for a person.
+NUM_JOINTS = 18
+
+
+class PoseResult:
+    """
+    The joints of one person found in a frame. Joint numbers are open pose's,
+    which can be found in the openpose github.
+
+    Attributes:
+        positions (numpy.ndarray): 18x2 float32 array of the pixel location
+            of each joint, which is [-1, -1] for joints that were not found.
+        confidence (numpy.ndarray): 18 float32 open pose confidences of each
+            joint, which are 0 for joints that were not found.
+        present (numpy.ndarray): 18 booleans, true for the joints that were
+            found.
+    """
+
+    __slots__ = ("positions", "confidence", "present")
+
+    def __init__(self, positions=None, confidence=None, present=None):
+        """
+        Create a pose, which has no joints unless they are given.
+
+        Args:
+            positions (numpy.ndarray): 18x2 array of joint positions, where
+                joints that were not found are [-1, -1], or None for a pose
+                with no joints.
+            confidence (numpy.ndarray): 18 joint confidences, or None for
+                0 for every joint.
+            present (numpy.ndarray): 18 booleans, true for the joints that
+                were found, or None to treat the joints with a non-negative
+                position as found.
+        """
+        if positions is None:
+            positions = np.full((NUM_JOINTS, 2), -1, dtype=np.float32)
+        self.positions = np.asarray(positions, dtype=np.float32)
+        if present is None:
+            present = self.positions[:, 0] >= 0
+        self.present = np.asarray(present, dtype=bool)
+        if confidence is None:
+            confidence = np.zeros(NUM_JOINTS, dtype=np.float32)
+        self.confidence = np.asarray(confidence, dtype=np.float32)
+
+    @classmethod
+    def from_open_pose(cls, joint_candidates, joint_subsets):
+        """
+        Create the pose of the first person open pose detected.
+
+        Args:
+            joint_candidates (numpy.ndarray): Every joint open pose detected,
+                as rows of x, y, confidence and candidate number.
+            joint_subsets (numpy.ndarray): The candidate number of each joint
+                of each person open pose detected, which is -1 for joints that
+                were not found, followed by the person's score and joint
+                count.
+        Returns:
+            (PoseResult): The first person's joints, or a pose with no joints
+                if no person was detected.
+        """
+        pose = cls()
+        if len(joint_subsets) > 0:
+            indices = np.asarray(joint_subsets[0][:NUM_JOINTS]).astype(int)
+            pose.present = indices >= 0
+            found = np.asarray(joint_candidates)[indices[pose.present]]
+            pose.positions[pose.present] = found[:, :2]
+            pose.confidence[pose.present] = found[:, 2]
+        return pose
+
+    @property
+    def detected(self):
+        """
+        Return whether the pose belongs to a detected person, which has at
+        least one joint.
+        """
+        return bool(self.present.any())
@@ -5,6 +5,8 @@ import sys
 from hole_in_the_camera_controller import OpenCVController
 from hole_in_the_camera_view import PygameViewer
 from hole_in_the_camera_model import HoleInTheCameraGame
+from hole_in_the_camera_tracker import PoseTracker
+from hole_in_the_camera_worker import LivePoseWorker
 
 # Set up view constants
 CAMERA_INDEX = 0
@@ -51,7 +53,7 @@ def run_game():
     Returns:
         (str): The next game state.
     """
-    # total trials is equal to the number of unique holes stroed in the model.
+    # total trials is equal to the number of holes picked for this game.
     total_trials = game_model.num_holes_remaining()
     # number of trials remaining is equal to the number of unique holes
     # remaining.
@@ -62,7 +64,8 @@ def run_game():
         next_screen_state = game_controller.next_screen()
         while next_screen_state == "stay":
             next_screen_state = game_controller.next_screen()
-        hole_mask, joints_file = game_model.get_mask_and_joints()
+        hole_mask, mask_index = game_model.get_mask_and_joints()
+        pose_worker.set_mask(mask_index)
         game_controller.start_timer()
         current_timer_value = game_controller.get_timer_string()
         # while loop runs until the timer has expired, signifying the end of
@@ -70,20 +73,28 @@ def run_game():
         while True:
             current_frame = game_controller.get_display_frame()
             current_timer_value = game_controller.get_timer_string()
-            # displays the user's frame, along with the hole mask overlaid on
-            # top to the user.
-            game_view.display_frame(current_frame, current_timer_value,
-                                    hole_mask)
-            if game_controller.next_screen() == "quit":
-                sys.exit()
+            # the worker analyzes the newest frame in the background, so the
+            # camera feed keeps running while the user sees their last fit.
+            pose_worker.submit(current_frame)
+            show_frame(current_frame, current_timer_value, hole_mask,
+                       pose_worker.latest)
             if game_controller.determine_end_timer():
-                final_frame = current_frame
+                # the final frame is scored with open pose, not the tracker.
+                final_frame_id = pose_worker.submit(current_frame,
+                                                    full_inference=True)
                 break
+        # keep showing the camera feed until the worker has analyzed the
+        # user's final frame.
+        final_update = pose_worker.result_for(final_frame_id)
+        while final_update is None:
+            show_frame(game_controller.get_display_frame(),
+                       current_timer_value, hole_mask, pose_worker.latest)
+            final_update = pose_worker.result_for(final_frame_id)
         # these functions call the model to analyze the user's final frame and
         # determine if the user was successful or not.
-        game_model.analyze_frame(final_frame)
+        game_model.set_pose(final_update.candidates, final_update.subsets)
         game_model.parse_for_joint_positions()
-        game_model.compute_accuracy(joints_file)
+        game_model.compute_accuracy(mask_index)
         game_view.display_win(game_model.check_win(), game_model.trial_score)
         next_screen_state = game_controller.next_screen()
         while next_screen_state == "stay":
@@ -94,6 +105,28 @@ def run_game():
     return "game_complete"
 
 
+def show_frame(frame, timer_text, hole_mask, pose_update):
+    """
+    Display a camera frame with the hole mask overlaid on top, along with the
+    joints and provisional score of the most recently analyzed frame, and
+    quit the game if the user asks to.
+
+    Args:
+        frame (numpy.ndarray): The camera frame to display.
+        timer_text (str): The timer text to display.
+        hole_mask (numpy.ndarray): The mask of the current hole.
+        pose_update (PoseUpdate): The most recent pose worker result, or None
+            if there is none yet.
+    """
+    if pose_update is None:
+        game_view.display_frame(frame, timer_text, hole_mask)
+    else:
+        game_view.display_frame(frame, timer_text, hole_mask,
+                                pose_update.pose, pose_update.score)
+    if game_controller.next_screen() == "quit":
+        sys.exit()
+
+
 def end_game():
     """
     Display the end game screen and wait for the user to quit the game.
@@ -101,8 +134,7 @@ def end_game():
     Returns:
         (str): The next game state.
     """
-    average_score = game_model.total_score/ 7
-    game_view.display_end_game(average_score)
+    game_view.display_end_game(game_model.average_score)
     next_screen_state = game_controller.next_screen()
     while next_screen_state == "stay":
         if next_screen_state == "quit":
@@ -120,10 +152,19 @@ GAME_STATES = {
 }
 
 if __name__ == "__main__":
+    # Start loading the open pose model in the background so the intro screen
+    # can be shown while it loads.
+    HoleInTheCameraGame.BODY_ESTIMATION.start()
     # Create controller, model, and view objects.
     game_controller = OpenCVController(CAMERA_INDEX)
     game_view = PygameViewer(DISPLAY_SIZE)
     game_model = HoleInTheCameraGame()
+    # Analyze camera frames in the background while the user is posing,
+    # tracking the joints between open pose runs.
+    pose_worker = LivePoseWorker(
+        HoleInTheCameraGame.BODY_ESTIMATION,
+        PoseTracker(HoleInTheCameraGame.BODY_ESTIMATION), game_model.masks)
+    pose_worker.start()
     # Start the game and initialize pygame
     game_view.initialize_view()
     # set current game state to start screen
@@ -0,0 +1,188 @@
+"""
+Joint tracking between open pose inferences for the hole in the camera game.
+Open pose takes far longer than a camera frame on a CPU, so the tracker only
+runs it every few frames, or sooner when tracking becomes unreliable, and
+moves the joints it found along with the image in between using pyramidal
+Lucas-Kanade optical flow. The tracked positions are smoothed so the joints
+shown to the user do not jitter.
+"""
+import cv2
+import numpy as np
+from hole_in_the_camera_pose import NUM_JOINTS, PoseResult
+
+
+class PoseTracker:
+    """
+    Track the joints of the first person in a stream of frames.
+
+    Attributes:
+        _body_estimation (callable): Open pose body estimation object, which
+            returns the joint candidates and subsets of a frame.
+        _interval (int): Number of frames after an inference before open pose
+            is run again.
+        _min_confidence (float): Fraction of joints that must be tracked
+            successfully, below which open pose is run on the next frame.
+        _max_error (float): Largest optical flow error for a joint to count
+            as tracked.
+        _smoothing (float): Weight of the previous smoothed position when a
+            new position is blended in, between 0 (no smoothing) and 1.
+        _previous_gray (numpy.ndarray): The previous frame in grayscale, or
+            None before the first frame.
+        _points (numpy.ndarray): 18x2 float32 array of the raw tracked joint
+            positions, which are followed from frame to frame.
+        _smoothed (numpy.ndarray): 18x2 array of the smoothed joint positions
+            that are reported.
+        _visible (numpy.ndarray): 18 booleans, true for joints that are
+            currently found.
+        _joint_confidence (numpy.ndarray): 18 open pose confidences of the
+            joints from the last inference, which are 0 for joints that are
+            not currently found.
+        _frames_since_inference (int): Frames tracked since open pose last
+            ran.
+        _inferred_count (int): Number of joints open pose last found.
+        _confidence (float): Fraction of the joints open pose last found
+            that are still tracked in the latest frame.
+        _inferred (bool): Whether open pose ran on the latest frame.
+    """
+
+    def __init__(self, body_estimation, interval=10, min_confidence=0.6,
+                 max_error=20.0, smoothing=0.5):
+        """
+        Create a tracker that runs open pose on the first frame it sees.
+
+        Args:
+            body_estimation (callable): Open pose body estimation object, such
+                as HoleInTheCameraGame.BODY_ESTIMATION.
+            interval (int): Number of frames after an inference before open
+                pose is run again.
+            min_confidence (float): Fraction of joints that must be tracked
+                successfully to keep tracking instead of running open pose.
+            max_error (float): Largest optical flow error for a joint to
+                count as tracked.
+            smoothing (float): Weight of the previous smoothed position when
+                a new position is blended in, between 0 and 1.
+        """
+        self._body_estimation = body_estimation
+        self._interval = interval
+        self._min_confidence = min_confidence
+        self._max_error = max_error
+        self._smoothing = smoothing
+        self.reset()
+
+    @property
+    def confidence(self):
+        """
+        Return the fraction of the joints open pose last found that are still
+        tracked in the latest frame.
+        """
+        return self._confidence
+
+    @property
+    def inferred(self):
+        """
+        Return whether open pose ran on the latest frame.
+        """
+        return self._inferred
+
+    @property
+    def joint_positions(self):
+        """
+        Return the smoothed joint positions in the latest frame.
+
+        Returns:
+            (PoseResult): The smoothed joints, which has no joints if none
+                are found.
+        """
+        return PoseResult(self._smoothed, self._joint_confidence.copy(),
+                          self._visible.copy())
+
+    def reset(self):
+        """
+        Forget the tracked joints, so open pose runs on the next frame.
+        """
+        self._previous_gray = None
+        self._points = -np.ones((NUM_JOINTS, 2), dtype=np.float32)
+        self._smoothed = -np.ones((NUM_JOINTS, 2))
+        self._visible = np.zeros(NUM_JOINTS, dtype=bool)
+        self._joint_confidence = np.zeros(NUM_JOINTS, dtype=np.float32)
+        self._frames_since_inference = 0
+        self._inferred_count = 0
+        self._confidence = 0.0
+        self._inferred = False
+
+    def update(self, frame):
+        """
+        Find the joints in the next frame, by running open pose if it is due
+        and by optical flow from the previous frame otherwise.
+
+        Args:
+            frame (numpy.ndarray): The next RGB camera frame, as returned by
+                OpenCVController.get_display_frame.
+        Returns:
+            (PoseResult): The smoothed joints, as joint_positions returns
+                them.
+        """
+        due = (self._previous_gray is None
+               or self._frames_since_inference >= self._interval
+               or self._confidence < self._min_confidence)
+        if due:
+            candidates, subsets = self._body_estimation(frame)
+            self.correct(frame, PoseResult.from_open_pose(candidates, subsets))
+        else:
+            self._track(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY))
+        return self.joint_positions
+
+    def correct(self, frame, pose):
+        """
+        Replace the tracked joints with joints open pose found in a frame.
+
+        Args:
+            frame (numpy.ndarray): The RGB frame the joints were found in.
+            pose (PoseResult): The joints open pose found.
+        """
+        found = pose.positions.astype(float)
+        visible = pose.present.copy()
+        # Joints that stayed visible are blended towards the new positions
+        # and newly found joints start at them.
+        newly_found = visible & ~self._visible
+        self._blend(found, visible & self._visible)
+        self._smoothed[newly_found] = found[newly_found]
+        self._smoothed[~visible] = -1
+        self._points = found.astype(np.float32)
+        self._visible = visible
+        self._joint_confidence = np.where(visible, pose.confidence, 0)
+        self._previous_gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        self._frames_since_inference = 0
+        self._inferred_count = int(visible.sum())
+        # With no joints to track, open pose runs again on the next frame.
+        self._confidence = 1.0 if self._inferred_count > 0 else 0.0
+        self._inferred = True
+
+    def _track(self, gray):
+        # Follows the raw joint positions, not the smoothed ones, so the
+        # smoothing lag does not build up into drift.
+        self._inferred = False
+        self._frames_since_inference += 1
+        indices = np.flatnonzero(self._visible)
+        if len(indices) == 0:
+            self._confidence = 0.0
+            self._previous_gray = gray
+            return
+        moved, status, error = cv2.calcOpticalFlowPyrLK(
+            self._previous_gray, gray, self._points[indices].reshape(-1, 1, 2),
+            None, winSize=(21, 21), maxLevel=3)
+        tracked = (status.ravel() == 1) & (error.ravel() < self._max_error)
+        self._points[indices[tracked]] = moved.reshape(-1, 2)[tracked]
+        lost = indices[~tracked]
+        self._visible[lost] = False
+        self._points[lost] = -1
+        self._smoothed[lost] = -1
+        self._joint_confidence[lost] = 0
+        self._confidence = self._visible.sum() / self._inferred_count
+        self._blend(self._points, self._visible)
+        self._previous_gray = gray
+
+    def _blend(self, positions, joints):
+        # Exponential moving average of the reported positions.
+        self._smoothed[joints] = (self._smoothing * self._smoothed[joints]
+                                  + (1 - self._smoothing) * positions[joints])
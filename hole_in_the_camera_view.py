@@ -44,7 +44,8 @@ class HoleInTheWallView(ABC):
         """
 
     @abstractmethod
-    def display_frame(self, frame, timer_text, camera_mask):
+    def display_frame(self, frame, timer_text, camera_mask,
+                      pose=None, score=None):
         """
         Display the current frame.
 
@@ -52,6 +53,10 @@ class HoleInTheWallView(ABC):
             frame (numpy.ndarray): Current frame to display.
             timer_text (str): Current timer value.
             camera_mask (numpy.ndarray): Current camera mask.
+            pose (PoseResult): Joints found in a recent frame, or None to
+                not show any.
+            score (float): Provisional score of a recent frame, or None to
+                not show one.
         """
 
     @abstractmethod
@@ -92,6 +97,9 @@ class PygameViewer(HoleInTheWallView):
         _WHITE (tuple): RGB value for white.
         _FONT (str): Font name.
         _FONT_SIZE (int): Font size.
+        _JOINT_COLOR (tuple): RGB value of the joints drawn over the frame.
+        _JOINT_RADIUS (int): Radius in pixels of the joints drawn over the
+            frame.
         _BACKGROUND_PATHS (list): The paths of the background images.
         _screen (pygame.Surface): The game window.
         _font (pygame.font.SysFont): The font used to display text.
@@ -101,6 +109,8 @@ class PygameViewer(HoleInTheWallView):
     _WHITE = (255, 255, 255)
     _FONT_NAME = "Viga"
     _FONT_SIZE = 38
+    _JOINT_COLOR = (0, 255, 0)
+    _JOINT_RADIUS = 5
     _BACKGROUND_PATHS = ["images/assets/background.jpg",
                          "images/assets/lost_background.jpg",
                          "images/assets/win_background.jpg",
@@ -200,7 +210,8 @@ class PygameViewer(HoleInTheWallView):
         self._display_background(0)
         self._display_text(instruction_text, self._WHITE, self._BLACK)
 
-    def display_frame(self, frame, timer_text, camera_mask):
+    def display_frame(self, frame, timer_text, camera_mask,
+                      pose=None, score=None):
         """
         Display the frame on the game window.
 
@@ -208,11 +219,28 @@ class PygameViewer(HoleInTheWallView):
             frame (numpy.ndarray): The frame to be displayed.
             timer_text (str): The timer text to be displayed.
             mask (numpy.ndarray): The mask to be overlaid on the frame.
+            pose (PoseResult): Joints found in a recent frame, in frame
+                pixels, to draw over the frame. Joints that were not found
+                are not drawn.
+            score (float): Provisional score of a recent frame to show in the
+                top left corner.
         """
+        frame_width = frame.shape[1]
         frame = cv.bitwise_and(frame, camera_mask)
         frame = pygame.transform.rotate(pygame.surfarray.make_surface(frame),
                                         -90)
         self._screen.blit(frame, (0, 0))
+        if pose is not None:
+            for x_position, y_position in pose.positions[pose.present]:
+                # Rotating the surface mirrors the frame left to right.
+                pygame.draw.circle(
+                    self._screen, self._JOINT_COLOR,
+                    (frame_width - 1 - int(x_position), int(y_position)),
+                    self._JOINT_RADIUS)
+        if score is not None:
+            score_text = self._font.render(f"Fit: {int(score)}", 1,
+                                           self._WHITE)
+            self._screen.blit(score_text, (0, 0))
         counting_text = self._font.render(timer_text, 1, self._WHITE)
         counting_rect = counting_text.get_rect(
             bottomright=self._screen.get_rect().bottomright
@@ -0,0 +1,218 @@
+"""
+Background pose inference for the hole in the camera game. Open pose takes
+much longer than a camera frame, so the game hands every camera frame to a
+worker thread instead of analyzing it itself. The worker only ever analyzes
+the newest frame it was given, dropping frames that arrived while it was
+busy, and publishes the joints and provisional score it found so the game can
+show them without waiting. Given a PoseTracker, the worker only runs open
+pose every few frames and tracks the joints with optical flow in between, so
+it keeps up with the camera.
+"""
+import threading
+from collections import namedtuple
+from hole_in_the_camera_pose import PoseResult
+
+# The result of analyzing one frame. frame_id is the number submit returned
+# for the frame, candidates and subsets are the raw open pose outputs, or None
+# if the joints were tracked, pose is the PoseResult of the first person and
+# score is the provisional score against the current mask, or None if no mask
+# is set.
+PoseUpdate = namedtuple("PoseUpdate", ["frame_id", "candidates", "subsets",
+                                       "pose", "score"])
+
+
+class LivePoseWorker:
+    """
+    Analyze the newest camera frame on a background thread.
+
+    Attributes:
+        _body_estimation (callable): Open pose body estimation object, which
+            returns the joint candidates and subsets of a frame.
+        _tracker (PoseTracker): Tracker that finds the joints of live frames,
+            or None to run open pose on every frame.
+        _masks (MaskLibrary): The masks that provisional scores are computed
+            against, or None.
+        _condition (threading.Condition): Guards the attributes below and
+            wakes the worker when a frame arrives.
+        _frame (numpy.ndarray): The newest frame that has not been picked up
+            by the worker yet, or None.
+        _frame_id (int): The number of the newest submitted frame.
+        _full_inference (bool): Whether open pose must run on _frame rather
+            than the tracker.
+        _reset_tracker (bool): Whether the tracker should forget its joints
+            before the next frame, because the mask changed.
+        _mask_index (int): Index in _masks of the mask that provisional
+            scores are computed against, or None.
+        _latest (PoseUpdate): The most recent result, or None.
+        _dropped (int): The number of frames replaced before the worker
+            picked them up.
+        _error (Exception): The error that stopped the worker, if any.
+        _running (bool): Whether the worker should keep running.
+        _thread (threading.Thread): The worker thread.
+    """
+
+    def __init__(self, body_estimation, tracker=None, masks=None):
+        """
+        Create a worker that is not started yet.
+
+        Args:
+            body_estimation (callable): Open pose body estimation object, such
+                as HoleInTheCameraGame.BODY_ESTIMATION.
+            tracker (PoseTracker): Tracker that finds the joints of live
+                frames, or None to run open pose on every frame.
+            masks (MaskLibrary): The masks that provisional scores are
+                computed against, which set_mask needs.
+        """
+        self._body_estimation = body_estimation
+        self._tracker = tracker
+        self._masks = masks
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_id = 0
+        self._full_inference = False
+        self._reset_tracker = False
+        self._mask_index = None
+        self._latest = None
+        self._dropped = 0
+        self._error = None
+        self._running = False
+        self._thread = None
+
+    @property
+    def latest(self):
+        """
+        Return the most recent PoseUpdate, or None if no frame has been
+        analyzed since the mask was last set.
+        """
+        with self._condition:
+            self._raise_error()
+            return self._latest
+
+    @property
+    def dropped(self):
+        """
+        Return the number of frames that were replaced by a newer frame before
+        they were analyzed.
+        """
+        return self._dropped
+
+    def start(self):
+        """
+        Start the worker thread, if it is not already running.
+        """
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run,
+                                            name="pose-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the worker thread once it finishes the frame it is analyzing.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def set_mask(self, mask_index):
+        """
+        Set the mask that provisional scores are computed against and forget
+        the results for the previous mask.
+
+        Args:
+            mask_index (int): Index of the mask in the worker's MaskLibrary,
+                or None to stop scoring.
+        """
+        if mask_index is not None and self._masks is None:
+            raise ValueError("the worker has no masks to score against")
+        with self._condition:
+            self._mask_index = mask_index
+            self._latest = None
+            self._reset_tracker = True
+
+    def submit(self, frame, full_inference=False):
+        """
+        Give the worker a new frame to analyze, replacing any frame it has not
+        picked up yet. This never waits for the worker.
+
+        Args:
+            frame (numpy.ndarray): The camera frame to analyze.
+            full_inference (bool): Whether to run open pose on the frame even
+                if the worker has a tracker, so the result has the open pose
+                candidates and subsets.
+        Returns:
+            (int): The number of the frame, which result_for takes.
+        """
+        with self._condition:
+            if self._frame is not None:
+                self._dropped += 1
+            self._frame = frame
+            self._frame_id += 1
+            self._full_inference = full_inference
+            self._condition.notify_all()
+            return self._frame_id
+
+    def result_for(self, frame_id):
+        """
+        Return the result for a submitted frame once it is ready, without
+        waiting for it.
+
+        Args:
+            frame_id (int): The number submit returned for the frame.
+        Returns:
+            (PoseUpdate): The result for the frame, or for a newer frame, or
+                None if the frame has not been analyzed yet.
+        """
+        latest = self.latest
+        if latest is not None and latest.frame_id >= frame_id:
+            return latest
+        return None
+
+    def _raise_error(self):
+        # The worker's errors are raised in the game loop, which would
+        # otherwise wait forever for a result.
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and self._frame is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                frame, frame_id = self._frame, self._frame_id
+                full_inference = self._full_inference or self._tracker is None
+                mask_index = self._mask_index
+                reset_tracker = self._reset_tracker
+                self._frame = None
+                self._reset_tracker = False
+            try:
+                if reset_tracker and self._tracker is not None:
+                    self._tracker.reset()
+                if full_inference:
+                    candidates, subsets = self._body_estimation(frame)
+                    pose = PoseResult.from_open_pose(candidates, subsets)
+                    if self._tracker is not None:
+                        self._tracker.correct(frame, pose)
+                else:
+                    # Tracked joints have no open pose candidates or subsets.
+                    candidates = subsets = None
+                    pose = self._tracker.update(frame)
+                score = None
+                if mask_index is not None:
+                    score = self._masks.score(pose, mask_index)
+            except Exception as error:  # pylint: disable=broad-except
+                with self._condition:
+                    self._error = error
+                    self._running = False
+                return
+            with self._condition:
+                # Results for a previous mask are of no use any more.
+                if mask_index == self._mask_index:
+                    self._latest = PoseUpdate(frame_id, candidates, subsets,
+                                              pose, score)
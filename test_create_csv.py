@@ -4,23 +4,38 @@ Test functions for the create_csv.py script.
 
 import os
 import csv
+import numpy as np
 from create_csv import analyze_image, write_to_csv
+from hole_in_the_camera_pose import PoseResult
+
+def one_joint_pose():
+    """
+    Create a pose where only the nose was found, at the top left corner.
+
+    Returns:
+        (PoseResult): The pose.
+    """
+    positions = np.full((18, 2), -1.0)
+    positions[0] = [0, 0]
+    return PoseResult(positions)
 
 def test_analyze_image_none():
     """
-    Test that analyze_image returns an empty dictionary of joints when an
-    invalid image name is given.
+    Test that analyze_image returns a pose with no joints when an invalid
+    image name is given.
     """
     nonexistant_image = "not_an_image.png"
-    assert analyze_image(nonexistant_image) == {}
+    assert not analyze_image(nonexistant_image).detected
 
 def test_analyze_image_keys_size():
     """
-    Test that when a correct image is given, the returned joint_positions
-    dictionary correctly has 18 joint keys.
+    Test that when a correct image is given, the returned pose correctly has
+    a position for each of the 18 joints.
     """
     test_image_name = "first_mask"
-    assert len(analyze_image(test_image_name).keys()) == 18
+    test_pose = analyze_image(test_image_name)
+    assert test_pose.detected
+    assert test_pose.positions.shape == (18, 2)
 
 def test_analyze_image_values():
     """
@@ -30,7 +45,7 @@ def test_analyze_image_values():
     """
     test_image_name = "first_mask"
     test_joint_positions = analyze_image(test_image_name)
-    for _, value in test_joint_positions.items():
+    for value in test_joint_positions.positions:
         # each value in joint_positions should be 2-entries
         if len(value) != 2:
             assert False
@@ -44,7 +59,7 @@ def test_write_to_csv_exists():
     Test that the write_to_csv function correctly creates a csv that is the
     same name as the inputted csv_name.
     """
-    test_joint_positions = {}
+    test_joint_positions = PoseResult()
     test_csv_name = "test"
     write_to_csv(test_csv_name, test_joint_positions)
     csv_exists = os.path.exists(f'mask_joint_positions/{test_csv_name}.csv')
@@ -58,7 +73,7 @@ def test_write_to_csv_no_joints():
     Test that the write_to_csv function correctly creates an empty csv of the
     inputted name when an empty joint_positions dictionary is inputted.
     """
-    test_joint_positions = {}
+    test_joint_positions = PoseResult()
     test_csv_name = "test"
     write_to_csv(test_csv_name, test_joint_positions)
     with open(f'mask_joint_positions/{test_csv_name}.csv', 'r') as csv_file:
@@ -70,10 +85,10 @@ def test_write_to_csv_no_joints():
 def test_write_to_csv_one_joint():
     """
     Test that the write_to_csv function correctly creates a csv of the inputted
-    name with only one row, corresponding to the one joint inputted through the
-    joint_positions dictionary.
+    name with a row for every joint when only one joint was found, as the
+    joints that were not found are written as -1, -1.
     """
-    test_joint_positions = {'0': [0, 0]}
+    test_joint_positions = one_joint_pose()
     test_csv_name = "test"
     write_to_csv(test_csv_name, test_joint_positions)
     with open(f'mask_joint_positions/{test_csv_name}.csv', 'r') as csv_file:
@@ -82,14 +97,14 @@ def test_write_to_csv_one_joint():
         row_count = sum(1 for _ in csv_reader)
     # file deleted to ensure a clean workspace
     os.remove(f'mask_joint_positions/{test_csv_name}.csv')
-    assert row_count == 1
+    assert row_count == 18
 
 def test_write_to_csv_one_joint_values():
     """
     Test that the value in the csv generated by write_to_csv correctly stores
-    the inputted joint_positions dictionary.
+    the inputted pose, and the joints that were not found as -1, -1.
     """
-    test_joint_positions = {'0': [0, 0]}
+    test_joint_positions = one_joint_pose()
     test_csv_name = "test"
     write_to_csv(test_csv_name, test_joint_positions)
     with open(f'mask_joint_positions/{test_csv_name}.csv', 'r') as csv_file:
@@ -97,10 +112,10 @@ def test_write_to_csv_one_joint_values():
         joint_counter = 0
         for row in csv_reader:
             # check to make sure each row in the csv equals to inputted
-            # dictionary values
-            if row[0] != str(joint_counter) or row[1] !=\
-                str(test_joint_positions[str(joint_counter)][0]) or\
-                row[2] != str(test_joint_positions[str(joint_counter)][1]):
+            # pose values
+            expected = ['0', '0.0', '0.0'] if joint_counter == 0 else\
+                [str(joint_counter), '-1', '-1']
+            if row != expected:
                 assert False
             joint_counter += 1
     # file deleted to ensure a clean workspace
@@ -135,9 +150,11 @@ def test_write_to_csv_eighteen_joint_values():
         csv_reader = csv.reader(csv_file)
         joint_counter = 0
         for row in csv_reader:
-            if row[0] != str(joint_counter) or row[1] !=\
-                str(test_joint_positions[str(joint_counter)][0]) or\
-                row[2] != str(test_joint_positions[str(joint_counter)][1]):
+            position = test_joint_positions.positions[joint_counter]
+            if not test_joint_positions.present[joint_counter]:
+                position = [-1, -1]
+            if row != [str(joint_counter), str(position[0]),
+                       str(position[1])]:
                 assert False
             joint_counter += 1
     # file deleted to ensure a clean workspace
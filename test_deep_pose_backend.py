@@ -0,0 +1,36 @@
+"""
+Tests for the inference backends, run on randomly initialized weights.
+"""
+import os
+import numpy as np
+from deep_pose.backend import OnnxBackend
+from deep_pose.body import Body
+from deep_pose.compiled import weights_fingerprint
+
+
+def test_non_torch_backend_rejects_torch_options(weights_path):
+    """
+    Test that options only the PyTorch backend supports raise an error with
+    another backend instead of being ignored.
+    """
+    for options in [{"precision": "int8"}, {"compile_mode": "trace"},
+                    {"calibration_images": [np.zeros((8, 8, 3))]}]:
+        try:
+            Body(weights_path, backend="onnx", **options)
+            assert False
+        except ValueError:
+            assert True
+
+
+def test_onnx_cache_keyed_by_weights(weights_path):
+    """
+    Test that the exported graph is named after the weights it was exported
+    from, so replaced weights are exported again.
+    """
+    test_backend = OnnxBackend(weights_path, stages=1)
+    fingerprint = weights_fingerprint(weights_path)
+    assert test_backend.onnx_path == \
+        weights_path[:-len(".pth")] + f".{fingerprint}.stages1.onnx"
+    assert os.path.exists(test_backend.onnx_path)
+    paf, heatmap = test_backend(np.zeros((1, 3, 64, 64), dtype=np.float32))
+    assert paf.shape == (1, 38, 8, 8) and heatmap.shape == (1, 19, 8, 8)
@@ -0,0 +1,156 @@
+"""
+Tests for the Body class, run on randomly initialized weights.
+"""
+import numpy as np
+import deep_pose.util as util
+from deep_pose.arena import BufferArena
+from deep_pose.body import Body
+
+
+def random_frame(seed, shape=(240, 320, 3)):
+    """
+    Make a frame of random pixels.
+
+    Args:
+        seed (int): Seed of the random pixels.
+        shape (tuple): Shape of the frame.
+    Returns:
+        (numpy.ndarray): The frame as uint8 BGR pixels.
+    """
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_batch_reuses_buffers(weights_path):
+    """
+    Test that a batch keeps one set of scratch arrays however many frames it
+    has, rather than a set per frame.
+    """
+    # pylint: disable=protected-access
+    test_body = Body(weights_path, stages=1)
+    test_body.batch([random_frame(0)])
+    single = set(test_body.arena._buffers)
+    test_body.batch([random_frame(seed) for seed in range(3)])
+    assert set(test_body.arena._buffers) == single
+
+
+def same_poses(first, second):
+    """
+    Check whether two (candidate, subset) results hold the same poses.
+
+    Args:
+        first (tuple): A candidate and subset array.
+        second (tuple): A candidate and subset array.
+    Returns:
+        (bool): True if the candidates match to within float rounding and
+            the subsets are identical.
+    """
+    return (first[0].shape == second[0].shape
+            and np.allclose(first[0], second[0], atol=1e-4)
+            and np.array_equal(first[1], second[1]))
+
+
+def test_batch_one_result_per_frame(weights_path):
+    """
+    Test that a batch returns a candidate and subset array for each frame.
+    """
+    test_body = Body(weights_path)
+    results = test_body.batch([random_frame(0), random_frame(1)])
+    assert len(results) == 2
+    for candidate, subset in results:
+        assert candidate.ndim == 2 and candidate.shape[1] == 4
+        assert subset.ndim == 2 and subset.shape[1] == 20
+
+
+def test_batch_matches_call(weights_path):
+    """
+    Test that each frame of a batch gets the poses a call on that frame alone
+    finds.
+    """
+    test_body = Body(weights_path)
+    frames = [random_frame(0), random_frame(1)]
+    results = test_body.batch(frames)
+    assert all(same_poses(result, test_body(frame))
+               for frame, result in zip(frames, results))
+
+
+def test_batch_mixed_sizes_matches_call(weights_path):
+    """
+    Test that frames of different sizes in one batch each get the poses a
+    call on that frame alone finds.
+    """
+    test_body = Body(weights_path)
+    frames = [random_frame(0), random_frame(1, (200, 300, 3)),
+              random_frame(2)]
+    results = test_body.batch(frames)
+    assert len(results) == 3
+    assert all(same_poses(result, test_body(frame))
+               for frame, result in zip(frames, results))
+
+
+def test_batch_empty(weights_path):
+    """
+    Test that a batch of no frames has no results.
+    """
+    assert Body(weights_path, stages=1).batch([]) == []
+
+
+def original_input(image, stride=8, padValue=128):
+    """
+    Pad and normalize one image as Body did before _stack, with
+    padRightDownCorner.
+
+    Args:
+        image (numpy.ndarray): A resized BGR frame.
+        stride (int): The network's stride.
+        padValue (int): The pixel value of the padding.
+    Returns:
+        (numpy.ndarray): The 1 x 3 x H x W network input.
+    """
+    padded, _ = util.padRightDownCorner(image, stride, padValue)
+    return np.transpose(np.float32(padded[:, :, :, np.newaxis]),
+                        (3, 2, 0, 1)) / 256 - 0.5
+
+
+def test_stack_single_matches_original():
+    """
+    Test that stacking a single image gives exactly the input the original
+    padding and normalization gave.
+    """
+    # pylint: disable=protected-access
+    for shape in [(184, 245, 3), (184, 248, 3), (181, 250, 3)]:
+        image = random_frame(shape[1], shape)
+        stacked = Body._stack([image], 8, 128, BufferArena())
+        assert np.array_equal(stacked, original_input(image))
+
+
+def test_stack_mixed_sizes_matches_original():
+    """
+    Test that each image of a batch of different sizes is the original
+    input, padded further with the normalized pad value.
+    """
+    # pylint: disable=protected-access
+    images = [random_frame(0, (184, 245, 3)), random_frame(1, (170, 276, 3))]
+    stacked = Body._stack(images, 8, 128, BufferArena())
+    assert stacked.shape == (2, 3, 184, 280)
+    for image, out in zip(images, stacked):
+        expected = np.zeros(out.shape, dtype=np.float32)
+        original = original_input(image)[0]
+        expected[:, :original.shape[1], :original.shape[2]] = original
+        assert np.array_equal(out, expected)
+
+
+def test_stack_width_multiple_matches_original():
+    """
+    Test that padding the width to a larger multiple only adds normalized
+    padding to the right of the original input, including when the images
+    come from an iterator with their sizes given.
+    """
+    # pylint: disable=protected-access
+    images = [random_frame(0, (184, 245, 3)), random_frame(1, (184, 200, 3))]
+    sizes = [image.shape[:2] for image in images]
+    stacked = Body._stack(iter(images), 8, 128, BufferArena(), 64, sizes)
+    assert stacked.shape == (2, 3, 184, 256)
+    for image, out in zip(images, stacked):
+        original = original_input(image)[0]
+        assert np.array_equal(out[:, :, :original.shape[2]], original)
+        assert not out[:, :, original.shape[2]:].any()
@@ -0,0 +1,74 @@
+"""
+Tests for the compiled model cache, run on a small stand-in for
+bodypose_model so they do not need the model weights.
+"""
+import os
+import tempfile
+import torch
+from deep_pose.compiled import CompiledModel, weights_fingerprint
+
+
+class TinyModel(torch.nn.Module):
+    """
+    A single convolution that returns two outputs, like bodypose_model.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 2, 3, padding=1)
+
+    def forward(self, x):
+        """
+        Return the convolution of the input twice.
+        """
+        out = self.conv(x)
+        return out, out
+
+
+def test_script_cached_once():
+    """
+    Test that a scripted model is saved once and used for every input shape.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compiled = CompiledModel(TinyModel().eval(), "script", cache_dir,
+                                 "tiny")
+        compiled(torch.zeros(1, 3, 16, 16))
+        compiled(torch.zeros(1, 3, 16, 24))
+        assert os.listdir(cache_dir) == ["tiny.script.pt"]
+
+
+def test_trace_cached_per_shape():
+    """
+    Test that a traced model is saved for each input shape.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compiled = CompiledModel(TinyModel().eval(), "trace", cache_dir,
+                                 "tiny")
+        compiled(torch.zeros(1, 3, 16, 16))
+        compiled(torch.zeros(1, 3, 16, 24))
+        compiled(torch.zeros(1, 3, 16, 16))
+        assert sorted(os.listdir(cache_dir)) == ["tiny.trace.1x3x16x16.pt",
+                                                 "tiny.trace.1x3x16x24.pt"]
+
+
+def test_weights_fingerprint_changes():
+    """
+    Test that replacing a weights file changes its fingerprint, whether the
+    new file has another size or only another modification time.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        path = os.path.join(cache_dir, "weights.pth")
+        with open(path, "wb") as weights:
+            weights.write(b"old weights")
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        old = weights_fingerprint(path)
+        assert weights_fingerprint(path) == old
+        with open(path, "wb") as weights:
+            weights.write(b"newer weights")
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        resized = weights_fingerprint(path)
+        assert resized != old
+        with open(path, "wb") as weights:
+            weights.write(b"other weights")
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        assert weights_fingerprint(path) not in (old, resized)
@@ -0,0 +1,107 @@
+"""
+Tests for converted checkpoints, written from randomly initialized weights.
+"""
+import numpy as np
+import pytest
+import torch
+from deep_pose.backend import TorchBackend, load_model
+from deep_pose.body import Body
+from deep_pose.convert import convert
+
+# A preprocessed input the size of a 240 x 320 frame at the first scale.
+INPUT = torch.from_numpy(np.random.default_rng(0).uniform(
+    -0.5, 0.5, (1, 3, 184, 248)).astype(np.float32))
+
+
+@pytest.fixture(scope="module")
+def int8_path(weights_path, tmp_path_factory):
+    """
+    Convert the random weights to a one stage int8 checkpoint.
+
+    Returns:
+        (str): Path to the checkpoint.
+    """
+    path = str(tmp_path_factory.mktemp("int8") / "body_pose_model.int8.pth")
+    convert(weights_path, path, "int8", stages=1)
+    return path
+
+
+def outputs(model):
+    """
+    Run a model on INPUT.
+
+    Args:
+        model (torch.nn.Module): The model to run.
+    Returns:
+        (tuple): The part affinity fields and heatmaps it returns.
+    """
+    with torch.no_grad():
+        return model(INPUT)
+
+
+def test_float32_round_trip(weights_path, tmp_path):
+    """
+    Test that a float32 checkpoint loads the same weights as the original
+    and runs any number of stages.
+    """
+    path = str(tmp_path / "body_pose_model.float32.pth")
+    convert(weights_path, path)
+    original, _ = load_model(weights_path)
+    for stages in [6, 2]:
+        converted, precision = load_model(path, stages)
+        assert precision == "float32"
+        assert converted.stages == stages
+    converted, _ = load_model(path)
+    assert converted.state_dict().keys() == original.state_dict().keys()
+    assert all(torch.equal(converted.state_dict()[name], value)
+               for name, value in original.state_dict().items())
+
+
+def test_int8_round_trip(weights_path, int8_path):
+    """
+    Test that an int8 checkpoint loads as the quantized model it was written
+    from, without calibrating again.
+    """
+    converted, precision = load_model(int8_path, 1)
+    assert precision == "int8"
+    # calibrated on the same reference poses as the checkpoint was
+    quantized = Body(weights_path, stages=1, precision="int8").backend.model
+    for first, second in zip(outputs(converted), outputs(quantized)):
+        assert torch.equal(first, second)
+
+
+def test_int8_stages_mismatch(int8_path):
+    """
+    Test that loading an int8 checkpoint with another number of stages than
+    it was quantized with raises an error.
+    """
+    try:
+        load_model(int8_path, 2)
+        assert False
+    except ValueError:
+        assert True
+
+
+def test_int8_precision_mismatch(int8_path):
+    """
+    Test that asking for another precision than an int8 checkpoint holds
+    raises an error.
+    """
+    for precision in ["float32", "bfloat16"]:
+        try:
+            TorchBackend(int8_path, 1, precision)
+            assert False
+        except ValueError:
+            assert True
+
+
+def test_convert_unknown_precision(weights_path, tmp_path):
+    """
+    Test that converting to a precision without a checkpoint format raises
+    an error.
+    """
+    try:
+        convert(weights_path, str(tmp_path / "bfloat16.pth"), "bfloat16")
+        assert False
+    except ValueError:
+        assert True
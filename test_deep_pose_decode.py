@@ -0,0 +1,600 @@
+"""
+Tests for the Deep Pose decoder functions, which are compared against the
+loops they replaced in the original OpenPose code on synthetic network
+outputs. None of them need the model weights.
+"""
+import math
+import cv2
+import numpy as np
+from scipy.ndimage import gaussian_filter
+import deep_pose.body as body
+from deep_pose.backend import BACKENDS, PoseBackend
+from deep_pose.body import (Body, assemble_subsets, connect_limb, find_peaks,
+                            nearby_pairs, single_person_subset)
+
+# Peak and limb affinity thresholds used by Body.
+THRE1 = 0.1
+THRE2 = 0.05
+
+# Limbs and their PAF channels, as in Body._decode.
+LIMB_SEQ = [[2, 3], [2, 6], [3, 4], [4, 5], [6, 7], [7, 8], [2, 9], [9, 10],
+            [10, 11], [2, 12], [12, 13], [13, 14], [2, 1], [1, 15], [15, 17],
+            [1, 16], [16, 18], [3, 17], [6, 18]]
+MAP_IDX = [[31, 32], [39, 40], [33, 34], [35, 36], [41, 42], [43, 44],
+           [19, 20], [21, 22], [23, 24], [25, 26], [27, 28], [29, 30],
+           [47, 48], [49, 50], [53, 54], [51, 52], [55, 56], [37, 38],
+           [45, 46]]
+
+# Position of each part of a standing person relative to their hips.
+SKELETON = np.array([[0, -40], [0, -28], [-10, -28], [-14, -14], [-16, 0],
+                     [10, -28], [14, -14], [16, 0], [-6, 0], [-7, 18],
+                     [-8, 36], [6, 0], [7, 18], [8, 36], [-3, -43], [3, -43],
+                     [-6, -41], [6, -41]], dtype=float)
+
+
+def noise_maps(seed, channels=18, shape=(184, 240)):
+    """
+    Make maps like the network's upsampled output, from uniform noise on the
+    network's stride 8 grid.
+
+    Args:
+        seed (int): Seed of the noise.
+        channels (int): Number of maps.
+        shape (tuple): Height and width of the maps.
+    Returns:
+        (numpy.ndarray): H x W x channels float32 maps.
+    """
+    grid = np.random.default_rng(seed).uniform(
+        0, 1, (shape[0] // 8, shape[1] // 8, channels)).astype(np.float32)
+    return cv2.resize(grid, shape[::-1], interpolation=cv2.INTER_CUBIC)
+
+
+def people_maps(seed, people, shape=(240, 320), dropped_limbs=0.0):
+    """
+    Make heatmaps and part affinity fields like the network's upsampled
+    output for a frame with several people in it.
+
+    Args:
+        seed (int): Seed for the positions of the people.
+        people (int): Number of people in the frame.
+        shape (tuple): Height and width of the maps.
+        dropped_limbs (float): Chance of leaving each limb of each person out
+            of the part affinity fields, so people fall apart into pieces
+            that have to be merged.
+    Returns:
+        (numpy.ndarray): H x W x 19 float32 heatmaps.
+        (numpy.ndarray): H x W x 38 float32 part affinity fields.
+    """
+    generator = np.random.default_rng(seed)
+    height, width = shape
+    heatmaps = np.zeros(shape + (19,))
+    pafs = np.zeros(shape + (38,))
+    ys, xs = np.mgrid[:height, :width]
+    for _ in range(people):
+        centre = generator.uniform([30, 60], [width - 30, height - 50])
+        joints = centre + SKELETON * generator.uniform(1.0, 1.4) + \
+            generator.normal(0, 1.5, SKELETON.shape)
+        for part, (x, y) in enumerate(joints):
+            heatmaps[:, :, part] = np.maximum(
+                heatmaps[:, :, part],
+                np.exp(-((xs - x) ** 2 + (ys - y) ** 2) / 32))
+        for (part_a, part_b), channels in zip(LIMB_SEQ, MAP_IDX):
+            if generator.random() < dropped_limbs:
+                continue
+            start, end = joints[part_a - 1], joints[part_b - 1]
+            length = np.linalg.norm(end - start)
+            unit = (end - start) / length
+            along = (xs - start[0]) * unit[0] + (ys - start[1]) * unit[1]
+            across = np.abs((xs - start[0]) * unit[1]
+                            - (ys - start[1]) * unit[0])
+            on_limb = (along >= 0) & (along <= length) & (across <= 3)
+            pafs[on_limb, channels[0] - 19] = unit[0]
+            pafs[on_limb, channels[1] - 19] = unit[1]
+    heatmaps[:, :, 18] = 1 - heatmaps[:, :, :18].max(axis=2)
+
+    def network(maps):
+        # through the stride 8 grid and back up, as the network's output is
+        grid = cv2.resize(maps.astype(np.float32), (width // 8, height // 8),
+                          interpolation=cv2.INTER_AREA)
+        return cv2.resize(grid, (width, height),
+                          interpolation=cv2.INTER_CUBIC)
+
+    return network(heatmaps), network(pafs)
+
+
+def original_peaks(heatmap_avg):
+    """
+    Find the peaks of every part the way the original OpenPose code did,
+    one part at a time in float64.
+
+    Args:
+        heatmap_avg (numpy.ndarray): H x W x 18 or more heatmaps.
+    Returns:
+        (list): For each part, a list of (x, y, score, id) tuples.
+    """
+    all_peaks = []
+    peak_counter = 0
+    for part in range(18):
+        map_ori = heatmap_avg[:, :, part].astype(np.float64)
+        one_heatmap = gaussian_filter(map_ori, sigma=3)
+        map_left = np.zeros(one_heatmap.shape)
+        map_left[1:, :] = one_heatmap[:-1, :]
+        map_right = np.zeros(one_heatmap.shape)
+        map_right[:-1, :] = one_heatmap[1:, :]
+        map_up = np.zeros(one_heatmap.shape)
+        map_up[:, 1:] = one_heatmap[:, :-1]
+        map_down = np.zeros(one_heatmap.shape)
+        map_down[:, :-1] = one_heatmap[:, 1:]
+        peaks_binary = np.logical_and.reduce(
+            (one_heatmap >= map_left, one_heatmap >= map_right,
+             one_heatmap >= map_up, one_heatmap >= map_down,
+             one_heatmap > THRE1))
+        peaks = list(zip(np.nonzero(peaks_binary)[1],
+                         np.nonzero(peaks_binary)[0]))
+        all_peaks.append([(x, y, map_ori[y, x], peak_counter + i)
+                          for i, (x, y) in enumerate(peaks)])
+        peak_counter += len(peaks)
+    return all_peaks
+
+
+def original_connections(all_peaks, paf_avg, image_height, mid_num=10):
+    """
+    Connect the peaks of each limb the way the original OpenPose code did,
+    scoring one pair of peaks at a time.
+
+    Args:
+        all_peaks (list): For each part, a list of (x, y, score, id) tuples.
+        paf_avg (numpy.ndarray): H x W x 38 part affinity fields.
+        image_height (float): Height used for the limb length prior.
+        mid_num (int): Number of points sampled along each pair.
+    Returns:
+        (list): For each limb, n x 5 rows of id A, id B, score, index in
+            candA and index in candB, or an empty list.
+        (list): Limbs for which one of the parts had no peaks.
+    """
+    connection_all = []
+    special_k = []
+    for k, (limb, channels) in enumerate(zip(LIMB_SEQ, MAP_IDX)):
+        score_mid = paf_avg[:, :, [x - 19 for x in channels]]
+        cand_a = all_peaks[limb[0] - 1]
+        cand_b = all_peaks[limb[1] - 1]
+        if len(cand_a) == 0 or len(cand_b) == 0:
+            special_k.append(k)
+            connection_all.append([])
+            continue
+        connection_candidate = []
+        for i, peak_a in enumerate(cand_a):
+            for j, peak_b in enumerate(cand_b):
+                vec = np.subtract(peak_b[:2], peak_a[:2])
+                norm = max(0.001, math.sqrt(vec[0] * vec[0] + vec[1] * vec[1]))
+                vec = np.divide(vec, norm)
+                startend = list(zip(
+                    np.linspace(peak_a[0], peak_b[0], num=mid_num),
+                    np.linspace(peak_a[1], peak_b[1], num=mid_num)))
+                vec_x = np.array([score_mid[int(round(y)), int(round(x)), 0]
+                                  for x, y in startend])
+                vec_y = np.array([score_mid[int(round(y)), int(round(x)), 1]
+                                  for x, y in startend])
+                score_midpts = np.multiply(vec_x, vec[0]) + \
+                    np.multiply(vec_y, vec[1])
+                score_with_dist_prior = \
+                    sum(score_midpts) / len(score_midpts) + \
+                    min(0.5 * image_height / norm - 1, 0)
+                criterion1 = len(np.nonzero(score_midpts > THRE2)[0]) > \
+                    0.8 * len(score_midpts)
+                if criterion1 and score_with_dist_prior > 0:
+                    connection_candidate.append([i, j, score_with_dist_prior])
+        connection_candidate = sorted(connection_candidate,
+                                      key=lambda x: x[2], reverse=True)
+        connection = np.zeros((0, 5))
+        for i, j, score in connection_candidate:
+            if i not in connection[:, 3] and j not in connection[:, 4]:
+                connection = np.vstack(
+                    [connection, [cand_a[i][3], cand_b[j][3], score, i, j]])
+                if len(connection) >= min(len(cand_a), len(cand_b)):
+                    break
+        connection_all.append(connection)
+    return connection_all, special_k
+
+
+def original_subsets(candidate, connection_all, special_k):
+    """
+    Group limb connections into people the way the original OpenPose code
+    did, growing and deleting rows of the subset one at a time.
+
+    Args:
+        candidate (numpy.ndarray): n x 4 rows of x, y, score and id.
+        connection_all (list): Per-limb connections.
+        special_k (list): Limbs for which one of the parts had no peaks.
+    Returns:
+        (numpy.ndarray): m x 20 subset.
+        (int): Number of times two people were merged.
+    """
+    merges = 0
+    subset = -1 * np.ones((0, 20))
+    for k, limb in enumerate(LIMB_SEQ):
+        if k in special_k:
+            continue
+        part_as = connection_all[k][:, 0]
+        part_bs = connection_all[k][:, 1]
+        index_a, index_b = np.array(limb) - 1
+        for i, connection in enumerate(connection_all[k]):
+            found = 0
+            subset_idx = [-1, -1]
+            for j, row in enumerate(subset):
+                if row[index_a] == part_as[i] or row[index_b] == part_bs[i]:
+                    subset_idx[found] = j
+                    found += 1
+            if found == 1:
+                j = subset_idx[0]
+                if subset[j][index_b] != part_bs[i]:
+                    subset[j][index_b] = part_bs[i]
+                    subset[j][-1] += 1
+                    subset[j][-2] += candidate[int(part_bs[i]), 2] + \
+                        connection[2]
+            elif found == 2:
+                j1, j2 = subset_idx
+                membership = ((subset[j1] >= 0).astype(int)
+                              + (subset[j2] >= 0).astype(int))[:-2]
+                if len(np.nonzero(membership == 2)[0]) == 0:
+                    merges += 1
+                    subset[j1][:-2] += (subset[j2][:-2] + 1)
+                    subset[j1][-2:] += subset[j2][-2:]
+                    subset[j1][-2] += connection[2]
+                    subset = np.delete(subset, j2, 0)
+                else:
+                    subset[j1][index_b] = part_bs[i]
+                    subset[j1][-1] += 1
+                    subset[j1][-2] += candidate[int(part_bs[i]), 2] + \
+                        connection[2]
+            elif k < 17:
+                row = -1 * np.ones(20)
+                row[index_a] = part_as[i]
+                row[index_b] = part_bs[i]
+                row[-1] = 2
+                row[-2] = sum(candidate[connection[:2].astype(int), 2]) + \
+                    connection[2]
+                subset = np.vstack([subset, row])
+    delete_idx = [i for i, row in enumerate(subset)
+                  if row[-1] < 4 or row[-2] / row[-1] < 0.4]
+    return np.delete(subset, delete_idx, axis=0), merges
+
+
+def split_peaks(heatmaps):
+    """
+    Find the peaks of every part with find_peaks and split them by part, as
+    Body._decode does.
+
+    Args:
+        heatmaps (numpy.ndarray): H x W x 19 heatmaps.
+    Returns:
+        (numpy.ndarray): n x 4 candidate rows of x, y, score and id.
+        (list): The candidate rows of each part.
+    """
+    peaks = find_peaks(heatmaps[:, :, :18], THRE1)
+    candidate = peak_rows(peaks)
+    return candidate, np.split(candidate, np.searchsorted(peaks["part"],
+                                                          np.arange(1, 18)))
+
+
+def peak_rows(peaks):
+    """
+    Convert the peaks found by find_peaks to rows of x, y, score and id.
+
+    Args:
+        peaks (numpy.ndarray): Peaks returned by find_peaks.
+    Returns:
+        (numpy.ndarray): n x 4 candidate rows.
+    """
+    return np.column_stack((peaks["x"], peaks["y"], peaks["score"],
+                            peaks["id"]))
+
+
+def test_find_peaks_matches_original():
+    """
+    Test that find_peaks finds the same peaks as the original code on noisy
+    float32 maps, where neighbouring pixels can blur to nearly equal values.
+    """
+    for seed in range(30):
+        heatmaps = noise_maps(seed)
+        expected = np.array([peak for part in original_peaks(heatmaps)
+                             for peak in part])
+        assert np.array_equal(peak_rows(find_peaks(heatmaps, THRE1)),
+                              expected)
+
+
+def test_find_peaks_parts():
+    """
+    Test that each peak records the part it was found in.
+    """
+    heatmaps = noise_maps(0)
+    peaks = find_peaks(heatmaps, THRE1)
+    counts = [len(part) for part in original_peaks(heatmaps)]
+    assert list(np.bincount(peaks["part"], minlength=18)) == counts
+
+
+def test_connect_limb_matches_original():
+    """
+    Test that scoring every pairing of a limb's peaks at once and keeping
+    the best ones connects the same peaks, with the same scores, as scoring
+    them one pair at a time, with and without the limb length cutoff.
+    """
+    for seed in range(4):
+        heatmaps, pafs = people_maps(seed, 2 + seed)
+        candidate, all_peaks = split_peaks(heatmaps)
+        expected, special_k = original_connections(
+            [list(map(tuple, peaks)) for peaks in all_peaks], pafs, 240)
+        for k, (limb, channels) in enumerate(zip(LIMB_SEQ, MAP_IDX)):
+            if k in special_k:
+                continue
+            for max_length in [None, 240]:
+                connection = connect_limb(
+                    all_peaks[limb[0] - 1], all_peaks[limb[1] - 1], pafs,
+                    [x - 19 for x in channels], 240, THRE2,
+                    max_length=max_length)
+                assert np.array_equal(connection, expected[k])
+        assert len(candidate) > 0
+
+
+def test_connect_limb_equal_scores():
+    """
+    Test that when pairings score exactly the same, the one with the lowest
+    index in candA and then candB is kept, as in the original code.
+    """
+    # a field pointing right everywhere along the neck to right shoulder limb
+    pafs = np.zeros((60, 60, 38), dtype=np.float32)
+    pafs[:, :, MAP_IDX[0][0] - 19] = 1
+    # both of B's peaks are as far above as below A's peaks, so each peak
+    # in A scores the same with either of them
+    cand_a = np.array([[10.0, 20, 0.9, 0], [10, 40, 0.9, 1]])
+    cand_b = np.array([[30.0, 30, 0.9, 2], [30, 10, 0.9, 3]])
+    for peaks_a, peaks_b in [(cand_a, cand_b), (cand_a[:1], cand_b),
+                             (cand_a, cand_b[:1])]:
+        all_peaks = [[]] * 18
+        all_peaks[1] = list(map(tuple, peaks_a))
+        all_peaks[2] = list(map(tuple, peaks_b))
+        expected = original_connections(all_peaks, pafs, 60)[0][0]
+        connection = connect_limb(peaks_a, peaks_b, pafs, [12, 13], 60,
+                                  THRE2)
+        assert np.array_equal(connection, expected)
+    assert np.array_equal(connect_limb(cand_a[:1], cand_b, pafs, [12, 13],
+                                       60, THRE2)[:, 3:], [[0, 0]])
+
+
+def test_assemble_subsets_matches_original():
+    """
+    Test that grouping connections into people gives the same subset as the
+    original code in crowded frames where people fall apart into pieces that
+    are merged back together.
+    """
+    merges = 0
+    for seed in range(6):
+        heatmaps, pafs = people_maps(seed, 6, dropped_limbs=0.2)
+        candidate, all_peaks = split_peaks(heatmaps)
+        connection_all, special_k = original_connections(
+            [list(map(tuple, peaks)) for peaks in all_peaks], pafs, 240)
+        expected, seed_merges = original_subsets(candidate, connection_all,
+                                                 special_k)
+        merges += seed_merges
+        subset = assemble_subsets(candidate, connection_all, special_k,
+                                  LIMB_SEQ)
+        assert np.array_equal(subset, expected)
+    # the merge path was taken
+    assert merges > 0
+
+
+def test_assemble_subsets_no_connections():
+    """
+    Test that a frame without any connections has no people.
+    """
+    subset = assemble_subsets(np.zeros((0, 4)), [[]] * 19, list(range(19)),
+                              LIMB_SEQ)
+    assert subset.shape == (0, 20)
+
+
+def test_nearby_pairs_matches_all_pairs():
+    """
+    Test that both the dense and the KD-tree lookup propose exactly the
+    pairings at most max_length apart, including pairings exactly
+    max_length apart, ordered by index in candA and then candB.
+    """
+    generator = np.random.default_rng(0)
+    for count in [5, 40]:
+        cand_a = np.zeros((count, 4))
+        cand_b = np.zeros((count, 4))
+        cand_a[:, :2] = generator.integers(0, 100, (count, 2))
+        cand_b[:, :2] = generator.integers(0, 100, (count, 2))
+        # 30, 40, 50 triangles put pairs exactly max_length apart
+        cand_b[:3, :2] = cand_a[:3, :2] + [30, 40]
+        distances = np.linalg.norm(
+            cand_b[np.newaxis, :, :2] - cand_a[:, np.newaxis, :2], axis=-1)
+        expected = np.nonzero(distances <= 50)
+        i, j = nearby_pairs(cand_a, cand_b, 50)
+        assert (count * count > body.KDTREE_PAIRS) == (count == 40)
+        assert np.array_equal(i, expected[0])
+        assert np.array_equal(j, expected[1])
+
+
+def test_nearby_pairs_no_limit():
+    """
+    Test that every pairing is proposed when there is no limb length limit.
+    """
+    i, j = nearby_pairs(np.zeros((3, 4)), np.zeros((2, 4)), None)
+    assert list(i) == [0, 0, 1, 1, 2, 2]
+    assert list(j) == [0, 1, 0, 1, 0, 1]
+
+
+def test_single_person_matches_assemble_subsets():
+    """
+    Test that assembling a lone person from the best peak of each part gives
+    the same row as the multi-person grouping.
+    """
+    for seed in range(5):
+        heatmaps, pafs = people_maps(seed, 1)
+        candidate, all_peaks = split_peaks(heatmaps)
+        connection_all, special_k = original_connections(
+            [list(map(tuple, peaks)) for peaks in all_peaks], pafs, 240)
+        expected = assemble_subsets(candidate, connection_all, special_k,
+                                    LIMB_SEQ)
+        subset = single_person_subset(all_peaks, pafs, LIMB_SEQ[:17],
+                                      MAP_IDX[:17], 240, THRE2)
+        assert expected.shape == subset.shape == (1, 20)
+        assert np.array_equal(subset[:, :18], expected[:, :18])
+        assert subset[0, 19] == expected[0, 19] == 18
+        assert np.isclose(subset[0, 18], expected[0, 18])
+
+
+def test_single_person_affinity_breaks_ties():
+    """
+    Test that when two peaks of a part score within the tie margin, the one
+    the part affinity field connects to its parent is kept even though the
+    other scores higher, and that the higher one is kept without a field.
+    """
+    heatmaps, pafs = people_maps(0, 1)
+    candidate, all_peaks = split_peaks(heatmaps)
+    # a stronger right shoulder mirrored through the neck, which the field
+    # from the neck points away from
+    neck, shoulder = all_peaks[1][0], all_peaks[2][0]
+    decoy = np.array([2 * neck[0] - shoulder[0], 2 * neck[1] - shoulder[1],
+                      shoulder[2] + 0.05, len(candidate)])
+    all_peaks[2] = np.vstack([shoulder, decoy])
+    subset = single_person_subset(all_peaks, pafs, LIMB_SEQ[:17],
+                                  MAP_IDX[:17], 240, THRE2)
+    assert subset[0, 2] == shoulder[3]
+    subset = single_person_subset(all_peaks, np.zeros_like(pafs),
+                                  LIMB_SEQ[:17], MAP_IDX[:17], 240, THRE2)
+    assert subset[0, 2] == decoy[3]
+
+
+# Size of the frame given to SyntheticBackend's Body, and where the parts of
+# the person in it are.
+FRAME_SHAPE = (240, 320)
+FRAME_JOINTS = np.array([160, 150]) + SKELETON * 2.3
+
+
+class SyntheticBackend(PoseBackend):
+    """
+    A backend that ignores its input and returns the network output for the
+    person at FRAME_JOINTS in a frame of FRAME_SHAPE, as a trained network
+    would on its stride 8 grid.
+    """
+
+    def __init__(self, model_path, stages=6):
+        # pylint: disable=unused-argument
+        self.scale = Body.scale_search[0] * Body.boxsize / FRAME_SHAPE[0]
+
+    def __call__(self, data):
+        batch, _, height, width = data.shape
+        # the centre of grid cell i is input pixel 8i + 3.5
+        joints = (FRAME_JOINTS + 0.5) * self.scale / 8 - 0.5
+        ys, xs = np.mgrid[:height // 8, :width // 8]
+        heatmaps = np.zeros((batch, 19, height // 8, width // 8), np.float32)
+        pafs = np.zeros((batch, 38, height // 8, width // 8), np.float32)
+        for part, (x, y) in enumerate(joints):
+            heatmaps[:, part] = np.exp(-((xs - x) ** 2 + (ys - y) ** 2) / 2)
+        for (part_a, part_b), channels in zip(LIMB_SEQ, MAP_IDX):
+            start, end = joints[part_a - 1], joints[part_b - 1]
+            length = np.linalg.norm(end - start)
+            unit = (end - start) / length
+            along = (xs - start[0]) * unit[0] + (ys - start[1]) * unit[1]
+            across = np.abs((xs - start[0]) * unit[1]
+                            - (ys - start[1]) * unit[0])
+            on_limb = (along >= -1) & (along <= length + 1) & (across <= 1)
+            pafs[:, channels[0] - 19, on_limb] = unit[0]
+            pafs[:, channels[1] - 19, on_limb] = unit[1]
+        return pafs, heatmaps
+
+
+def synthetic_joints(monkeypatch, **options):
+    """
+    Find the person SyntheticBackend puts in a blank frame.
+
+    Args:
+        monkeypatch (pytest.MonkeyPatch): Used to add the backend to
+            BACKENDS for the test.
+        options: Keyword arguments for Body.
+    Returns:
+        (numpy.ndarray): 18 x 2 positions of the person's parts in the frame.
+    """
+    monkeypatch.setitem(BACKENDS, "synthetic", SyntheticBackend)
+    test_body = Body("no_weights.pth", backend="synthetic", **options)
+    candidate, subset = test_body(np.zeros(FRAME_SHAPE + (3,), np.uint8))
+    assert len(subset) == 1 and subset[0, -1] == 18
+    return candidate[subset[0, :18].astype(int), :2]
+
+
+def test_network_decode_near_image_decode(monkeypatch):
+    """
+    Test that decoding on the network's grid finds every part within a
+    stride of where decoding the upsampled maps finds it, and of where it
+    really is, so grid positions are mapped back to the frame correctly.
+    """
+    # a stride of the network input, in frame pixels
+    stride = 8 / SyntheticBackend(None).scale
+    image_joints = synthetic_joints(monkeypatch)
+    for subpixel in [False, True]:
+        network_joints = synthetic_joints(monkeypatch, decode="network",
+                                          subpixel=subpixel)
+        assert np.linalg.norm(network_joints - image_joints,
+                              axis=1).max() < stride
+        assert np.linalg.norm(network_joints - FRAME_JOINTS,
+                              axis=1).max() < stride
+
+
+def test_subpixel_decode_closer(monkeypatch):
+    """
+    Test that sub-pixel refinement moves the parts found on the network's
+    grid closer to where they really are.
+    """
+    whole = synthetic_joints(monkeypatch, decode="network")
+    refined = synthetic_joints(monkeypatch, decode="network", subpixel=True)
+    assert np.abs(refined - FRAME_JOINTS).mean() < \
+        np.abs(whole - FRAME_JOINTS).mean()
+
+
+def test_parabola_offset_within_half():
+    """
+    Test that the offset of a peak is at most half a pixel and points
+    towards the larger of its neighbours.
+    """
+    # pylint: disable=protected-access
+    generator = np.random.default_rng(0)
+    centre = generator.uniform(0.5, 1, 1000)
+    before = centre - generator.uniform(0, 0.5, 1000)
+    after = centre - generator.uniform(0, 0.5, 1000)
+    offset = body._parabola_offset(before, centre, after)
+    assert np.all(np.abs(offset) <= 0.5)
+    assert np.array_equal(np.sign(offset), np.sign(after - before))
+
+
+def test_parabola_offset_not_a_peak():
+    """
+    Test that points without a maximum between their neighbours are not
+    moved.
+    """
+    # pylint: disable=protected-access
+    offset = body._parabola_offset(np.array([0.5, 0.2, 0.1]),
+                                   np.array([0.5, 0.5, 0.5]),
+                                   np.array([0.5, 0.8, 0.9]))
+    assert not offset.any()
+
+
+def test_find_peaks_subpixel_toward_true_peak():
+    """
+    Test that sub-pixel refinement moves each peak of a map less than half a
+    pixel, towards the true maximum.
+    """
+    ys, xs = np.mgrid[:24, :32]
+    for true_x, true_y in [(10.3, 12.8), (20.4, 6.1), (15.0, 15.45),
+                           (5.7, 18.2)]:
+        heatmap = np.exp(-((xs - true_x) ** 2 + (ys - true_y) ** 2) / 2)
+        heatmap = heatmap[:, :, np.newaxis].astype(np.float32)
+        whole = find_peaks(heatmap, THRE1, sigma=0.3)
+        refined = find_peaks(heatmap, THRE1, sigma=0.3, subpixel=True)
+        assert len(whole) == len(refined) == 1
+        for axis, true in [("x", true_x), ("y", true_y)]:
+            offset = refined[axis][0] - whole[axis][0]
+            assert abs(offset) <= 0.5
+            assert abs(refined[axis][0] - true) <= abs(whole[axis][0] - true)
+            if abs(true - whole[axis][0]) > 0.05:
+                assert np.sign(offset) == np.sign(true - whole[axis][0])
@@ -0,0 +1,59 @@
+"""
+Tests for the BackgroundBody class.
+"""
+from deep_pose.loader import BackgroundBody
+
+
+def test_not_ready_before_start():
+    """
+    Test that the model is not ready before it starts loading.
+    """
+    test_body = BackgroundBody("missing_weights.pth")
+    assert not test_body.ready
+
+
+def test_failed_load_not_ready():
+    """
+    Test that a model that failed to load is not ready and raises its error
+    when it is asked for.
+    """
+    test_body = BackgroundBody("missing_weights.pth", warmup_shape=None)
+    try:
+        test_body.get()
+        assert False
+    except FileNotFoundError:
+        assert True
+    assert not test_body.ready
+
+
+class RecordingBody:
+    """
+    A stand-in for Body whose batch returns what it was called with.
+    """
+
+    def batch(self, frames, frameHeights=None):
+        """
+        Return the arguments of the call.
+        """
+        return frames, frameHeights
+
+
+class LoadedBody(BackgroundBody):
+    """
+    A BackgroundBody whose model is a RecordingBody.
+    """
+
+    def get(self):
+        """
+        Return the stand-in model.
+        """
+        return RecordingBody()
+
+
+def test_batch_forwards_frame_heights():
+    """
+    Test that batch passes the frame heights on to Body.batch.
+    """
+    test_body = LoadedBody("missing_weights.pth")
+    assert test_body.batch(["frame"], [480]) == (["frame"], [480])
+    assert test_body.batch(["frame"]) == (["frame"], None)
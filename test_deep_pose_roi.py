@@ -0,0 +1,99 @@
+"""
+Tests for the RoiSelector class.
+"""
+import numpy as np
+from deep_pose.roi import RoiSelector
+
+# A blank 640x480 frame.
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+# A person found with two joints, the first at (300, 200) and the second at
+# (340, 260) in frame coordinates.
+CANDIDATE = np.array([[300.0, 200.0, 0.9, 0], [340.0, 260.0, 0.8, 1]])
+SUBSET = np.array([[0, 1] + [-1] * 16 + [1.7, 2]])
+
+
+def test_first_frame_full():
+    """
+    Test that the whole frame is analyzed before anyone has been found.
+    """
+    test_roi = RoiSelector()
+    assert test_roi.select(FRAME) == (0, 0, 640, 480)
+
+
+def test_region_around_keypoints():
+    """
+    Test that the region after a person is found is padded around their
+    joints and grown to the minimum size.
+    """
+    test_roi = RoiSelector(margin=0.5, min_size=0.5)
+    test_roi.select(FRAME)
+    test_roi.observe(CANDIDATE, SUBSET)
+    # 40x60 joints padded by 30 on each side are 100x120, which is grown to
+    # 240x240 around its centre at (320, 230)
+    assert test_roi.select(FRAME) == (200, 110, 440, 350)
+
+
+def test_pad_clamped_to_frame():
+    """
+    Test that a region reaching past the edges of the frame is cut off at
+    them.
+    """
+    # pylint: disable=protected-access
+    test_roi = RoiSelector(margin=0.5, min_size=0.5)
+    # (-120, -120, 120, 120) around the top left corner, and past the
+    # bottom right corner
+    assert test_roi._pad((-20, -20, 20, 20), 640, 480) == (0, 0, 120, 120)
+    assert test_roi._pad((600, 440, 640, 480), 640, 480) == \
+        (500, 340, 640, 480)
+
+
+def test_refresh_cadence():
+    """
+    Test that the whole frame is analyzed again every refresh frames while
+    a person keeps being found.
+    """
+    test_roi = RoiSelector(refresh=3)
+    full = []
+    for _ in range(9):
+        full.append(test_roi.select(FRAME) == (0, 0, 640, 480))
+        test_roi.observe(CANDIDATE, SUBSET)
+    assert full == [True, False, False, False, True, False, False, False,
+                    True]
+
+
+def test_empty_subset_full_frame():
+    """
+    Test that the whole frame is analyzed after a frame in which no one was
+    found.
+    """
+    test_roi = RoiSelector()
+    test_roi.select(FRAME)
+    test_roi.observe(CANDIDATE, SUBSET)
+    assert test_roi.select(FRAME) != (0, 0, 640, 480)
+    test_roi.observe(CANDIDATE, np.zeros((0, 20)))
+    assert test_roi.select(FRAME) == (0, 0, 640, 480)
+
+
+def test_to_frame():
+    """
+    Test that candidates found in the region are moved by its top left
+    corner.
+    """
+    test_roi = RoiSelector(margin=0.5, min_size=0.5)
+    test_roi.select(FRAME)
+    test_roi.observe(CANDIDATE, SUBSET)
+    x0, y0, _, _ = test_roi.select(FRAME)
+    region_candidate = CANDIDATE - [x0, y0, 0, 0]
+    assert np.array_equal(test_roi.to_frame(region_candidate), CANDIDATE)
+
+
+def test_invalid_mode():
+    """
+    Test that an unknown mode raises an error.
+    """
+    try:
+        RoiSelector("everything")
+        assert False
+    except ValueError:
+        assert True
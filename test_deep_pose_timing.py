@@ -0,0 +1,80 @@
+"""
+Tests for the PipelineStats class.
+"""
+import contextlib
+import numpy as np
+from deep_pose.timing import PipelineStats
+
+
+def test_record_summary():
+    """
+    Test that recorded durations are summarized by their count, mean and
+    percentiles.
+    """
+    test_stats = PipelineStats()
+    for seconds in range(1, 101):
+        test_stats.record("forward", seconds)
+    summary = test_stats.summary()["forward"]
+    assert summary["count"] == 100
+    assert summary["mean"] == 50.5
+    assert summary["p50"] == 50.5
+    assert np.isclose(summary["p99"], 99.01)
+
+
+def test_summary_in_pipeline_order():
+    """
+    Test that phases are summarized in the order the pipeline runs them,
+    with other phases last.
+    """
+    test_stats = PipelineStats()
+    for phase in ["assembly", "decode", "resize", "forward"]:
+        test_stats.record(phase, 1.0)
+    assert list(test_stats.summary()) == ["resize", "forward", "assembly",
+                                          "decode"]
+
+
+def test_window_evicts_oldest():
+    """
+    Test that only the most recent window of durations is kept.
+    """
+    test_stats = PipelineStats(window=3)
+    for seconds in [10.0, 1.0, 2.0, 3.0]:
+        test_stats.record("peaks", seconds)
+    summary = test_stats.summary()["peaks"]
+    assert summary["count"] == 3
+    assert summary["mean"] == 2.0
+    assert summary["p99"] < 10.0
+
+
+def test_time_records_duration():
+    """
+    Test that timing a phase records one duration for it.
+    """
+    test_stats = PipelineStats()
+    with test_stats.time("paf"):
+        pass
+    summary = test_stats.summary()["paf"]
+    assert summary["count"] == 1
+    assert summary["mean"] >= 0
+
+
+def test_disabled_records_nothing():
+    """
+    Test that a disabled timer is a nullcontext that records nothing.
+    """
+    test_stats = PipelineStats(enabled=False)
+    timer = test_stats.time("forward")
+    assert isinstance(timer, contextlib.nullcontext)
+    with timer:
+        pass
+    assert test_stats.summary() == {}
+
+
+def test_reset():
+    """
+    Test that resetting forgets every recorded duration.
+    """
+    test_stats = PipelineStats()
+    test_stats.record("resize", 1.0)
+    test_stats.reset()
+    assert test_stats.summary() == {}
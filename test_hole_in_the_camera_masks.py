@@ -0,0 +1,280 @@
+"""
+Tests for the MaskLibrary class.
+"""
+import csv
+import os
+import cv2
+import numpy as np
+from hole_in_the_camera_masks import (MaskLibrary, find_mask_names,
+                                      pack_is_current, score_poses)
+from hole_in_the_camera_pose import PoseResult
+
+MASK_NAMES = ["first_mask", "second_mask", "third_mask"]
+TEST_PACK = "images/test_masks.pack"
+
+
+def saved_joints(mask_name):
+    """
+    Read the joint positions saved for a mask straight from its csv.
+
+    Args:
+        mask_name (str): The name of the mask.
+    Returns:
+        (PoseResult): The saved joint positions.
+    """
+    positions = np.zeros((18, 2))
+    with open(f"mask_joint_positions/{mask_name}.csv", "r") as csv_file:
+        for row in csv.reader(csv_file):
+            positions[int(row[0])] = [float(row[1]), float(row[2])]
+    return PoseResult(positions)
+
+
+def test_joints_shape():
+    """
+    Test that the joints of every mask are kept in a single array.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    assert len(test_library) == 3
+    assert test_library.joints.shape == (3, 18, 2)
+    assert test_library.valid.shape == (3, 18)
+
+
+def test_joints_match_csv():
+    """
+    Test that the saved joint positions are truncated to whole pixels.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    index = test_library.index("third_mask")
+    positions = saved_joints("third_mask").positions
+    assert np.array_equal(test_library.joints[index], positions.astype(int))
+    assert test_library.valid[index].all()
+
+
+def test_mask_shape():
+    """
+    Test that each mask image is resized to fit the screen.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    for index in range(len(test_library)):
+        assert np.shape(test_library.mask(index)) == (480, 640, 3)
+
+
+def test_find_mask_names():
+    """
+    Test that every mask with saved joint positions is found.
+    """
+    assert find_mask_names() == ["fifth_mask", "first_mask", "fourth_mask",
+                                 "second_mask", "seventh_mask", "sixth_mask",
+                                 "third_mask"]
+
+
+def test_find_mask_names_without_joints():
+    """
+    Test that a mask image without saved joint positions is not found.
+    """
+    cv2.imwrite("images/masks/test_mask.png", np.zeros((480, 640)))
+    names = find_mask_names()
+    os.remove("images/masks/test_mask.png")
+    assert "test_mask" not in names
+
+
+def test_library_finds_masks():
+    """
+    Test that a library created without mask names holds every mask.
+    """
+    test_library = MaskLibrary()
+    assert test_library.names == find_mask_names()
+    assert test_library.joints.shape == (7, 18, 2)
+
+
+def test_mask_matches_image():
+    """
+    Test that a mask is the same image the game used to load for it.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    image = cv2.resize(cv2.imread("images/masks/second_mask.png"), (640, 480))
+    assert np.array_equal(test_library.mask(1), image)
+
+
+def test_mask_cached():
+    """
+    Test that a mask is only decoded once while it is cached, and cannot be
+    changed by the code it is shared with.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    mask = test_library.mask(0)
+    assert test_library.mask(0) is mask
+    assert not mask.flags.writeable
+
+
+def test_mask_cache_evicts_least_recent():
+    """
+    Test that the least recently used mask is decoded again once more masks
+    than the cache holds are used.
+    """
+    test_library = MaskLibrary(MASK_NAMES, cache_size=2)
+    first = test_library.mask(0)
+    second = test_library.mask(1)
+    test_library.mask(0)
+    test_library.mask(2)
+    assert test_library.mask(0) is first
+    assert test_library.mask(1) is not second
+    assert np.array_equal(test_library.mask(1), second)
+
+
+def test_prefetch():
+    """
+    Test that a prefetched mask is the same as one decoded when it is asked
+    for.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    test_library.prefetch(2)
+    assert np.array_equal(test_library.mask(2),
+                          MaskLibrary(MASK_NAMES).mask(2))
+    assert test_library.mask(2) is test_library.mask(2)
+
+
+def test_pack_round_trip():
+    """
+    Test that a mask pack holds the same masks and joints as the library it
+    was written from.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    test_library.save_pack(TEST_PACK)
+    test_pack = MaskLibrary.open_pack(TEST_PACK)
+    same_masks = all(np.array_equal(test_pack.mask(index),
+                                    test_library.mask(index))
+                     for index in range(3))
+    same_joints = np.array_equal(test_pack.joints, test_library.joints)
+    same_valid = np.array_equal(test_pack.valid, test_library.valid)
+    same_names = test_pack.names == MASK_NAMES
+    del test_pack
+    os.remove(TEST_PACK)
+    assert same_masks and same_joints and same_valid and same_names
+
+
+def test_bit_pack_round_trip():
+    """
+    Test that bit packing keeps black and white masks as they are, in an
+    eighth of the space.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    test_library.save_pack(TEST_PACK, bits=True)
+    test_pack = MaskLibrary.open_pack(TEST_PACK)
+    same_masks = all(np.array_equal(test_pack.mask(index),
+                                    test_library.mask(index))
+                     for index in range(3))
+    pack_size = os.path.getsize(TEST_PACK)
+    del test_pack
+    os.remove(TEST_PACK)
+    assert same_masks
+    assert pack_size < 3 * 480 * 640 / 8 + 4096
+
+
+def test_open_pack_not_a_pack():
+    """
+    Test that opening a file that is not a mask pack raises an error.
+    """
+    try:
+        MaskLibrary.open_pack("mask_joint_positions/first_mask.csv")
+        assert False
+    except ValueError:
+        assert True
+
+
+def test_pack_is_current():
+    """
+    Test that a pack just written is up to date for its masks and for any
+    of them.
+    """
+    MaskLibrary(MASK_NAMES).save_pack(TEST_PACK)
+    current = pack_is_current(TEST_PACK, MASK_NAMES)
+    current_subset = pack_is_current(TEST_PACK, MASK_NAMES[:2])
+    os.remove(TEST_PACK)
+    assert current and current_subset
+
+
+def test_pack_is_current_missing_mask():
+    """
+    Test that a pack is out of date for a mask it does not hold.
+    """
+    MaskLibrary(MASK_NAMES).save_pack(TEST_PACK)
+    current = pack_is_current(TEST_PACK, MASK_NAMES + ["fourth_mask"])
+    os.remove(TEST_PACK)
+    assert not current
+
+
+def test_pack_is_current_older_than_masks():
+    """
+    Test that a pack written before its masks were changed is out of date.
+    """
+    MaskLibrary(MASK_NAMES).save_pack(TEST_PACK)
+    os.utime(TEST_PACK, (0, 0))
+    current = pack_is_current(TEST_PACK, MASK_NAMES)
+    os.remove(TEST_PACK)
+    assert not current
+
+
+def test_pack_is_current_no_pack():
+    """
+    Test that a pack that does not exist is out of date.
+    """
+    assert not pack_is_current(TEST_PACK, MASK_NAMES)
+
+
+def test_score_same_joints():
+    """
+    Test that a mask's own joints fit it perfectly.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    assert test_library.score(saved_joints("second_mask"), 1) == 100.0
+
+
+def test_score_partial_credit():
+    """
+    Test that joints farther from the saved positions earn less credit.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    joints = saved_joints("first_mask")
+    # Moving one joint 35 pixels and another 45 pixels away costs half and
+    # three quarters of a joint.
+    joints.positions[0, 0] += 35
+    joints.positions[1, 1] += 45
+    assert test_library.score(joints, 0) == (18 - 0.5 - 0.75) / 18 * 100
+
+
+def test_score_no_joints():
+    """
+    Test that a pose with no joints scores 0.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    assert test_library.score(PoseResult(), 0) == 0
+
+
+def test_score_all_matches_score():
+    """
+    Test that scoring a batch of poses against every mask gives the same
+    scores as scoring each pose against each mask.
+    """
+    test_library = MaskLibrary(MASK_NAMES)
+    poses = [saved_joints(name) for name in MASK_NAMES] + [PoseResult()]
+    scores = test_library.score_all(
+        np.array([pose.positions for pose in poses]),
+        np.array([[pose.detected] * 18 for pose in poses]))
+    assert scores.shape == (4, 3)
+    for pose_index, pose in enumerate(poses):
+        for mask_index in range(3):
+            assert scores[pose_index, mask_index] == \
+                test_library.score(pose, mask_index)
+
+
+def test_score_poses_tiers():
+    """
+    Test that each distance tier earns the right share of a joint.
+    """
+    references = np.zeros((1, 18, 2))
+    poses = np.zeros((4, 18, 2))
+    # Every joint of each pose is 0, 35, 45 and 55 pixels away.
+    poses[:, :, 0] = np.array([0, 35, 45, 55])[:, None]
+    scores = score_poses(poses, references)
+    assert list(scores[:, 0]) == [100.0, 50.0, 25.0, 0.0]
@@ -0,0 +1,74 @@
+"""
+Tests for the PoseResult class.
+"""
+import numpy as np
+from hole_in_the_camera_pose import PoseResult
+
+# Open pose outputs for a frame with two people, where the first person's nose
+# and neck were found.
+CANDIDATES = np.array([[100.0, 50.0, 0.9, 0], [110.0, 90.0, 0.8, 1],
+                       [400.0, 60.0, 0.7, 2]])
+SUBSETS = np.array([[0, 1] + [-1] * 16 + [1.7, 2],
+                    [2] + [-1] * 17 + [0.7, 1]])
+
+
+def test_empty_pose():
+    """
+    Test that a pose created without joints has none.
+    """
+    test_pose = PoseResult()
+    assert not test_pose.detected
+    assert test_pose.positions.shape == (18, 2)
+    assert (test_pose.positions == -1).all()
+
+
+def test_from_open_pose_first_person():
+    """
+    Test that the joints of the first person open pose found are kept.
+    """
+    test_pose = PoseResult.from_open_pose(CANDIDATES, SUBSETS)
+    assert test_pose.detected
+    assert list(test_pose.positions[0]) == [100.0, 50.0]
+    assert list(test_pose.positions[1]) == [110.0, 90.0]
+    assert list(test_pose.present[:3]) == [True, True, False]
+
+
+def test_from_open_pose_missing_joints():
+    """
+    Test that joints open pose did not find are at [-1, -1] with no
+    confidence.
+    """
+    test_pose = PoseResult.from_open_pose(CANDIDATES, SUBSETS)
+    assert (test_pose.positions[2:] == -1).all()
+    assert (test_pose.confidence[2:] == 0).all()
+    assert abs(test_pose.confidence[0] - 0.9) < 1e-6
+
+
+def test_from_open_pose_no_person():
+    """
+    Test that a frame with no person gives a pose with no joints.
+    """
+    test_pose = PoseResult.from_open_pose(np.zeros((0, 4)), np.zeros((0, 20)))
+    assert not test_pose.detected
+
+
+def test_present_from_positions():
+    """
+    Test that joints with a negative position are not present unless told
+    otherwise.
+    """
+    positions = np.full((18, 2), -1.0)
+    positions[5] = [20, 30]
+    assert list(np.flatnonzero(PoseResult(positions).present)) == [5]
+
+
+def test_slots():
+    """
+    Test that a pose cannot be given attributes other than its arrays.
+    """
+    test_pose = PoseResult()
+    try:
+        test_pose.score = 100
+        assert False
+    except AttributeError:
+        assert True
@@ -0,0 +1,125 @@
+"""
+Tests for the PoseTracker class.
+"""
+import cv2
+import numpy as np
+from hole_in_the_camera_tracker import PoseTracker
+
+# Open pose outputs for a frame with one person whose nose and neck were
+# found.
+CANDIDATES = np.array([[300.0, 200.0, 0.9, 0], [320.0, 260.0, 0.8, 1]])
+SUBSETS = np.array([[0, 1] + [-1] * 16 + [1.7, 2]])
+
+
+class CountingEstimation:
+    """
+    Stand-in for the open pose body estimation object that always finds the
+    same person and counts how often it is run.
+
+    Attributes:
+        calls (int): The number of frames analyzed.
+    """
+
+    def __init__(self):
+        """
+        Create an estimation object that has not been run.
+        """
+        self.calls = 0
+
+    def __call__(self, frame):
+        """
+        Return the open pose outputs for the fixed person.
+        """
+        self.calls += 1
+        return CANDIDATES, SUBSETS
+
+
+def textured_frame(shift=0):
+    """
+    Create an RGB frame with texture that optical flow can follow.
+
+    Args:
+        shift (int): Number of pixels to move the texture right by.
+    Returns:
+        (numpy.ndarray): A 480x640x3 uint8 frame.
+    """
+    generator = np.random.default_rng(0)
+    noise = generator.integers(0, 255, (480, 640), dtype=np.uint8)
+    gray = cv2.GaussianBlur(noise, (0, 0), 3)
+    gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
+    return cv2.cvtColor(np.roll(gray, shift, axis=1), cv2.COLOR_GRAY2RGB)
+
+
+def test_first_frame_runs_inference():
+    """
+    Test that open pose runs on the first frame and its joints are returned.
+    """
+    estimation = CountingEstimation()
+    test_tracker = PoseTracker(estimation)
+    joints = test_tracker.update(textured_frame())
+    assert estimation.calls == 1
+    assert test_tracker.inferred
+    assert list(joints.positions[0]) == [300.0, 200.0]
+    assert not joints.present[2]
+
+
+def test_joints_follow_motion():
+    """
+    Test that joints move with the image between inferences.
+    """
+    estimation = CountingEstimation()
+    test_tracker = PoseTracker(estimation, smoothing=0)
+    test_tracker.update(textured_frame())
+    joints = test_tracker.update(textured_frame(shift=4))
+    assert estimation.calls == 1
+    assert not test_tracker.inferred
+    assert abs(joints.positions[0, 0] - 304.0) < 0.5
+    assert abs(joints.positions[0, 1] - 200.0) < 0.5
+
+
+def test_smoothing_lags_motion():
+    """
+    Test that smoothed joints only move part of the way towards the tracked
+    position.
+    """
+    test_tracker = PoseTracker(CountingEstimation(), smoothing=0.5)
+    test_tracker.update(textured_frame())
+    joints = test_tracker.update(textured_frame(shift=4))
+    assert abs(joints.positions[0, 0] - 302.0) < 0.5
+
+
+def test_inference_interval():
+    """
+    Test that open pose runs again once the interval has passed.
+    """
+    estimation = CountingEstimation()
+    test_tracker = PoseTracker(estimation, interval=3)
+    for _ in range(7):
+        test_tracker.update(textured_frame())
+    # Open pose runs on the first and fifth frames.
+    assert estimation.calls == 2
+
+
+def test_lost_tracking_runs_inference():
+    """
+    Test that open pose runs again as soon as the joints cannot be tracked.
+    """
+    estimation = CountingEstimation()
+    test_tracker = PoseTracker(estimation)
+    test_tracker.update(textured_frame())
+    test_tracker.update(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert test_tracker.confidence < 0.6
+    test_tracker.update(textured_frame())
+    assert estimation.calls == 2
+
+
+def test_reset_runs_inference():
+    """
+    Test that open pose runs on the frame after the tracker is reset.
+    """
+    estimation = CountingEstimation()
+    test_tracker = PoseTracker(estimation)
+    test_tracker.update(textured_frame())
+    test_tracker.reset()
+    test_tracker.update(textured_frame())
+    assert estimation.calls == 2
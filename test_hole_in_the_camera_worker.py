@@ -0,0 +1,165 @@
+"""
+Tests for the LivePoseWorker class.
+"""
+import threading
+import numpy as np
+from hole_in_the_camera_masks import MaskLibrary
+from hole_in_the_camera_tracker import PoseTracker
+from hole_in_the_camera_worker import LivePoseWorker
+
+# Open pose outputs for a frame with one person whose nose and neck were
+# found.
+CANDIDATES = np.array([[100.0, 50.0, 0.9, 0], [110.0, 90.0, 0.8, 1]])
+SUBSETS = np.array([[0, 1] + [-1] * 16 + [1.7, 2]])
+
+
+def wait_for_result(worker, frame_id):
+    """
+    Wait until the worker has analyzed a frame.
+
+    Args:
+        worker (LivePoseWorker): The worker analyzing the frame.
+        frame_id (int): The number submit returned for the frame.
+    Returns:
+        (PoseUpdate): The result for the frame.
+    """
+    result = worker.result_for(frame_id)
+    while result is None:
+        threading.Event().wait(0.01)
+        result = worker.result_for(frame_id)
+    return result
+
+
+def test_submit_frame_ids_increase():
+    """
+    Test that each submitted frame is given a new, larger number.
+    """
+    test_worker = LivePoseWorker(lambda frame: (CANDIDATES, SUBSETS))
+    first_id = test_worker.submit(np.zeros((480, 640, 3)))
+    second_id = test_worker.submit(np.zeros((480, 640, 3)))
+    assert second_id > first_id
+
+
+def test_latest_joint_positions():
+    """
+    Test that the worker publishes the joint positions of the frame it
+    analyzed.
+    """
+    test_worker = LivePoseWorker(lambda frame: (CANDIDATES, SUBSETS))
+    test_worker.start()
+    frame_id = test_worker.submit(np.zeros((480, 640, 3)))
+    result = wait_for_result(test_worker, frame_id)
+    test_worker.stop()
+    assert list(result.pose.positions[0]) == [100.0, 50.0]
+    assert list(result.pose.positions[1]) == [110.0, 90.0]
+    assert not result.pose.present[2]
+
+
+def test_latest_score_without_mask():
+    """
+    Test that no provisional score is published before a mask is set.
+    """
+    test_worker = LivePoseWorker(lambda frame: (CANDIDATES, SUBSETS))
+    test_worker.start()
+    result = wait_for_result(test_worker,
+                             test_worker.submit(np.zeros((480, 640, 3))))
+    test_worker.stop()
+    assert result.score is None
+
+
+def test_latest_score_with_mask():
+    """
+    Test that the provisional score is computed against the current mask.
+    """
+    test_worker = LivePoseWorker(lambda frame: (CANDIDATES, SUBSETS),
+                                 masks=MaskLibrary(["first_mask"]))
+    test_worker.set_mask(0)
+    test_worker.start()
+    result = wait_for_result(test_worker,
+                             test_worker.submit(np.zeros((480, 640, 3))))
+    test_worker.stop()
+    assert 0 <= result.score <= 100
+
+
+def test_stale_frames_dropped():
+    """
+    Test that frames submitted while the worker is busy are replaced by the
+    newest one, and that only the newest one is analyzed.
+    """
+    started = threading.Event()
+    release = threading.Event()
+    analyzed = []
+
+    def slow_estimation(frame):
+        analyzed.append(frame[0, 0, 0])
+        started.set()
+        release.wait()
+        return CANDIDATES, SUBSETS
+
+    test_worker = LivePoseWorker(slow_estimation)
+    test_worker.start()
+    test_worker.submit(np.full((480, 640, 3), 1))
+    started.wait()
+    for value in range(2, 5):
+        last_id = test_worker.submit(np.full((480, 640, 3), value))
+    release.set()
+    result = wait_for_result(test_worker, last_id)
+    test_worker.stop()
+    assert analyzed == [1, 4]
+    assert result.frame_id == last_id
+    assert test_worker.dropped == 2
+
+
+def test_estimation_error_raised():
+    """
+    Test that an error in the worker is raised when its results are read.
+    """
+    def failing_estimation(frame):
+        raise ValueError("no model")
+
+    test_worker = LivePoseWorker(failing_estimation)
+    test_worker.start()
+    frame_id = test_worker.submit(np.zeros((480, 640, 3)))
+    try:
+        wait_for_result(test_worker, frame_id)
+        assert False
+    except ValueError:
+        assert True
+    test_worker.stop()
+
+
+def test_tracker_used_for_live_frames():
+    """
+    Test that with a tracker, live frames after the first are tracked rather
+    than analyzed by open pose, and that a full inference frame is analyzed.
+    """
+    estimation_calls = []
+
+    def counting_estimation(frame):
+        estimation_calls.append(frame)
+        return CANDIDATES, SUBSETS
+
+    test_worker = LivePoseWorker(counting_estimation,
+                                 PoseTracker(counting_estimation))
+    test_worker.start()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    wait_for_result(test_worker, test_worker.submit(frame))
+    tracked = wait_for_result(test_worker, test_worker.submit(frame))
+    inferred = wait_for_result(test_worker,
+                               test_worker.submit(frame, full_inference=True))
+    test_worker.stop()
+    assert len(estimation_calls) == 2
+    assert tracked.candidates is None
+    assert inferred.subsets is SUBSETS
+
+
+def test_set_mask_without_masks():
+    """
+    Test that a mask cannot be set on a worker without a mask library.
+    """
+    test_worker = LivePoseWorker(lambda frame: (CANDIDATES, SUBSETS))
+    try:
+        test_worker.set_mask(0)
+        assert False
+    except ValueError:
+        assert True
@@ -2,10 +2,10 @@
 Tests for the HoleInTheCameraGame class
 """
 
-import os
 import cv2
 import numpy as np
 from hole_in_the_camera_model import HoleInTheCameraGame
+from hole_in_the_camera_pose import PoseResult
 
 
 def test_initialization_mask_and_joints_length():
@@ -16,16 +16,13 @@ def test_initialization_mask_and_joints_length():
     assert len(test_model.mask_and_joints) == 7
 
 
-def test_initialization_joints_file_paths():
+def test_initialization_mask_indices():
     """
-    Tests that the joint files are the correct file type.
+    Tests that each mask is given its own index into the mask library.
     """
     test_model = HoleInTheCameraGame()
-    for _, csv in test_model.mask_and_joints:
-        # all paths to csv files should end in .csv
-        if not csv[-4:] == ".csv":
-            assert False
-    assert True
+    indices = [index for _, index in test_model.mask_and_joints]
+    assert sorted(indices) == list(range(len(test_model.masks)))
 
 
 def test_initialization_mask_shape():
@@ -81,23 +78,35 @@ def test_num_holes_remaining_all_trials_elapsed():
     assert test_model.num_holes_remaining() == 0
 
 
-def test_get_mask_and_joints_joint_path():
+def test_get_mask_and_joints_index_matches_mask():
+    """
+    Tests that the index returned by get_mask_and_joints is the index of the
+    returned mask in the mask library.
+    """
+    test_model = HoleInTheCameraGame()
+    mask, index = test_model.get_mask_and_joints()
+    assert np.array_equal(mask, test_model.masks.mask(index))
+
+
+def test_get_mask_and_joints_next_mask_decoded():
     """
-    Tests that the joint path is the correct file type.
+    Tests that the next mask is decoded before it is handed out.
     """
     test_model = HoleInTheCameraGame()
-    _, joint = test_model.get_mask_and_joints()
-    assert joint[-4:] == ".csv"
+    first_mask, first_index = test_model.get_mask_and_joints()
+    assert test_model.masks.mask(first_index) is first_mask
+    for _ in range(6):
+        mask, index = test_model.get_mask_and_joints()
+        assert test_model.masks.mask(index) is mask
 
 
-def test_get_mask_and_joints_joint_exists():
+def test_get_mask_and_joints_indices_not_repeated():
     """
-    Tests that the joint file returned by get_mask_and_joints is
-    a valid file.
+    Tests that get_mask_and_joints hands out every mask index exactly once.
     """
     test_model = HoleInTheCameraGame()
-    _, joint = test_model.get_mask_and_joints()
-    assert os.path.exists(joint)
+    indices = [test_model.get_mask_and_joints()[1] for _ in range(7)]
+    assert sorted(indices) == list(range(7))
 
 
 def test_get_mask_and_joints_mask_shape():
@@ -164,6 +173,17 @@ def test_analyze_frame_white_image_joint_subsets():
     assert len(test_model.joint_subsets) == 0
 
 
+def test_analyze_frame_body_estimation_ready():
+    """
+    Tests that the background loaded deep pose model has finished loading
+    once a frame has been analyzed.
+    """
+    test_model = HoleInTheCameraGame()
+    test_image = np.zeros([480, 640, 3])
+    test_model.analyze_frame(test_image)
+    assert test_model.BODY_ESTIMATION.ready
+
+
 def test_analyze_frame_no_legs_joint_candidates():
     """
     Tests that deep pose does not find extra joints
@@ -277,7 +297,7 @@ def test_parse_for_joint_positions_black_image():
     test_image = np.zeros([480, 640, 3])
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    assert test_model.joint_positions == {}
+    assert not test_model.joint_positions.detected
 
 
 def test_parse_for_joint_positions_white_image():
@@ -289,7 +309,7 @@ def test_parse_for_joint_positions_white_image():
     test_image = np.ones([480, 640, 3]) * 255
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    assert test_model.joint_positions == {}
+    assert not test_model.joint_positions.detected
 
 
 def test_parse_for_joint_positions_no_legs_joints_detected():
@@ -303,12 +323,14 @@ def test_parse_for_joint_positions_no_legs_joints_detected():
     test_image = cv2.imread("images/poses/first_mask.png")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    for key, value in test_model.joint_positions.items():
-        if key in ["9", "10", "12", "13"]:
-            if value != [-1, -1]:
+    pose = test_model.joint_positions
+    for joint, (position, present) in enumerate(zip(pose.positions,
+                                                    pose.present)):
+        if joint in [9, 10, 12, 13]:
+            if present or list(position) != [-1, -1]:
                 assert False
         else:
-            if value == [-1, -1]:
+            if not present or list(position) == [-1, -1]:
                 assert False
     assert True
 
@@ -323,8 +345,8 @@ def test_parse_for_joint_positions_no_legs_found_joint_positions():
     test_image = cv2.imread("images/poses/first_mask.png")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    for key, value in test_model.joint_positions.items():
-        if key not in ["9", "10", "12", "13"]:
+    for joint, value in enumerate(test_model.joint_positions.positions):
+        if joint not in [9, 10, 12, 13]:
             if value[0] > 640 or value[0] < 0 or value[1] > 480 or value[1] < 0:
                 assert False
     assert True
@@ -342,12 +364,14 @@ def test_parse_for_joint_positions_half_upper_joints_detected():
     test_image = cv2.imread("images/poses/first_mask.png")[:, :325, :]
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    for key, value in test_model.joint_positions.items():
-        if key in ["1", "5", "6", "7", "8", "9", "10", "11", "12", "13", "17"]:
-            if value != [-1, -1]:
+    pose = test_model.joint_positions
+    for joint, (position, present) in enumerate(zip(pose.positions,
+                                                    pose.present)):
+        if joint in [1, 5, 6, 7, 8, 9, 10, 11, 12, 13, 17]:
+            if present or list(position) != [-1, -1]:
                 assert False
         else:
-            if value == [-1, -1]:
+            if not present or list(position) == [-1, -1]:
                 assert False
     assert True
 
@@ -362,9 +386,8 @@ def test_parse_for_joint_positions_half_upper_found_joint_positions():
     test_image = cv2.imread("images/poses/first_mask.png")[:, :325, :]
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    for key, value in test_model.joint_positions.items():
-        if key not in ['1', '5', '6', '7', '8', '9', '10', '11', '12', '13',
-                       '17']:
+    for joint, value in enumerate(test_model.joint_positions.positions):
+        if joint not in [1, 5, 6, 7, 8, 9, 10, 11, 12, 13, 17]:
             if value[0] > 640 or value[0] < 0 or value[1] > 480 or value[1] < 0:
                 assert False
     assert True
@@ -382,13 +405,14 @@ def test_parse_for_joint_positions_other_half_upper_joints_detected():
     test_image = cv2.imread("images/poses/first_mask.png")[:, 350:, :]
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    for key, value in test_model.joint_positions.items():
-        if key in ['0', '2', '3', '4', '8', '9', '10', '12', '13', '14', '15',
-                   '16']:
-            if value != [-1, -1]:
+    pose = test_model.joint_positions
+    for joint, (position, present) in enumerate(zip(pose.positions,
+                                                    pose.present)):
+        if joint in [0, 2, 3, 4, 8, 9, 10, 12, 13, 14, 15, 16]:
+            if present or list(position) != [-1, -1]:
                 assert False
         else:
-            if value == [-1, -1]:
+            if not present or list(position) == [-1, -1]:
                 assert False
     assert True
 
@@ -403,9 +427,8 @@ def test_parse_for_joint_positions_other_half_upper_found_joint_positions():
     test_image = cv2.imread("images/poses/first_mask.png")[:, 350:, :]
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    for key, value in test_model.joint_positions.items():
-        if key not in ['0', '2', '3', '4', '8', '9', '10', '12', '13', '14',
-                       '15', '16']:
+    for joint, value in enumerate(test_model.joint_positions.positions):
+        if joint not in [0, 2, 3, 4, 8, 9, 10, 12, 13, 14, 15, 16]:
             if value[0] > 640 or value[0] < 0 or value[1] > 480 or value[1] < 0:
                 assert False
     assert True
@@ -418,10 +441,10 @@ def test_compute_accuracy_white_image_total_score():
     """
     test_model = HoleInTheCameraGame()
     test_image = np.ones([480, 640, 3]) * 255
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert test_model.total_score == 0
 
 def test_compute_accuracy_white_image_trial_score():
@@ -432,10 +455,10 @@ def test_compute_accuracy_white_image_trial_score():
     """
     test_model = HoleInTheCameraGame()
     test_image = np.ones([480, 640, 3]) * 255
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert test_model.trial_score == 0
 
 def test_compute_accuracy_same_image_total_score():
@@ -446,10 +469,10 @@ def test_compute_accuracy_same_image_total_score():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/first_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert test_model.total_score == 100.0
 
 
@@ -461,10 +484,10 @@ def test_compute_accuracy_same_image_trial_score():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/first_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert test_model.trial_score == 100.0
 
 
@@ -477,11 +500,11 @@ def test_compute_accuracy_same_image_total_score_three_trials():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/first_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     for _ in range(3):
         test_model.analyze_frame(test_image)
         test_model.parse_for_joint_positions()
-        test_model.compute_accuracy(test_csv)
+        test_model.compute_accuracy(test_mask)
     assert test_model.total_score == 300.0
 
 
@@ -494,11 +517,11 @@ def test_compute_accuracy_same_image_trial_score_three_trials():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/first_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     for _ in range(3):
         test_model.analyze_frame(test_image)
         test_model.parse_for_joint_positions()
-        test_model.compute_accuracy(test_csv)
+        test_model.compute_accuracy(test_mask)
     assert test_model.trial_score == 100.0
 
 
@@ -511,10 +534,10 @@ def test_computer_accuracy_diff_image_total_score():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/second_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert test_model.total_score < 70
 
 
@@ -527,10 +550,10 @@ def test_computer_accuracy_diff_image_trial_score():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/second_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert test_model.trial_score < 70
 
 
@@ -543,11 +566,11 @@ def test_computer_accuracy_diff_image_total_score_three_trials():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/second_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     for _ in range(3):
         test_model.analyze_frame(test_image)
         test_model.parse_for_joint_positions()
-        test_model.compute_accuracy(test_csv)
+        test_model.compute_accuracy(test_mask)
     assert test_model.total_score < 210
 
 
@@ -559,11 +582,11 @@ def test_computer_accuracy_diff_image_trial_score_three_trials():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/second_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     for _ in range(3):
         test_model.analyze_frame(test_image)
         test_model.parse_for_joint_positions()
-        test_model.compute_accuracy(test_csv)
+        test_model.compute_accuracy(test_mask)
     assert test_model.trial_score < 70
 
 
@@ -574,10 +597,10 @@ def test_check_win_same_image():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/first_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert test_model.check_win()
 
 
@@ -588,10 +611,10 @@ def test_check_win_diff_image():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/second_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     assert not test_model.check_win()
 
 
@@ -602,16 +625,97 @@ def test_check_win_two_iterations():
     """
     test_model = HoleInTheCameraGame()
     test_image = cv2.imread("images/poses/first_mask.png")
-    test_csv = "mask_joint_positions/first_mask.csv"
+    test_mask = test_model.masks.index("first_mask")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     if not test_model.check_win():
         assert False
     test_image = cv2.imread("images/poses/second_mask.png")
     test_model.analyze_frame(test_image)
     test_model.parse_for_joint_positions()
-    test_model.compute_accuracy(test_csv)
+    test_model.compute_accuracy(test_mask)
     if test_model.check_win():
         assert False
     assert True
+
+
+def test_set_pose_stores_candidates_and_subsets():
+    """
+    Test that a pose found outside of analyze_frame is stored as if
+    analyze_frame had found it.
+    """
+    test_model = HoleInTheCameraGame()
+    test_candidates = np.array([[100.0, 50.0, 0.9, 0]])
+    test_subsets = np.array([[0] + [-1] * 17 + [0.9, 1]])
+    test_model.set_pose(test_candidates, test_subsets)
+    assert test_model.joint_candidates is test_candidates
+    assert test_model.joint_subsets is test_subsets
+
+
+def test_score_joints_same_joints():
+    """
+    Test that scoring the saved joint positions of a mask against that mask
+    gives a perfect score without changing the game's scores.
+    """
+    test_model = HoleInTheCameraGame()
+    test_mask = test_model.masks.index("first_mask")
+    test_joints = PoseResult(test_model.masks.joints[test_mask])
+    assert test_model.score_joints(test_joints, test_mask) == 100.0
+    assert test_model.total_score == 0
+    assert test_model.trial_score == 0
+
+
+def test_score_joints_no_joints():
+    """
+    Test that scoring an empty set of joint positions gives a score of 0.
+    """
+    test_model = HoleInTheCameraGame()
+    test_mask = test_model.masks.index("first_mask")
+    assert test_model.score_joints(PoseResult(), test_mask) == 0
+
+
+class ShortGame(HoleInTheCameraGame):
+    """
+    A game that plays fewer masks than there are.
+    """
+    ROUNDS_PER_GAME = 3
+
+
+def test_num_holes_remaining_short_game():
+    """
+    Test that a game only plays ROUNDS_PER_GAME masks, each one once.
+    """
+    test_model = ShortGame()
+    assert test_model.num_holes_remaining() == 3
+    indices = [test_model.get_mask_and_joints()[1] for _ in range(3)]
+    assert len(set(indices)) == 3
+
+
+def test_average_score_no_trials():
+    """
+    Test that the average score is 0 before any trial is played.
+    """
+    test_model = HoleInTheCameraGame()
+    assert test_model.average_score == 0
+
+
+def test_average_score_trials_played():
+    """
+    Test that the average score divides the total score by the number of
+    trials played.
+    """
+    test_model = HoleInTheCameraGame()
+    test_mask = test_model.masks.index("first_mask")
+    joints = test_model.masks.joints[test_mask]
+    test_candidates = np.array([[x, y, 1.0, part]
+                                for part, (x, y) in enumerate(joints)])
+    test_subsets = np.array([list(range(18)) + [18.0, 18]])
+    # two perfect fits and one with every joint far from the mask's
+    for offset in [0, 0, 1000]:
+        test_model.set_pose(test_candidates + [offset, offset, 0, 0],
+                            test_subsets)
+        test_model.parse_for_joint_positions()
+        test_model.compute_accuracy(test_mask)
+    assert test_model.average_score == test_model.total_score / 3
+    assert test_model.average_score == 200 / 3
@@ -6,6 +6,7 @@ camera game.
 import pygame
 import numpy as np
 import cv2
+from hole_in_the_camera_pose import PoseResult
 from hole_in_the_camera_view import PygameViewer
 
 
@@ -570,3 +571,37 @@ def test_display_round_screen_music():
     music_state = pygame.mixer.music.get_busy()
     pygame.quit()
     assert music_state
+
+
+def test_display_frame_joint_drawn_mirrored():
+    """
+    Test that joint positions passed to display_frame are drawn where the
+    joint appears in the mirrored frame.
+    """
+    test_view = PygameViewer((640, 480))
+    test_view.initialize_view()
+    test_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    test_mask = np.full((480, 640, 3), 255, dtype=np.uint8)
+    test_positions = np.full((18, 2), -1.0)
+    test_positions[0] = [100, 200]
+    test_joints = PoseResult(test_positions)
+    test_view.display_frame(test_frame, "10", test_mask, test_joints)
+    pixel_values = pygame.surfarray.array3d(test_view.screen)
+    pygame.quit()
+    assert tuple(pixel_values[639 - 100, 200]) == (0, 255, 0)
+    assert tuple(pixel_values[100, 200]) == (0, 0, 0)
+
+
+def test_display_frame_score_shown():
+    """
+    Test that passing a provisional score to display_frame draws it over the
+    frame.
+    """
+    test_view = PygameViewer((640, 480))
+    test_view.initialize_view()
+    test_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    test_mask = np.full((480, 640, 3), 255, dtype=np.uint8)
+    test_view.display_frame(test_frame, "10", test_mask, score=75)
+    pixel_values = pygame.surfarray.array3d(test_view.screen)
+    pygame.quit()
+    assert np.max(pixel_values[:200, :40]) > 0